@@ -0,0 +1,96 @@
+"""Aggregate case counts by status, assignee, planned week, deliverable type and component.
+
+A CaseCube keeps one count per distinct combination of those values, so any
+filtered breakdown (the chart's status counts, per-assignee or per-week
+totals) costs O(groups) instead of O(cases). It is built once per upload,
+persisted in data.json under "aggregates", and kept current by the case
+stores as single edits are applied.
+"""
+from collections import Counter
+
+DIMENSIONS = ("status", "assignee", "planned_for_week", "deliverable_type", "components")
+
+
+def _value(value):
+    return "" if value is None else str(value)
+
+
+def _cell(case):
+    return tuple(_value(case.get(dimension)) for dimension in DIMENSIONS)
+
+
+class CaseCube:
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    @classmethod
+    def from_cases(cls, cases):
+        return cls(Counter(_cell(case) for case in cases))
+
+    def add(self, cases):
+        self.counts.update(_cell(case) for case in cases)
+
+    def remove(self, cases):
+        for case in cases:
+            cell = _cell(case)
+            self.counts[cell] -= 1
+            if not self.counts[cell]:
+                del self.counts[cell]
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def _move(self, old, new):
+        if old == new:
+            return
+        self.counts[old] -= 1
+        if not self.counts[old]:
+            del self.counts[old]
+        self.counts[new] += 1
+
+    def update(self, case, field, value):
+        """Account for case[field] changing to value; call before the case is modified"""
+        if field not in DIMENSIONS:
+            return
+        old = _cell(case)
+        position = DIMENSIONS.index(field)
+        self._move(old, old[:position] + (_value(value),) + old[position + 1:])
+
+    def breakdown(self, group_by=("status",), filters=None):
+        """Counts grouped by the group_by dimensions, over cases matching filters.
+
+        filters maps a dimension to the set of values to keep. Returns
+        (matched, Counter of group_by value tuples).
+        """
+        for dimension in list(group_by) + list(filters or {}):
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {dimension}")
+        group_positions = [DIMENSIONS.index(d) for d in group_by]
+        filter_positions = [(DIMENSIONS.index(d), set(values)) for d, values in (filters or {}).items()]
+
+        groups = Counter()
+        for cell, count in self.counts.items():
+            if all(cell[position] in values for position, values in filter_positions):
+                groups[tuple(cell[position] for position in group_positions)] += count
+        return sum(groups.values()), groups
+
+    def status_distribution(self):
+        """data.json's status_distribution: non-empty statuses, most common first"""
+        _, groups = self.breakdown(("status",))
+        counts = [(status, count) for (status,), count in groups.items() if status]
+        # Stable sort keeps first-seen order among ties, like pandas value_counts()
+        return dict(sorted(counts, key=lambda item: -item[1]))
+
+    def apply_to(self, summary):
+        """Bring a data.json summary's counts up to date with the cube"""
+        summary["total_cases"] = self.total
+        summary["status_distribution"] = self.status_distribution()
+        summary["aggregates"] = self.to_json()
+        return summary
+
+    def to_json(self):
+        return {
+            "dimensions": list(DIMENSIONS),
+            "counts": [list(cell) + [count] for cell, count in self.counts.items()],
+        }
@@ -1,11 +1,27 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file, session, redirect, url_for, render_template_string
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, session, redirect, url_for, render_template_string
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
-import pandas as pd
-import json
+import hmac
+from werkzeug.middleware.proxy_fix import ProxyFix
+import math
 import os
-from datetime import datetime, timedelta
+import sys
+import time
+from datetime import date, timedelta
 from werkzeug.utils import secure_filename
+from transform import diff_cases, summarize
+from ingest import ingest_export
+from case_store import open_case_store, StaleWriteError
+from case_query import EDITABLE, QueryCache
+from search_index import rank
+from aggregates import DIMENSIONS
+from jobs import JobQueue
+from http_cache import DocumentCache
+from events import ChangeFeed
+from history import History
+import codec
+import metrics
+from users import load_users, users_path
+from auth import LoginBusy, PasswordChecker, RateLimiter
 
 app = Flask(__name__, static_folder='.')
 
@@ -14,15 +30,29 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'jira-dashboard-secret-k
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=8)
 
 # ─── User Authentication ────────────────────────────────────────────
-USERS = {
-    "nilkanth": generate_password_hash("centiro2024"),
-}
+# Precomputed password hashes from users.json (see users.py)
+USERS = load_users(users_path(os.path.dirname(os.path.abspath(__file__))))
+
+# Sign-in throttling (see auth.py): failed attempts allowed per client IP and
+# per username within LOGIN_WINDOW_SECONDS, and the pool that verifies passwords
+# (by default on half the CPU cores, leaving the rest to the other routes)
+LOGIN_WINDOW_SECONDS = int(os.environ.get('LOGIN_WINDOW_SECONDS', '300'))
+ip_failures = RateLimiter(int(os.environ.get('LOGIN_IP_FAILURES', '20')), LOGIN_WINDOW_SECONDS)
+user_failures = RateLimiter(int(os.environ.get('LOGIN_USER_FAILURES', '10')), LOGIN_WINDOW_SECONDS)
+LOGIN_WORKERS = int(os.environ.get('LOGIN_WORKERS', '0')) or max(1, (os.cpu_count() or 2) // 2)
+password_checker = PasswordChecker(LOGIN_WORKERS, int(os.environ.get('LOGIN_QUEUE', '16')))
+
+# Behind a reverse proxy, set TRUSTED_PROXIES to how many there are, so the
+# per-IP limit sees each client's address rather than the proxy's
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('logged_in'):
-            if request.is_json or request.path.endswith('.json'):
+            if request.is_json or request.path.endswith('.json') or request.path.startswith('/api/'):
                 return jsonify({'error': 'Unauthorized'}), 401
             return redirect(url_for('login'))
         return f(*args, **kwargs)
@@ -166,9 +196,19 @@ UPLOAD_FOLDER = BASE_DIR
 ALLOWED_EXTENSIONS = {'csv'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
+# Uploads are spooled to disk and exports over STREAM_INGEST_MB are ingested in
+# chunks, so MAX_UPLOAD_MB can be raised for big exports without raising memory use
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '16')) * 1024 * 1024
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'error': f'File too large (limit {limit_mb}MB, set MAX_UPLOAD_MB to raise it)'}), 413
 
 # ─── Security Headers ───────────────────────────────────────────────
+# Data documents the browser may keep and revalidate instead of re-downloading
+REVALIDATED_ENDPOINTS = {'cases', 'data'}
+
 @app.after_request
 def add_security_headers(response):
     # Content Security Policy - controls what resources the browser can load
@@ -196,61 +236,118 @@ def add_security_headers(response):
         'camera=(), microphone=(), geolocation=(), '
         'payment=(), usb=(), magnetometer=(), gyroscope=(), accelerometer=()'
     )
-    # Prevent caching of sensitive data
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
+    if request.endpoint in REVALIDATED_ENDPOINTS and 'ETag' in response.headers:
+        # Private to this browser and revalidated by ETag on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        # Prevent caching of sensitive data
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+    return response
+
+@app.after_request
+def wake_change_feed(response):
+    # Writes made by this request reach open dashboards without waiting for the next poll
+    if request.method == 'POST' and response.status_code < 400:
+        change_feed.wake()
+    return response
+
+# ─── Metrics ────────────────────────────────────────────────────────
+# Lets a Prometheus scraper read /metrics with "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Optional: save a sampled profile of every request slower than this (ms) under profiles/
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '0'))
+if SLOW_REQUEST_MS:
+    metrics.enable_profiler(SLOW_REQUEST_MS / 1000, os.path.join(BASE_DIR, 'profiles'))
+
+@app.before_request
+def start_request_timer():
+    metrics.start_request()
+
+# Adds a Server-Timing header to signed-in users' responses, for the dashboard's ?dev overlay.
+# Off by default: lock, write and password check times are not for every client to see
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+
+@app.after_request
+def record_request_metrics(response):
+    # Registered last, so it runs before the other after_request hooks
+    timing = metrics.finish_request(request.endpoint or 'unknown', request.content_length, response.content_length,
+                                    server_timing=SERVER_TIMING and session.get('logged_in', False))
+    if timing:
+        response.headers['Server-Timing'] = timing
     return response
 
+if SLOW_REQUEST_MS:
+    # A request that raised never reaches finish_request, and the profiler would keep sampling
+    # it; without the profiler the next request on the thread simply starts the timer over
+    @app.teardown_request
+    def discard_request_timer(error=None):
+        metrics.discard_request()
+
 def get_path(filename):
     """Get absolute path for a file"""
     return os.path.join(BASE_DIR, filename)
 
+case_store = open_case_store(BASE_DIR)
+query_cache = QueryCache()
+
+# Largest page /api/cases will return
+MAX_PAGE_SIZE = 1000
+
+# Most edits /api/edits will take in one request
+MAX_BATCH_EDITS = 5000
+
+def running_on_async_worker():
+    """Whether gevent or eventlet has patched this process, as their gunicorn workers do"""
+    if 'gevent.monkey' in sys.modules:
+        return sys.modules['gevent.monkey'].is_module_patched('socket')
+    if 'eventlet.patcher' in sys.modules:
+        return sys.modules['eventlet.patcher'].is_monkey_patched('socket')
+    return False
+
+# How open dashboards hear about colleagues' changes (see events.py):
+#   stream  one /api/events connection each; cheap under async workers, but under
+#           sync workers every open dashboard would hold a worker
+#   poll    a request to /api/changes every LIVE_POLL_SECONDS, answered 304 from the
+#           revision alone when nothing changed
+#   off     only on refresh
+# The default is stream under gevent or eventlet, otherwise poll
+LIVE_UPDATES = os.environ.get('LIVE_UPDATES', '').lower()
+LIVE_UPDATES = {'true': 'stream', 'false': 'off'}.get(LIVE_UPDATES, LIVE_UPDATES)  # the old on/off setting
+if LIVE_UPDATES not in ('stream', 'poll', 'off'):
+    LIVE_UPDATES = 'stream' if running_on_async_worker() else 'poll'
+LIVE_POLL_SECONDS = int(os.environ.get('LIVE_POLL_SECONDS', '10'))
+# The longest one stream holds a connection before the browser reconnects and
+# resumes from its Last-Event-ID; 0 keeps it open for as long as the page is
+EVENT_STREAM_SECONDS = int(os.environ.get('EVENT_STREAM_SECONDS', '30')) or None
+change_feed = ChangeFeed(case_store)
+
+# Week-by-week snapshots of the cases, one per upload (see history.py)
+history = History(get_path('history'))
+
+def process_upload(path, progress):
+    """Run one queued upload: apply the export, then keep it as data.csv"""
+    changes = ingest_export(case_store, path, progress, history)
+    change_feed.wake()
+    os.replace(path, get_path('data.csv'))
+    return {'total_cases': changes.pop('total_cases'), 'changes': changes}
+
+upload_jobs = JobQueue(get_path('jobs'), process_upload)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def safe(value):
-    if pd.isna(value):
-        return ""
-    return str(value).strip()
-
-def calculate_week_number(date_str):
-    """Calculate ISO week number from date string"""
-    if not date_str or date_str.strip() == "":
-        return ""
-    
-    try:
-        for date_format in ["%d/%b/%y", "%d/%m/%y", "%d-%m-%Y", "%Y-%m-%d"]:
-            try:
-                date_obj = datetime.strptime(date_str.strip(), date_format)
-                week_num = date_obj.isocalendar()[1]
-                year = date_obj.year
-                return f"W{week_num:02d}-{year}"
-            except ValueError:
-                continue
-        return ""
-    except Exception:
-        return ""
-
-def load_existing_comments():
-    """Load existing comments from cases.json"""
-    comments_map = {}
-    planned_week_map = {}
-    
-    try:
-        if os.path.exists(get_path("cases.json")):
-            with open(get_path("cases.json"), "r", encoding="utf-8") as f:
-                existing_cases = json.load(f)
-                for case in existing_cases:
-                    issue_key = case.get("issue_key", "")
-                    if issue_key:
-                        if "comments" in case:
-                            comments_map[issue_key] = case["comments"]
-                        if "planned_for_week" in case:
-                            planned_week_map[issue_key] = case["planned_for_week"]
-    except Exception as e:
-        print(f"Warning: Could not load existing comments: {e}")
-    
-    return comments_map, planned_week_map
+def stale_write_response(error):
+    """409 telling the client which value won so it can refresh that cell"""
+    case = case_store.get(error.issue_key) or {}
+    return jsonify({
+        'error': 'This field was changed by someone else. Your edit was not saved.',
+        'issue_key': error.issue_key,
+        'field': error.field,
+        'value': case.get(error.field, ''),
+        'revision': error.revision
+    }), 409
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -261,13 +358,37 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username', '').strip().lower()
         password = request.form.get('password', '')
-
-        if username in USERS and check_password_hash(USERS[username], password):
+        client = request.remote_addr or ''
+
+        # Refused before any hashing, so a flood of guesses costs a lookup each
+        wait = max(ip_failures.retry_after(client), user_failures.retry_after(username))
+        if wait:
+            metrics.LOGIN_ATTEMPTS.inc(label_value='limited')
+            minutes = math.ceil(wait / 60)
+            error = f'Too many failed sign-ins. Please try again in {minutes} minute{"s" if minutes > 1 else ""}.'
+            return render_template_string(LOGIN_PAGE, error=error), 429, {'Retry-After': str(math.ceil(wait))}
+
+        password_hash = USERS.get(username)
+        try:
+            start = time.perf_counter()
+            valid = password_checker.check(password_hash, password)
+            metrics.record(metrics.PASSWORD_SECONDS, time.perf_counter() - start, timing='password')
+        except LoginBusy:
+            metrics.LOGIN_ATTEMPTS.inc(label_value='busy')
+            error = 'Too many people are signing in right now. Please try again in a moment.'
+            return render_template_string(LOGIN_PAGE, error=error), 503, {'Retry-After': '2'}
+
+        if valid:
+            metrics.LOGIN_ATTEMPTS.inc(label_value='ok')
+            user_failures.reset(username)
             session['logged_in'] = True
             session['username'] = username
             session.permanent = True
             return redirect(url_for('index'))
         else:
+            metrics.LOGIN_ATTEMPTS.inc(label_value='failed')
+            ip_failures.hit(client)
+            user_failures.hit(username)
             error = 'Invalid username or password. Please try again.'
 
     return render_template_string(LOGIN_PAGE, error=error)
@@ -287,15 +408,224 @@ def index():
 def dashboard():
     return send_file(get_path('index.html'))
 
+@app.route('/case_worker.js')
+@login_required
+def case_worker():
+    # Loaded by index.html as a script and as a Web Worker; the CSP only allows same-origin scripts
+    return send_file(get_path('case_worker.js'), mimetype='text/javascript')
+
+def json_document_response(cache):
+    """The cached document for the store's current data, or 304 if the client already has it"""
+    # Served from the store so journaled edits are included before compaction
+    revision, all_cases = case_store.snapshot()
+    document = cache.document_for(revision, all_cases)
+    encoding = request.accept_encodings.best_match(document.encodings, default='identity')
+    body, etag = document.variants[encoding]
+
+    if any(request.if_none_match.contains(tag) for tag in document.etags()):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['X-Cases-Revision'] = str(revision)
+    return response
+
+# /cases.json layouts: a list of case objects, or codec.to_columns()
+cases_documents = {
+    'rows': DocumentCache(codec.dumps),
+    'columns': DocumentCache(lambda cases: codec.dumps(codec.to_columns(cases))),
+}
+summary_documents = DocumentCache(lambda cases: codec.dumps(case_store.summary()))
+
 @app.route('/cases.json')
 @login_required
 def cases():
-    return send_file(get_path('cases.json'))
+    layout = request.args.get('layout', 'rows')
+    if layout not in cases_documents:
+        return jsonify({'error': f'Unknown layout: {layout} (use rows or columns)'}), 400
+    return json_document_response(cases_documents[layout])
 
 @app.route('/data.json')
 @login_required
 def data():
-    return send_file(get_path('data.json'))
+    return json_document_response(summary_documents)
+
+@app.route('/api/cases')
+@login_required
+def query_cases():
+    """Filter, sort and page cases server-side, with the same semantics as the dashboard"""
+    args = request.args
+    try:
+        date_start = date.fromisoformat(args['date_start']) if args.get('date_start') else None
+        date_end = date.fromisoformat(args['date_end']) if args.get('date_end') else None
+        offset = max(0, int(args.get('offset', 0)))
+        limit = min(MAX_PAGE_SIZE, max(0, int(args.get('limit', 100))))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
+    if args.get('q'):
+        # Full-text search (search_index.py), ranked best first unless a sort is given
+        revision, all_cases, search_index = case_store.search_snapshot()
+        text_scores = search_index.search(args['q'])
+    else:
+        revision, all_cases = case_store.snapshot()
+        text_scores = None
+    index = query_cache.index_for(revision, all_cases, case_store.changes_since)
+    result = index.query(
+        search=args.get('search', ''),
+        text_scores=text_scores,
+        statuses=set(args.getlist('status')),
+        assignees=set(args.getlist('assignee')),
+        date_start=date_start,
+        date_end=date_end,
+        no_date=args.get('no_date') in ('1', 'true'),
+        sort=args.get('sort'),
+        ascending=args.get('dir', 'asc') != 'desc',
+        offset=offset,
+        limit=limit
+    )
+    result['revision'] = revision
+    if args.get('facets') in ('1', 'true'):
+        result['statuses'] = sorted(s for s in index.statuses if s)
+        result['assignees'] = sorted(a for a in index.assignees if a)
+    return jsonify(result)
+
+@app.route('/api/search')
+@login_required
+def search_cases():
+    """Issue keys of the cases best matching q across keys, titles, comments, components and assignees"""
+    try:
+        limit = min(MAX_PAGE_SIZE, max(0, int(request.args.get('limit', 50))))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
+    query = request.args.get('q', '')
+    revision, all_cases, search_index = case_store.search_snapshot()
+    scores = search_index.search(query)
+    return jsonify({
+        'query': query,
+        'matched': len(scores),
+        'keys': [all_cases[i].get('issue_key') for i in rank(scores, limit)],
+        'revision': revision
+    })
+
+@app.route('/api/events')
+@login_required
+def case_events():
+    """Server-Sent Events stream of case edits, count changes and reloads (see events.py)"""
+    if LIVE_UPDATES != 'stream':
+        # Tells EventSource not to reconnect
+        return '', 204
+    last_revision = parse_revision(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    response = Response(change_feed.stream(last_revision, EVENT_STREAM_SECONDS), mimetype='text/event-stream')
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/changes')
+@login_required
+def case_changes():
+    """The /api/events events after ?since=<revision> as JSON, for dashboards that poll; ETag is the revision"""
+    if LIVE_UPDATES == 'off':
+        return '', 204
+    revision = change_feed.revision
+    if request.if_none_match.contains(str(revision)):
+        return '', 304, {'ETag': f'"{revision}"'}
+    revision, events = change_feed.changes_after(parse_revision(request.args.get('since')))
+    body = (f'{{"revision":{revision},"mode":"{LIVE_UPDATES}","poll_seconds":{LIVE_POLL_SECONDS},'
+            f'"events":{events}}}')
+    return Response(body, mimetype='application/json', headers={'ETag': f'"{revision}"'})
+
+def parse_revision(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@app.route('/metrics')
+def prometheus_metrics():
+    authorization = request.headers.get('Authorization', '')
+    token_ok = METRICS_TOKEN and hmac.compare_digest(authorization, f'Bearer {METRICS_TOKEN}')
+    if not (session.get('logged_in') or token_ok):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/aggregates')
+@login_required
+def query_aggregates():
+    """Case counts grouped by any of the cube's dimensions, optionally filtered on others"""
+    args = request.args
+    group_by = args.getlist('group_by') or ['status']
+    filters = {dimension: set(args.getlist(dimension)) for dimension in DIMENSIONS if dimension in args}
+    try:
+        matched, groups = case_store.aggregates().breakdown(group_by, filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'matched': matched,
+        'group_by': group_by,
+        'groups': [dict(zip(group_by, values), count=count) for values, count in groups.most_common()]
+    })
+
+@app.route('/api/history')
+@login_required
+def history_snapshots():
+    """Every recorded snapshot: when it was taken, totals, status counts and how much moved"""
+    snapshots = [{key: value for key, value in header.items() if key != 'delta'} for header in history.snapshots()]
+    return jsonify({'snapshots': snapshots})
+
+@app.route('/api/history/counts')
+@login_required
+def history_counts():
+    """Case counts at the end of each of the last `weeks` weeks, grouped and filtered like /api/aggregates"""
+    args = request.args
+    group_by = args.getlist('group_by') or ['status']
+    filters = {dimension: set(args.getlist(dimension)) for dimension in DIMENSIONS if dimension in args}
+    try:
+        points = history.weekly_counts(int(args.get('weeks', 12)), group_by, filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'group_by': group_by, 'weeks': points})
+
+@app.route('/api/history/changes')
+@login_required
+def history_changes():
+    """What moved between two snapshots, given as a seq or an ISO week (W41-2026).
+
+    `since` defaults to the last snapshot before the latest one's week, and
+    `until` to the latest snapshot.
+    """
+    try:
+        since = history.previous_week() if 'since' not in request.args else history.resolve(request.args['since'])
+        until = history.resolve(request.args['until']) if 'until' in request.args else None
+        if since is None or ('until' in request.args and until is None):
+            return jsonify({'error': 'No such snapshot'}), 404
+        added, removed, moved = history.changes_between(since, until)
+        return jsonify({
+            'since': since,
+            'until': until if until is not None else (history.snapshots() or [{'seq': 0}])[-1]['seq'],
+            'added': added,
+            'removed': removed,
+            'changes': [{'issue_key': issue_key, 'field': field, 'from': old, 'to': new}
+                        for (issue_key, field), (old, new) in moved.items()]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/issue/<issue_key>')
+@login_required
+def history_issue(issue_key):
+    """One issue's recorded events: added, removed, and each tracked field change"""
+    try:
+        return jsonify({'issue_key': issue_key, 'events': history.issue_history(issue_key)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/upload', methods=['POST'])
 @login_required
@@ -313,69 +643,30 @@ def upload_csv():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only CSV allowed'}), 400
         
-        # Save uploaded CSV
-        filename = secure_filename(file.filename)
-        filepath = get_path('data.csv')
+        # Save the upload and process it in the background, applying only the issues that changed
+        filepath = upload_jobs.upload_path()
         file.save(filepath)
-        
-        # Process the CSV
-        comments_map, planned_week_map = load_existing_comments()
-        
-        df = pd.read_csv(filepath, low_memory=False)
-        cases = []
-        
-        for _, row in df.iterrows():
-            issue_key = safe(row["Issue key"])
-            target_start = safe(row["Target start date"])
-            
-            case = {
-                "hierarchy": safe(row["Hierarchy"]),
-                "issue_key": issue_key,
-                "title": safe(row["Title"]),
-                "assignee": safe(row["Assignee"]),
-                "target_start": target_start,
-                "target_end": safe(row["Target end date"]),
-                "components": safe(row["Components"]),
-                "status": safe(row["Issue status"]).title(),
-                "deliverable_type": safe(row["Deliverable Type"])
-            }
-            
-            # Preserve existing comments
-            case["comments"] = comments_map.get(issue_key, "")
-            
-            # Preserve or calculate planned_for_week
-            if issue_key in planned_week_map:
-                case["planned_for_week"] = planned_week_map[issue_key]
-            else:
-                case["planned_for_week"] = calculate_week_number(target_start)
-            
-            cases.append(case)
-        
-        # Save cases.json
-        with open(get_path("cases.json"), "w", encoding="utf-8") as f:
-            json.dump(cases, f, indent=4, ensure_ascii=False)
-        
-        # Save data.json
-        status_counts = df["Issue status"].value_counts().to_dict()
-        summary = {
-            "total_cases": len(cases),
-            "status_distribution": {k.title() if isinstance(k, str) else str(k): v for k, v in status_counts.items()}
-        }
-        
-        with open(get_path("data.json"), "w", encoding="utf-8") as f:
-            json.dump(summary, f, indent=4)
+        job_id, queued = upload_jobs.submit(filepath, secure_filename(file.filename))
         
         return jsonify({
             'success': True,
-            'message': 'CSV processed successfully',
-            'total_cases': len(cases),
-            'comments_preserved': len(comments_map),
-            'weeks_preserved': len(planned_week_map)
-        })
+            'message': 'CSV queued for processing' if queued else 'This file is already being processed',
+            'job_id': job_id,
+            'status_url': url_for('upload_status', job_id=job_id)
+        }), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>')
+@login_required
+def upload_status(job_id):
+    """State, phase and progress of an upload job, with its change summary once done"""
+    job = upload_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
 @app.route('/update_comment', methods=['POST'])
 @login_required
 def update_comment():
@@ -385,22 +676,13 @@ def update_comment():
         issue_key = data.get('issue_key')
         comment = data.get('comment', '')
         
-        # Load cases.json
-        with open(get_path("cases.json"), "r", encoding="utf-8") as f:
-            cases = json.load(f)
-        
-        # Update the comment
-        for case in cases:
-            if case.get('issue_key') == issue_key:
-                case['comments'] = comment
-                break
-        
-        # Save updated cases.json
-        with open(get_path("cases.json"), "w", encoding="utf-8") as f:
-            json.dump(cases, f, indent=4, ensure_ascii=False)
+        # Update the comment; the store journals it and compacts later
+        revision = case_store.update_field(issue_key, 'comments', comment, data.get('revision'))
         
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'revision': revision})
     
+    except StaleWriteError as e:
+        return stale_write_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -413,25 +695,52 @@ def save_all():
         if not isinstance(cases, list):
             return jsonify({'error': 'Invalid data format'}), 400
 
-        with open(get_path("cases.json"), "w", encoding="utf-8") as f:
-            json.dump(cases, f, indent=4, ensure_ascii=False)
+        # Apply only the fields that differ from the stored cases; rewrite
+        # everything only when issues were added, removed or reordered
+        with case_store.locked():
+            edits = diff_cases(case_store.cases(), cases)
+            if edits is None:
+                revision = case_store.replace(cases, summarize(cases))
+            else:
+                if edits:
+                    case_store.update_fields((issue_key, field, value, None) for issue_key, field, value in edits)
+                revision = case_store.revision
 
-        # Also update data.json summary
-        status_counts = {}
-        for case in cases:
-            status = case.get('status', '')
-            if status:
-                status_counts[status] = status_counts.get(status, 0) + 1
+        return jsonify({'success': True, 'revision': revision, 'changed': len(cases) if edits is None else len(edits)})
 
-        summary = {
-            "total_cases": len(cases),
-            "status_distribution": status_counts
-        }
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        with open(get_path("data.json"), "w", encoding="utf-8") as f:
-            json.dump(summary, f, indent=4)
+@app.route('/api/edits', methods=['POST'])
+@login_required
+def apply_edits():
+    """Apply a batch of {issue_key, field, value, revision} edits as one commit"""
+    try:
+        data = request.json
+        operations = data.get('edits') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or len(operations) > MAX_BATCH_EDITS:
+            return jsonify({'error': f'Expected {{"edits": [...]}} with at most {MAX_BATCH_EDITS} edits'}), 400
+
+        edits = []
+        for operation in operations:
+            if (not isinstance(operation, dict) or not isinstance(operation.get('issue_key'), str)
+                    or operation.get('field') not in EDITABLE or not isinstance(operation.get('value', ''), str)):
+                return jsonify({'error': f'Invalid edit: {operation}'}), 400
+            edits.append((operation['issue_key'], operation['field'], operation.get('value', ''),
+                          operation.get('revision')))
+
+        results = []
+        for (issue_key, field, _, _), result in zip(edits, case_store.update_fields(edits)):
+            if result is None:
+                results.append({'status': 'not_found'})
+            elif isinstance(result, StaleWriteError):
+                # The value that won, so the client can refresh that cell
+                case = case_store.get(issue_key) or {}
+                results.append({'status': 'conflict', 'value': case.get(field, ''), 'revision': result.revision})
+            else:
+                results.append({'status': 'saved', 'revision': result})
 
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'results': results})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -445,22 +754,13 @@ def update_week():
         issue_key = data.get('issue_key')
         week = data.get('week', '')
         
-        # Load cases.json
-        with open(get_path("cases.json"), "r", encoding="utf-8") as f:
-            cases = json.load(f)
-        
-        # Update the week
-        for case in cases:
-            if case.get('issue_key') == issue_key:
-                case['planned_for_week'] = week
-                break
-        
-        # Save updated cases.json
-        with open(get_path("cases.json"), "w", encoding="utf-8") as f:
-            json.dump(cases, f, indent=4, ensure_ascii=False)
+        # Update the week; the store journals it and compacts later
+        revision = case_store.update_field(issue_key, 'planned_for_week', week, data.get('revision'))
         
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'revision': revision})
     
+    except StaleWriteError as e:
+        return stale_write_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
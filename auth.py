@@ -0,0 +1,131 @@
+"""Sign-in throttling: rate limits and a bounded pool for password checks.
+
+Password hashes are deliberately slow to verify (scrypt, tens of
+milliseconds of CPU each), so /login must not let a burst of attempts take
+every worker. Attempts are first checked against in-memory limits on
+failed sign-ins per client IP and per username (a success clears the
+username's), which cost a dictionary lookup. Counting only failures keeps
+an office behind one address able to sign in together at a shift change.
+Attempts that pass are verified on a small fixed pool of threads. Once as
+many checks as the pool has room for are running or waiting, further
+attempts are turned away at once instead of queueing behind them, so a
+burst costs the other routes at most the pool's threads of CPU. An unknown
+username is checked against a hash no password matches, so it takes as
+long to turn away as a wrong password for a real account.
+
+The limits live in each worker process, so with several workers an
+attacker gets the limit once per worker. Entries expire after the window.
+A limiter tracks at most MAX_KEYS keys, so a flood of made-up usernames
+cannot grow it without bound; past that it forgets its oldest keys.
+"""
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Keys one limiter tracks before it sweeps out expired ones, and if still
+# full, forgets the oldest tenth
+MAX_KEYS = 10_000
+
+
+class LoginBusy(Exception):
+    """Too many password checks are already running or waiting"""
+
+
+class RateLimiter:
+    """At most limit events per key within any window seconds"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._events = {}  # key -> deque of event times, oldest first
+
+    def _expire(self, events, now):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def retry_after(self, key, now=None):
+        """Seconds until key may try again, or 0 if it is under the limit"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                return 0
+            self._expire(events, now)
+            if not events:
+                del self._events[key]
+                return 0
+            if len(events) < self.limit:
+                return 0
+            return events[0] + self.window - now
+
+    def hit(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                if len(self._events) >= MAX_KEYS:
+                    self._sweep(now)
+                events = self._events[key] = deque()
+            self._expire(events, now)
+            events.append(now)
+            # Only the latest limit events matter
+            while len(events) > self.limit:
+                events.popleft()
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    def _sweep(self, now):
+        for key in list(self._events):
+            events = self._events[key]
+            self._expire(events, now)
+            if not events:
+                del self._events[key]
+        # Keys are in the order they were first seen
+        for key in list(self._events)[:max(0, len(self._events) - MAX_KEYS * 9 // 10)]:
+            del self._events[key]
+
+    def __len__(self):
+        return len(self._events)
+
+
+class PasswordChecker:
+    """Verifies passwords on at most workers threads, with at most queue more checks waiting"""
+
+    def __init__(self, workers=2, queue=16, timeout=10.0):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-check")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._unknown_user_hash = None
+
+    def _check_unknown_user(self, password):
+        if self._unknown_user_hash is None:
+            self._unknown_user_hash = generate_password_hash(secrets.token_urlsafe(16))
+        check_password_hash(self._unknown_user_hash, password)
+        return False
+
+    def check(self, password_hash, password):
+        """check_password_hash() on the pool, False for a None hash; raises LoginBusy if it is full or too slow"""
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            if password_hash is None:
+                future = self._pool.submit(self._check_unknown_user, password)
+            else:
+                future = self._pool.submit(check_password_hash, password_hash, password)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the check finishes, even if this request gave up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            raise LoginBusy() from None
@@ -0,0 +1,66 @@
+"""Aggregate cube: breakdowns and single-edit updates versus recounting every case.
+
+Usage: python benchmarks/bench_aggregates.py [--cases 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import CaseCube  # noqa: E402
+from bench_query import ASSIGNEES, STATUSES, synthetic_cases  # noqa: E402
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    cases = synthetic_cases(args.cases)
+    for case in cases:
+        case["components"] = random.choice(["Reverse flow (Project)", "Carrier", ""])
+
+    start = time.perf_counter()
+    cube = CaseCube.from_cases(cases)
+    print(f"cube build: {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{len(cube.counts)} groups for {args.cases} cases")
+
+    assignees = {ASSIGNEES[0], ASSIGNEES[1]}
+
+    def recount():
+        return Counter(c["status"] for c in cases if c["assignee"] in assignees)
+
+    loop, expected = timed(recount)
+    cube_time, (_, groups) = timed(lambda: cube.breakdown(("status",), {"assignee": assignees}))
+    assert {status: count for (status,), count in groups.items()} == dict(expected)
+    print(f"status counts for two assignees: loop {loop * 1000:.2f} ms, cube {cube_time * 1000:.3f} ms "
+          f"({loop / cube_time:.0f}x)")
+
+    rng = random.Random(5)
+    start = time.perf_counter()
+    for _ in range(10_000):
+        case = rng.choice(cases)
+        week = f"W{rng.randint(1, 52):02d}-2026"
+        cube.update(case, "planned_for_week", week)
+        case["planned_for_week"] = week
+        case_status = rng.choice(STATUSES)
+        cube.update(case, "status", case_status)
+        case["status"] = case_status
+    elapsed = time.perf_counter() - start
+    assert cube.counts == CaseCube.from_cases(cases).counts
+    print(f"single-edit updates: {elapsed / 20_000 * 1e6:.1f} us each, cube still matches a rebuild")
+
+
+if __name__ == "__main__":
+    main()
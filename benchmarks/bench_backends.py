@@ -0,0 +1,57 @@
+"""Upload, edit and read latency of the JSON and SQLite case stores.
+
+Usage: python benchmarks/bench_backends.py [--sizes 10000 100000 1000000] [--edits 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_edits import synthetic_cases  # noqa: E402
+from case_store import open_case_store  # noqa: E402
+from transform import summarize  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(backend, count, edits):
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = synthetic_cases(count)
+        summary = summarize(cases)
+        store = open_case_store(tmp, backend)
+
+        upload = timed(store.replace, cases, summary)
+        edit_times = [timed(store.update_field, f"CAR-{(i * 7919) % count}", "comments", f"note {i}")
+                      for i in range(edits)]
+        # /cases.json after edits: bring the document up to date and serialize it
+        read = timed(lambda: json.dumps(store.cases(), indent=4, ensure_ascii=False))
+        # A second worker process starting cold
+        cold = timed(lambda: open_case_store(tmp, backend).cases())
+        return upload, statistics.median(edit_times), max(edit_times), read, cold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'cases':>9} {'upload ms':>10} {'edit p50':>9} {'edit max':>9} "
+          f"{'read ms':>9} {'cold ms':>9}")
+    for count in args.sizes:
+        for backend in ("json", "sqlite"):
+            upload, p50, worst, read, cold = run(backend, count, args.edits)
+            print(f"{backend:>8} {count:>9} {upload:>10.1f} {p50:>9.3f} {worst:>9.3f} {read:>9.1f} {cold:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Encode/decode time and size of cases.json layouts and JSON codecs.
+
+Compares the old indent=4 stdlib output with compact rows and the column
+layout (codec.to_columns), using stdlib json and, when installed, orjson.
+
+Usage: python benchmarks/bench_codec.py [--cases 100000] [--repeat 3]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec  # noqa: E402
+from bench_query import synthetic_cases  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    cases = synthetic_cases(args.cases)
+
+    stdlib_dumps = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")  # noqa: E731
+    variants = [
+        ("rows, indent=4 (old)", lambda c: json.dumps(c, indent=4, ensure_ascii=False).encode("utf-8"),
+         json.loads),
+        ("rows, compact, json", stdlib_dumps, json.loads),
+        ("columns, compact, json", lambda c: stdlib_dumps(codec.to_columns(c)),
+         lambda data: codec.from_columns(json.loads(data))),
+    ]
+    if codec.orjson is not None:
+        variants += [
+            ("rows, compact, orjson", codec.orjson.dumps, codec.orjson.loads),
+            ("columns, compact, orjson", lambda c: codec.orjson.dumps(codec.to_columns(c)),
+             lambda data: codec.from_columns(codec.orjson.loads(data))),
+        ]
+    else:
+        print("orjson is not installed; only the stdlib codec is measured")
+
+    print(f"{args.cases} cases")
+    print(f"{'layout / codec':<26} {'size':>9} {'gzip':>8} {'encode':>9} {'decode':>9}")
+    for name, encode, decode in variants:
+        data, encode_ms = best_of(args.repeat, lambda: encode(cases))
+        decoded, decode_ms = best_of(args.repeat, lambda: decode(data))
+        assert decoded == cases, name
+        print(f"{name:<26} {len(data) / 1024 / 1024:>7.1f}MB {len(gzip.compress(data, 6)) / 1024 / 1024:>6.1f}MB "
+              f"{encode_ms:>7.0f}ms {decode_ms:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Check dates.week_numbers matches the legacy per-row parser, then time both.
+
+Usage: python benchmarks/bench_dates.py [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dates import DATE_FORMATS, calculate_week_number, parse_dates, week_numbers  # noqa: E402
+
+
+def legacy_calculate_week_number(date_str):
+    """calculate_week_number as it was in app.py / update_data.py"""
+    if not date_str or date_str.strip() == "":
+        return ""
+    try:
+        for date_format in ["%d/%b/%y", "%d/%m/%y", "%d-%m-%Y", "%Y-%m-%d"]:
+            try:
+                date_obj = datetime.strptime(date_str.strip(), date_format)
+                week_num = date_obj.isocalendar()[1]
+                year = date_obj.year
+                return f"W{week_num:02d}-{year}"
+            except ValueError:
+                continue
+        return ""
+    except Exception:
+        return ""
+
+
+def boundary_dates():
+    """Days around every new year where the ISO week year differs from the calendar year"""
+    days = []
+    for year in range(1999, 2031):
+        for offset in range(-7, 8):
+            days.append(date(year, 1, 1) + timedelta(days=offset))
+    return days
+
+
+def edge_values():
+    return [
+        "", "   ", "not a date", "31/02/25", "2025-13-01", "1/2/25", " 01/Nov/25 ", "01/nov/25",
+        "01/NOV/25", "12/Nov/2025", "01/Sept/25", "2025-1-2", "1-2-2025", "01-02-25", "20250102",
+        "2025-01-02T00:00", "1/1/68", "1/1/69", "0001-01-01", "9999-12-31", "29/Feb/24", "29/Feb/25",
+    ]
+
+
+def check_equivalence():
+    days = boundary_dates()
+    columns = {fmt: [day.strftime(fmt) for day in days] for fmt in DATE_FORMATS}
+    columns["mixed"] = [day.strftime(DATE_FORMATS[i % 4]) for i, day in enumerate(days)]
+    columns["edge"] = edge_values()
+    # A column dominated by one format with a few stragglers in the others
+    columns["mostly-iso"] = columns["%Y-%m-%d"] + edge_values() + columns["%d/%b/%y"][:10]
+
+    for name, values in columns.items():
+        series = pd.Series(values, dtype=object)
+        expected = [legacy_calculate_week_number(value) for value in values]
+        assert week_numbers(series).tolist() == expected, f"week_numbers differs on {name}"
+        assert [calculate_week_number(value) for value in values] == expected, \
+            f"calculate_week_number differs on {name}"
+        parsed = parse_dates(series)
+        assert parsed.notna().tolist() == [bool(week) for week in expected], f"parse_dates differs on {name}"
+    print(f"week_numbers matches the legacy parser on {sum(map(len, columns.values()))} values")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    check_equivalence()
+
+    rng = random.Random(7)
+    base = date(2024, 1, 1)
+    for date_format in DATE_FORMATS:
+        values = pd.Series(
+            [(base + timedelta(days=rng.randrange(1000))).strftime(date_format) if rng.random() > 0.1 else ""
+             for _ in range(args.rows)], dtype=object)
+
+        start = time.perf_counter()
+        legacy = [legacy_calculate_week_number(value) for value in values]
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = week_numbers(values)
+        new_time = time.perf_counter() - start
+
+        assert result.tolist() == legacy
+        print(f"{date_format:>10}: legacy {args.rows / legacy_time:>12,.0f} rows/s  "
+              f"week_numbers {args.rows / new_time:>14,.0f} rows/s  ({legacy_time / new_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Single-comment edit latency at N cases: full JSON rewrite vs the journaled case store, and batched edits.
+
+Usage: python benchmarks/bench_edits.py [--cases 100000] [--edits 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from case_store import CaseStore  # noqa: E402
+
+
+def synthetic_cases(count):
+    return [{
+        "hierarchy": "Epic",
+        "issue_key": f"CAR-{i}",
+        "title": f"Carrier integration {i}",
+        "assignee": "Ann",
+        "target_start": "01/Nov/25",
+        "target_end": "",
+        "components": "Reverse flow (Project)",
+        "status": "Backlog",
+        "deliverable_type": "Deployment",
+        "comments": "",
+        "planned_for_week": "W44-2025",
+    } for i in range(count)]
+
+
+def legacy_update_comment(path, issue_key, comment):
+    """update_comment as it was: load, linear scan, pretty-printed rewrite"""
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        if case.get("issue_key") == issue_key:
+            case["comments"] = comment
+            break
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cases, f, indent=4, ensure_ascii=False)
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    print(f"{label:>28}: p50 {p50:10.3f} ms   p99 {p99:10.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cases.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_cases(args.cases), f, indent=4)
+        keys = [f"CAR-{(i * 7919) % args.cases}" for i in range(args.edits)]
+
+        samples = []
+        for n, key in enumerate(keys):
+            start = time.perf_counter()
+            legacy_update_comment(path, key, f"note {n}")
+            samples.append(time.perf_counter() - start)
+        report("legacy rewrite per edit", samples)
+
+        store = CaseStore(path)
+        store.cases()  # initial load happens once per process
+        samples = []
+        for n, key in enumerate(keys):
+            start = time.perf_counter()
+            store.update_field(key, "comments", f"store note {n}")
+            samples.append(time.perf_counter() - start)
+        report("case store per edit", samples)
+
+        # The dashboard's edit queue sends edits like these as one /api/edits batch
+        start = time.perf_counter()
+        store.update_fields((key, "planned_for_week", "W10-2026", None) for key in keys)
+        batch = time.perf_counter() - start
+        print(f"{f'batch of {len(keys)} edits':>28}: {batch * 1000:10.3f} ms total "
+              f"(one at a time: {sum(samples) * 1000:.3f} ms)")
+
+        start = time.perf_counter()
+        CaseStore(path).cases()
+        print(f"{'cold start + journal replay':>28}: {(time.perf_counter() - start) * 1000:10.3f} ms")
+
+        start = time.perf_counter()
+        store.compact()
+        print(f"{'one compaction':>28}: {(time.perf_counter() - start) * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
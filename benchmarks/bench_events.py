@@ -0,0 +1,118 @@
+"""Fan-out latency of /api/events: one edit, many connected dashboards.
+
+Opens --clients event streams through Flask test clients, posts edits to
+/api/edits, and measures how long each edit takes to reach every stream.
+Fails if any stream misses an edit. Then times the /api/changes poll that
+dashboards make under sync workers, with nothing new (304) and with the
+edits to catch up on.
+
+Usage: python benchmarks/bench_events.py [--clients 200] [--edits 20] [--cases 10000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_query import synthetic_cases  # noqa: E402
+
+
+def logged_in_client(app):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    return client
+
+
+def listen(app, connected, arrivals, done):
+    response = logged_in_client(app).get("/api/events", buffered=False)
+    seen = {}
+    arrivals.append(seen)
+    connected.release()
+    for chunk in response.response:
+        now = time.perf_counter()
+        text = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        for line in text.splitlines():
+            if line.startswith("data: ") and '"note ' in line:
+                seen[line.split('"note ')[1].split('"')[0]] = now
+        if done.is_set():
+            break
+    response.close()
+
+
+def per_poll_ms(poll, status, count=500):
+    start = time.perf_counter()
+    for _ in range(count):
+        assert poll().status_code == status
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--cases", type=int, default=10_000)
+    args = parser.parse_args()
+
+    os.environ["LIVE_UPDATES"] = "stream"
+    with tempfile.TemporaryDirectory() as tmp:
+        import app
+        from case_store import CaseStore
+        from events import ChangeFeed
+        from transform import summarize
+
+        cases = synthetic_cases(args.cases)
+        app.case_store = CaseStore(os.path.join(tmp, "cases.json"))
+        app.case_store.replace(cases, summarize(cases))
+        app.change_feed = ChangeFeed(app.case_store, heartbeat=1.0)
+
+        connected = threading.Semaphore(0)
+        done = threading.Event()
+        arrivals = []
+        threads = [threading.Thread(target=listen, args=(app, connected, arrivals, done), daemon=True)
+                   for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            connected.acquire()
+        time.sleep(0.5)  # let every stream reach its first wait
+
+        editor = logged_in_client(app)
+        sent = {}
+        for n in range(args.edits):
+            sent[str(n)] = time.perf_counter()
+            editor.post("/api/edits", json={"edits": [
+                {"issue_key": cases[n]["issue_key"], "field": "comments", "value": f"note {n}"}]})
+            time.sleep(0.05)
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and any(len(seen) < args.edits for seen in arrivals):
+            time.sleep(0.05)
+        done.set()
+        app.change_feed.wake()
+
+        missed = sum(args.edits - len(seen) for seen in arrivals)
+        latencies = sorted((seen[n] - sent[n]) * 1000 for seen in arrivals for n in seen)
+        per_edit = [max(seen[n] for seen in arrivals if n in seen) - sent[n] for n in sent]
+        print(f"{args.clients} streams, {args.edits} edits")
+        print(f"edit -> stream latency: p50 {statistics.median(latencies):.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)]:.1f} ms, max {latencies[-1]:.1f} ms")
+        print(f"edit -> last stream:    p50 {statistics.median(per_edit) * 1000:.1f} ms")
+        assert not missed, f"{missed} edit events never arrived"
+        print("every stream received every edit")
+
+        poller = logged_in_client(app)
+        latest = app.change_feed.revision
+        unchanged = per_poll_ms(lambda: poller.get(f"/api/changes?since={latest}",
+                                                   headers={"If-None-Match": f'"{latest}"'}), 304)
+        behind = per_poll_ms(lambda: poller.get(f"/api/changes?since={latest - args.edits}"), 200)
+        print(f"/api/changes poll: {unchanged:.2f} ms with nothing new, {behind:.2f} ms for {args.edits} edits")
+        app.case_store.compact()
+
+
+if __name__ == "__main__":
+    main()
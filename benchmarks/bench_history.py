@@ -0,0 +1,136 @@
+"""Storage and query time of history.History over a year of weekly ingests.
+
+Records --weeks snapshots of --cases cases, changing --churn of them each
+week (status moves, reassignments, new dates), adding and removing a few.
+Checks every query against states kept in memory, then reports the history's
+size next to keeping a full copy per week, and query times.
+
+Usage: python benchmarks/bench_history.py [--cases 100000] [--weeks 52] [--churn 0.03]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec  # noqa: E402
+from bench_query import ASSIGNEES, STATUSES, synthetic_cases  # noqa: E402
+from history import TRACKED_FIELDS, History  # noqa: E402
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def value(case, field):
+    return "" if case.get(field) is None else str(case[field])
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def next_week(rng, cases, churn, serial):
+    cases = [dict(case) for case in cases]
+    for case in rng.sample(cases, int(len(cases) * churn)):
+        field = rng.choice(["status", "status", "assignee", "target_end", "planned_for_week"])
+        if field == "status":
+            case["status"] = rng.choice(STATUSES)
+        elif field == "assignee":
+            case["assignee"] = rng.choice(ASSIGNEES)
+        elif field == "target_end":
+            case["target_end"] = f"{rng.randrange(1, 28)}/Mar/26"
+        else:
+            case["planned_for_week"] = f"W{rng.randrange(1, 53):02d}-2026"
+    removed = set(rng.sample(range(len(cases)), len(cases) // 500))
+    cases = [case for i, case in enumerate(cases) if i not in removed]
+    for n in range(len(removed) + 10):
+        case = dict(rng.choice(cases))
+        case["issue_key"] = f"NEW-{serial}-{n}"
+        cases.append(case)
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--churn", type=float, default=0.03)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cases = synthetic_cases(args.cases)
+    start_date = datetime(2025, 1, 6, 9, tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        history = History(os.path.join(tmp, "history"))
+        weekly = []  # the cases of each week, to check queries against
+        full_copies = 0
+        record_ms = []
+        for week in range(args.weeks):
+            if week:
+                cases = next_week(rng, cases, args.churn, week)
+            weekly.append(cases)
+            full_copies += len(codec.dumps({c["issue_key"]: [c.get(f) for f in TRACKED_FIELDS] for c in cases}))
+            start = time.perf_counter()
+            history.record(cases, taken=start_date + timedelta(weeks=week))
+            record_ms.append((time.perf_counter() - start) * 1000)
+
+        size = directory_size(history.directory)
+        checkpoints = sum(1 for header in history.snapshots() if header["checkpoint"])
+        print(f"{args.cases} cases, {args.weeks} weekly snapshots, {args.churn:.0%} churn")
+        print(f"history: {size / 1024 / 1024:.1f} MB ({checkpoints} checkpoints); "
+              f"a full copy per week: {full_copies / 1024 / 1024:.1f} MB")
+        print(f"record: median {sorted(record_ms)[len(record_ms) // 2]:.0f} ms per snapshot")
+
+        # A fresh reader, as another worker process would be
+        reader = History(history.directory)
+        counts, ms = timed(lambda: reader.weekly_counts(12))
+        expected = [Counter(c["status"] for c in week) for week in weekly[-12:]]
+        assert [{g["status"]: g["count"] for g in point["groups"]} for point in counts] == expected
+        print(f"status counts over 12 weeks:           {ms:8.2f} ms")
+
+        assignee = ASSIGNEES[0]
+        counts, ms = timed(lambda: reader.weekly_counts(12, ["status"], {"assignee": {assignee}}), repeat=1)
+        expected = [Counter(c["status"] for c in week if c["assignee"] == assignee) for week in weekly[-12:]]
+        assert [{g["status"]: g["count"] for g in point["groups"]} for point in counts] == expected
+        print(f"filtered counts over 12 weeks:         {ms:8.2f} ms")
+
+        added, removed, moved = reader.changes_between(args.weeks - 1)
+        before = {c["issue_key"]: c for c in weekly[-2]}
+        after = {c["issue_key"]: c for c in weekly[-1]}
+        assert set(added) == after.keys() - before.keys() and set(removed) == before.keys() - after.keys()
+        assert moved == {(key, field): (value(before[key], field), value(case, field)) for key, case in after.items()
+                         if key in before for field in TRACKED_FIELDS if value(before[key], field) != value(case, field)}
+        _, ms = timed(lambda: reader.changes_between(args.weeks - 1))
+        print(f"what moved since last week:            {ms:8.2f} ms ({len(moved)} field changes)")
+
+        # The issue whose status changed most often
+        moves = Counter()
+        for previous_week, week in zip(weekly, weekly[1:]):
+            previous_status = {c["issue_key"]: c["status"] for c in previous_week}
+            moves.update(c["issue_key"] for c in week if previous_status.get(c["issue_key"], c["status"]) != c["status"])
+        key = moves.most_common(1)[0][0]
+        events, index_ms = timed(lambda: reader.issue_history(key), repeat=1)
+        print(f"per-issue index (first history query): {index_ms:8.2f} ms")
+        statuses = [c["status"] for week in weekly for c in week if c["issue_key"] == key]
+        changes = [e["to"] for e in events if e["event"] == "changed" and e["field"] == "status"]
+        assert changes == [s for previous, s in zip(statuses, statuses[1:]) if s != previous]
+        _, ms = timed(lambda: reader.issue_history(key), repeat=100)
+        print(f"one issue's history ({len(events)} events):      {ms:8.2f} ms")
+
+        state = reader._state_at(args.weeks // 2)
+        assert state == {c["issue_key"]: tuple(value(c, f) for f in TRACKED_FIELDS)
+                         for c in weekly[args.weeks // 2 - 1]}
+        print("every query matches the recorded weeks")
+
+
+if __name__ == "__main__":
+    main()
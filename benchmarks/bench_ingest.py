@@ -0,0 +1,120 @@
+"""Rows/sec of the CSV-to-cases transform against the old iterrows loop.
+
+Usage: python benchmarks/bench_ingest.py [--sizes 10000 100000 1000000] [--skip-legacy-above N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transform import CASE_COLUMNS, build_cases  # noqa: E402
+
+STATUSES = ["Backlog", "In Progress", "READY FOR ACCEPTANCE TEST", "In Review", "Waiting for support", "Done"]
+DATE_FORMATS = ["%d/%b/%y", "%d/%m/%y", "%d-%m-%Y", "%Y-%m-%d"]
+
+
+def synthetic_export(rows, seed=42):
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+
+    def date():
+        if rng.random() < 0.2:
+            return None
+        day = base + timedelta(days=rng.randrange(730))
+        return day.strftime(rng.choice(DATE_FORMATS))
+
+    return pd.DataFrame({
+        "Hierarchy": [rng.choice(["Epic", "Story", "Task"]) for _ in range(rows)],
+        "Issue key": [f"CAR-{i}" for i in range(rows)],
+        "Title": [f"Carrier integration {i} " for i in range(rows)],
+        "Assignee": [rng.choice(["Ann", "Bob", "Chen", None]) for _ in range(rows)],
+        "Target start date": [date() for _ in range(rows)],
+        "Target end date": [date() for _ in range(rows)],
+        "Components": [rng.choice(["Reverse flow (Project)", "Onboarding", None]) for _ in range(rows)],
+        "Issue status": [rng.choice(STATUSES) for _ in range(rows)],
+        "Deliverable Type": [rng.choice(["Deployment", "Integration", None]) for _ in range(rows)],
+    }, columns=list(CASE_COLUMNS))
+
+
+def legacy_build_cases(df, comments_map, planned_week_map):
+    """The per-row loop upload_csv and update_data.py used before transform.py"""
+    def safe(value):
+        if pd.isna(value):
+            return ""
+        return str(value).strip()
+
+    def calculate_week_number(date_str):
+        if not date_str or date_str.strip() == "":
+            return ""
+        for date_format in DATE_FORMATS:
+            try:
+                date_obj = datetime.strptime(date_str.strip(), date_format)
+                return f"W{date_obj.isocalendar()[1]:02d}-{date_obj.year}"
+            except ValueError:
+                continue
+        return ""
+
+    cases = []
+    for _, row in df.iterrows():
+        issue_key = safe(row["Issue key"])
+        target_start = safe(row["Target start date"])
+        case = {
+            "hierarchy": safe(row["Hierarchy"]),
+            "issue_key": issue_key,
+            "title": safe(row["Title"]),
+            "assignee": safe(row["Assignee"]),
+            "target_start": target_start,
+            "target_end": safe(row["Target end date"]),
+            "components": safe(row["Components"]),
+            "status": safe(row["Issue status"]).title(),
+            "deliverable_type": safe(row["Deliverable Type"]),
+        }
+        case["comments"] = comments_map.get(issue_key, "")
+        if issue_key in planned_week_map:
+            case["planned_for_week"] = planned_week_map[issue_key]
+        else:
+            case["planned_for_week"] = calculate_week_number(target_start)
+        cases.append(case)
+    return cases
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-above", type=int, default=100_000,
+                        help="don't time the iterrows loop above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy rows/s':>15} {'vectorized rows/s':>18} {'speedup':>8}")
+    for rows in args.sizes:
+        df = synthetic_export(rows)
+        # Half of the issues already carry a comment and a planned week
+        comments_map = {f"CAR-{i}": "note" for i in range(0, rows, 2)}
+        planned_week_map = {f"CAR-{i}": "W01-2026" for i in range(0, rows, 2)}
+
+        cases, new_time = timed(build_cases, df, comments_map, planned_week_map)
+        new_rate = rows / new_time
+
+        if rows <= args.skip_legacy_above:
+            legacy, legacy_time = timed(legacy_build_cases, df, comments_map, planned_week_map)
+            assert legacy == cases, "vectorized output differs from the legacy loop"
+            legacy_rate = rows / legacy_time
+            print(f"{rows:>10} {legacy_rate:>15,.0f} {new_rate:>18,.0f} {new_rate / legacy_rate:>7.1f}x")
+        else:
+            print(f"{rows:>10} {'skipped':>15} {new_rate:>18,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
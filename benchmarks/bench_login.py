@@ -0,0 +1,187 @@
+"""Data route latency while /login is flooded with wrong passwords.
+
+Serves the app from a threaded werkzeug server in its own process, signs one
+client in, and times /data.json and /api/aggregates for --seconds, first on
+their own, then while --threads clients post wrong passwords for a real
+account as fast as they can. The flood is run against three setups:
+
+  unbounded  every request hashes on its own thread, as /login did before
+             (LOGIN_WORKERS=64, rate limits off)
+  pool       passwords checked on the bounded pool only (rate limits off)
+  default    the pool plus the per-IP and per-username limits
+
+and, as a control, the same clients load the sign-in page instead, which
+costs the server as many requests but no password checks. On a machine
+with few cores any flood slows the data routes; what matters is how much
+the password checks add on top. Fails if, in the default setup, the data
+routes' median or 99th percentile during the flood is more than
+--max-slowdown times the same during the control flood.
+
+Usage: python benchmarks/bench_login.py [--threads 32] [--seconds 5] [--max-slowdown 1.5]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from users import set_password  # noqa: E402
+
+SERVER = """
+import logging, sys
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+from werkzeug.serving import run_simple
+import app
+run_simple("127.0.0.1", int(sys.argv[1]), app.app, threaded=True)
+"""
+
+NO_LIMITS = {"LOGIN_IP_FAILURES": "1000000", "LOGIN_USER_FAILURES": "1000000"}
+SETUPS = [
+    ("control", "GET", {}),
+    ("unbounded", "POST", {"LOGIN_WORKERS": "64", "LOGIN_QUEUE": "0", **NO_LIMITS}),
+    ("pool", "POST", NO_LIMITS),
+    ("default", "POST", {}),
+]
+DATA_ROUTES = ["/data.json", "/api/aggregates"]
+
+
+def request(port, method, path, body=None, cookie=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"} if body else {}
+    if cookie:
+        headers["Cookie"] = cookie
+    connection.request(method, path, body, headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            request(port, "GET", "/login")
+            return server, port
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("the server did not start")
+
+
+def sign_in(port, username, password):
+    response = request(port, "POST", "/login", urlencode({"username": username, "password": password}))
+    assert response.status == 302, f"sign-in failed with {response.status}"
+    return response.getheader("Set-Cookie").split(";")[0]
+
+
+def time_data_routes(port, cookie, seconds):
+    samples = {path: [] for path in DATA_ROUTES}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for path in DATA_ROUTES:
+            start = time.perf_counter()
+            response = request(port, "GET", path, cookie=cookie)
+            samples[path].append((time.perf_counter() - start) * 1000)
+            assert response.status == 200, (path, response.status)
+    return samples
+
+
+def flood(port, method, threads, seconds, results):
+    """Post wrong passwords (or GET the page) from threads clients; put the count of each status on results"""
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    body = urlencode({"username": "bob", "password": "wrong"}) if method == "POST" else None
+
+    def client():
+        while time.monotonic() < deadline:
+            try:
+                counts[request(port, method, "/login", body).status] += 1
+            except OSError:
+                counts["error"] += 1
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(dict(counts))
+
+
+def run_setup(method, env, args):
+    server, port = start_server(env)
+    try:
+        cookie = sign_in(port, "alice", "alice-password")
+        time_data_routes(port, cookie, 0.5)  # warm up
+        quiet = time_data_routes(port, cookie, args.seconds)
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        flooder = context.Process(target=flood, args=(port, method, args.threads, args.seconds + 1, results))
+        flooder.start()
+        time.sleep(0.5)  # let the flood build up
+        busy = time_data_routes(port, cookie, args.seconds)
+        outcomes = results.get()
+        flooder.join()
+        return quiet, busy, outcomes
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        users_file = os.path.join(tmp, "users.json")
+        set_password(users_file, "alice", "alice-password")
+        set_password(users_file, "bob", "bob-password")
+
+        print(f"{os.cpu_count()} CPU core(s), {args.threads} flooding clients")
+        print(f"{'setup':<10} {'route':<16} {'quiet p50':>10} {'flood p50':>10} {'flood p99':>10}  login responses")
+        flood_latency = {}
+        for name, method, overrides in SETUPS:
+            env = dict(os.environ, USERS_FILE=users_file, LIVE_UPDATES="false", **overrides)
+            quiet, busy, outcomes = run_setup(method, env, args)
+            logins = ", ".join(f"{count} × {status}" for status, count in sorted(outcomes.items(), key=str))
+            for path in DATA_ROUTES:
+                quiet_p50 = statistics.median(quiet[path])
+                busy_p50 = statistics.median(busy[path])
+                busy_p99 = statistics.quantiles(busy[path], n=100)[98] if len(busy[path]) > 1 else busy_p50
+                flood_latency[name, path] = (busy_p50, busy_p99)
+                print(f"{name:<10} {path:<16} {quiet_p50:>8.1f}ms {busy_p50:>8.1f}ms {busy_p99:>8.1f}ms  {logins}")
+                logins = ""
+
+    too_slow = [path for path in DATA_ROUTES
+                if any(flooded > args.max_slowdown * control for flooded, control
+                       in zip(flood_latency["default", path], flood_latency["control", path]))]
+    assert not too_slow, f"{', '.join(too_slow)} over {args.max_slowdown:g}× slower than under the control flood"
+    print(f"during a login flood, data routes stay within {args.max_slowdown:g}× of their latency "
+          "under an equal flood of page requests")
+
+
+if __name__ == "__main__":
+    main()
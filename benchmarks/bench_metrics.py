@@ -0,0 +1,84 @@
+"""Per-request cost of the metrics hooks, and of a request through the Flask app with and without them.
+
+The Flask requests alternate between the two apps over several rounds and
+the fastest round of each counts, so the difference is not lost in noise.
+
+Usage: python benchmarks/bench_metrics.py [--requests 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+
+
+def per_call_us(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def one_request():
+    metrics.start_request()
+    metrics.record(metrics.LOCK_WAIT_SECONDS, 0.0001, timing="lock")
+    metrics.record_write(0.002, 4096)
+    metrics.finish_request("get_cases", 0, 1_000_000)
+
+
+def one_request_with_header():
+    metrics.start_request()
+    metrics.record(metrics.LOCK_WAIT_SECONDS, 0.0001, timing="lock")
+    metrics.record_write(0.002, 4096)
+    metrics.finish_request("get_cases", 0, 1_000_000, server_timing=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    count = args.requests
+
+    print(f"{'step':<44} {'µs per call':>12}")
+    print(f"{'Histogram.observe':<44} {per_call_us(lambda: metrics.WRITE_SECONDS.observe(0.003), count):>12.2f}")
+    print(f"{'start_request + 2 records + finish_request':<44} {per_call_us(one_request, count):>12.2f}")
+    print(f"{'  the same, with the Server-Timing header':<44} {per_call_us(one_request_with_header, count):>12.2f}")
+
+    from flask import Flask
+
+    def app_with(hooks):
+        app = Flask(__name__)
+
+        @app.route("/ping")
+        def ping():
+            return "ok"
+
+        if hooks:
+            @app.before_request
+            def start():
+                metrics.start_request()
+
+            @app.after_request
+            def finish(response):
+                timing = metrics.finish_request("ping", 0, response.calculate_content_length() or 0)
+                if timing:
+                    response.headers["Server-Timing"] = timing
+                return response
+        return app.test_client()
+
+    plain = app_with(False)
+    hooked = app_with(True)
+    plain_us = hooked_us = float("inf")
+    for _ in range(10):
+        plain_us = min(plain_us, per_call_us(lambda: plain.get("/ping"), count // 50))
+        hooked_us = min(hooked_us, per_call_us(lambda: hooked.get("/ping"), count // 50))
+    print(f"{'Flask request, no hooks':<44} {plain_us:>12.2f}")
+    print(f"{'Flask request, with hooks':<44} {hooked_us:>12.2f}  ({hooked_us - plain_us:+.2f})")
+    print(f"{'render() of the resulting metrics':<44} {per_call_us(metrics.render, 1000):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
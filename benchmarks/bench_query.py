@@ -0,0 +1,143 @@
+"""/api/cases query latency, checked against a line-by-line port of applyFilters().
+
+Usage: python benchmarks/bench_query.py [--cases 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from functools import cmp_to_key
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from case_query import CaseIndex, WEEK_PATTERN, _compare_values  # noqa: E402
+from dates import INVALID_DATE, parse_jira_date  # noqa: E402
+
+STATUSES = ["Backlog", "In Progress", "Ready For Acceptance Test", "In Review", "Done"]
+ASSIGNEES = ["Ann Lee", "Bob Marsh", "Chen Wu", "Dana Kim", ""]
+WORDS = ["carrier", "reverse", "flow", "dhl", "germany", "croatia", "label", "return", "edi", "2025"]
+
+
+def synthetic_cases(count, seed=3):
+    rng = random.Random(seed)
+    base = date(2025, 6, 1)
+
+    def jira_date():
+        if rng.random() < 0.25:
+            return ""
+        return (base + timedelta(days=rng.randrange(400))).strftime("%d/%b/%y")
+
+    return [{
+        "issue_key": f"CAR-{10000 + i}",
+        "title": " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+        "assignee": rng.choice(ASSIGNEES),
+        "status": rng.choices(STATUSES, weights=[40, 30, 20, 5, 5])[0],
+        "deliverable_type": rng.choice(["Deployment", "Integration", ""]),
+        "target_start": jira_date(),
+        "target_end": jira_date(),
+        "planned_for_week": rng.choice(["", "W01-2026", "W44-2025", "W10-2026"]),
+        "comments": "",
+    } for i in range(count)]
+
+
+def reference_query(cases, search="", statuses=(), assignees=(), date_start=None, date_end=None,
+                    no_date=False, sort=None, ascending=True):
+    """applyFilters() + renderTable()'s sort, one case at a time"""
+    matched = []
+    for c in cases:
+        ok = (not search or search in c["issue_key"].lower() or search in c["title"].lower())
+        ok = ok and (not statuses or c["status"] in statuses)
+        ok = ok and (not assignees or c["assignee"] in assignees)
+        parsed = parse_jira_date(c["target_end"])
+        if no_date:
+            ok = ok and parsed is None
+        elif date_start or date_end:
+            if parsed is None:
+                ok = False
+            elif parsed != INVALID_DATE:
+                ok = ok and not (date_start and parsed < date_start) and not (date_end and parsed > date_end)
+        if ok:
+            matched.append(c)
+
+    if sort:
+        if sort in ("target_start", "target_end"):
+            def key(c):
+                parsed = parse_jira_date(c[sort])
+                return 0 if parsed in (None, INVALID_DATE) else parsed.toordinal()
+        elif sort == "planned_for_week":
+            def key(c):
+                match = WEEK_PATTERN.search(c[sort])
+                return (int(match.group(2)), int(match.group(1))) if match else (0, 0)
+        else:
+            compare = _compare_values(sort)
+            key = cmp_to_key(lambda a, b: compare(a[sort], b[sort]))
+        if ascending:
+            matched.sort(key=key)
+        else:
+            # Descending comparator with a stable sort keeps ties in dataset order
+            matched = sorted(matched, key=key, reverse=True)
+    return matched
+
+
+def random_query(rng):
+    query = {}
+    if rng.random() < 0.6:
+        query["search"] = rng.choice(WORDS)[:rng.randint(1, 5)]
+    if rng.random() < 0.4:
+        query["statuses"] = set(rng.sample(STATUSES, rng.randint(1, 2)))
+    if rng.random() < 0.3:
+        query["assignees"] = set(rng.sample(ASSIGNEES, rng.randint(1, 2)))
+    if rng.random() < 0.1:
+        query["no_date"] = True
+    elif rng.random() < 0.4:
+        start = date(2025, 6, 1) + timedelta(days=rng.randrange(300))
+        query["date_start"] = start
+        query["date_end"] = start + timedelta(days=rng.randrange(120))
+    if rng.random() < 0.7:
+        query["sort"] = rng.choice(["issue_key", "title", "status", "assignee", "target_end", "planned_for_week"])
+        query["ascending"] = rng.random() < 0.5
+    return query
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--check", type=int, default=20, help="queries compared against the reference port")
+    args = parser.parse_args()
+
+    cases = synthetic_cases(args.cases)
+    start = time.perf_counter()
+    index = CaseIndex(cases)
+    print(f"index build: {(time.perf_counter() - start) * 1000:.0f} ms for {args.cases} cases")
+
+    rng = random.Random(11)
+    for _ in range(args.check):
+        query = random_query(rng)
+        expected = reference_query(cases, **query)
+        result = index.query(limit=len(cases), **query)
+        assert result["matched"] == len(expected), query
+        assert [c["issue_key"] for c in result["cases"]] == [c["issue_key"] for c in expected], query
+    print(f"{args.check} random queries match the applyFilters() port")
+
+    start = time.perf_counter()
+    for sort in ("issue_key", "title", "status", "assignee", "target_end", "planned_for_week"):
+        index.query(sort=sort, limit=0)  # sort orders are built on first use
+    print(f"first sort on six columns: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    samples = []
+    for _ in range(args.queries):
+        query = random_query(rng)
+        start = time.perf_counter()
+        index.query(limit=100, **query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"query p50 {statistics.median(samples) * 1000:.2f} ms, "
+          f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:.2f} ms over {args.queries} queries")
+
+
+if __name__ == "__main__":
+    main()
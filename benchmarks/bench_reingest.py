@@ -0,0 +1,127 @@
+"""Re-uploading an export: full rebuild versus the incremental diff in ingest.py.
+
+While each re-upload runs, a second thread reads the store the way
+/data.json does and reports the longest a read took.
+
+Usage: python benchmarks/bench_reingest.py [--rows 100000] [--changed 0.02]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec  # noqa: E402
+from bench_ingest import STATUSES, synthetic_export  # noqa: E402
+from case_store import CaseStore  # noqa: E402
+from http_cache import DocumentCache  # noqa: E402
+from ingest import ingest_export  # noqa: E402
+from transform import build_cases, read_export, summarize  # noqa: E402
+
+
+def full_rebuild(store, path):
+    """What /upload did before ingest.py: rebuild every case and rewrite both files"""
+    comments_map, planned_week_map = store.comment_maps()
+    cases = build_cases(read_export(path), comments_map, planned_week_map)
+    store.replace(cases, summarize(cases))
+
+
+class LongestRead:
+    """While the block runs, the longest a /data.json read of the store took on another thread"""
+
+    def __init__(self, store):
+        self.store = store
+        # As app.py serves it: rendered once per revision
+        self.documents = DocumentCache(lambda cases: codec.dumps(store.summary()))
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read)
+
+    def _read(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            self.documents.document_for(*self.store.snapshot())
+            self.seconds = max(self.seconds, time.perf_counter() - start)
+            time.sleep(0.01)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def __str__(self):
+        return f"longest read {self.seconds * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--changed", type=float, default=0.02, help="fraction of issues changed in the re-export")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        export = synthetic_export(args.rows)
+        export.to_csv(path, index=False)
+        store = CaseStore(os.path.join(tmp, "cases.json"))
+        ingest_export(store, path)
+
+        start = time.perf_counter()
+        full_rebuild(store, path)
+        rebuild = time.perf_counter() - start
+        print(f"full rebuild:        {rebuild:.2f}s for {args.rows} rows")
+
+        start = time.perf_counter()
+        with LongestRead(store) as read:
+            changes = ingest_export(store, path)
+        unchanged = time.perf_counter() - start
+        assert not changes["changed"] and not changes["rebuilt"], changes
+        print(f"unchanged re-upload: {unchanged:.2f}s ({unchanged / rebuild:.0%} of a rebuild), {read}")
+
+        step = max(1, int(1 / args.changed))
+        export.loc[::step, "Issue status"] = [STATUSES[i % len(STATUSES)] for i in range(len(export.loc[::step]))]
+        export.loc[::step, "Title"] = export.loc[::step, "Title"] + "(edited)"
+        export.to_csv(path, index=False)
+        start = time.perf_counter()
+        with LongestRead(store) as read:
+            changes = ingest_export(store, path)
+        changed = time.perf_counter() - start
+        how = "rebuilt" if changes["rebuilt"] else "as field edits"
+        print(f"{changes['changed']} issues changed, {how}: {changed:.2f}s ({changed / rebuild:.0%} of a rebuild), "
+              f"{read}")
+
+        expected = build_cases(read_export(path), *store.comment_maps())
+        assert CaseStore(store.path).cases() == expected
+        print("store matches a full rebuild")
+
+        # Issues closed out of the export and new ones appended, as in a typical week
+        turnover = synthetic_export(args.rows + len(export.loc[::step]), seed=7).iloc[args.rows:]
+        export = pd.concat([export.drop(export.index[1::step]), turnover])
+        export.to_csv(path, index=False)
+        start = time.perf_counter()
+        with LongestRead(store) as read:
+            changes = ingest_export(store, path)
+        turned = time.perf_counter() - start
+        how = "rebuilt" if changes["rebuilt"] else "in place"
+        print(f"{changes['added']} issues added, {changes['removed']} removed, {how}: {turned:.2f}s "
+              f"({turned / rebuild:.0%} of a rebuild), {read}")
+
+        def by_key(cases):
+            return {case["issue_key"]: case for case in cases}
+
+        expected = build_cases(read_export(path), *store.comment_maps())
+        assert by_key(CaseStore(store.path).cases()) == by_key(expected)
+        print("store matches a full rebuild, by issue key")
+        store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Dashboard load of /cases.json and /data.json: first download versus an ETag revalidation.
+
+Usage: python benchmarks/bench_responses.py [--cases 100000] [--requests 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_query import synthetic_cases  # noqa: E402
+
+
+def timed(client, url, headers, requests):
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        times.append(time.perf_counter() - start)
+    return response, statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import app
+        from case_store import CaseStore
+        from transform import summarize
+
+        cases = synthetic_cases(args.cases)
+        app.case_store = CaseStore(os.path.join(tmp, "cases.json"))
+        app.case_store.replace(cases, summarize(cases))
+        client = app.app.test_client()
+        with client.session_transaction() as session:
+            session["logged_in"] = True
+
+        for url in ("/cases.json", "/data.json"):
+            start = time.perf_counter()
+            first = client.get(url, headers={"Accept-Encoding": "gzip"})
+            build = (time.perf_counter() - start) * 1000
+            plain, plain_ms = timed(client, url, {}, args.requests)
+            gzipped, gzip_ms = timed(client, url, {"Accept-Encoding": "gzip"}, args.requests)
+            revalidated, revalidate_ms = timed(
+                client, url, {"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]}, args.requests)
+            assert revalidated.status_code == 304 and not revalidated.data
+            print(f"{url}: first request {build:.0f} ms (serialize + compress)")
+            print(f"  identity {len(plain.data) / 1024:,.0f} KB in {plain_ms:.1f} ms, "
+                  f"{gzipped.headers['Content-Encoding']} {len(gzipped.data) / 1024:,.0f} KB in {gzip_ms:.1f} ms, "
+                  f"304 in {revalidate_ms:.1f} ms")
+        app.case_store.compact()
+
+
+if __name__ == "__main__":
+    main()
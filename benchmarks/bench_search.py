@@ -0,0 +1,134 @@
+"""Full-text search latency (search_index.py), checked against a case-by-case scan.
+
+Builds a synthetic export (jira_export.py) of --cases issues, a share of
+them with dashboard comments, then times building the index, a set of
+typical queries (whole words, prefixes while typing, issue keys, several
+terms) and /api/cases pages ranked by them. Finally saves comments through
+a case store and checks each one is searchable straight away.
+
+Usage: python benchmarks/bench_search.py [--cases 100000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from case_query import CaseIndex  # noqa: E402
+from case_store import CaseStore  # noqa: E402
+from jira_export import add_existing_edits, write_export  # noqa: E402
+from search_index import FIELD_WEIGHTS, MIN_PREFIX, PREFIX_FACTOR, WORD_PATTERN, SearchIndex, _tokens, rank  # noqa: E402
+from transform import build_cases, read_export, summarize  # noqa: E402
+
+QUERIES = ["dhl", "germany", "ger", "g", "croatia reverse", "reverse flow project", "car-1234", "CAR-10042",
+           "sftp", "waiting carrier", "label printing", "(project)", "qa", "postnl 1", "nothing-like-this"]
+
+
+def reference_search(cases, query):
+    """search_index.SearchIndex.search(), one case at a time"""
+    fields = [{field: _tokens(field, case.get(field)) for field in FIELD_WEIGHTS} for case in cases]
+    vocabulary = set().union(*(tokens for case_fields in fields for tokens in case_fields.values()))
+
+    def word_scores(term):
+        scores = {}
+        for position, case_fields in enumerate(fields):
+            best = 0
+            for token in set().union(*case_fields.values()):
+                if token == term:
+                    factor = 1.0
+                elif len(term) >= MIN_PREFIX and token.startswith(term):
+                    factor = PREFIX_FACTOR
+                else:
+                    continue
+                weight = sum(FIELD_WEIGHTS[field] for field, tokens in case_fields.items() if token in tokens)
+                best = max(best, weight * factor)
+            if best:
+                scores[position] = best
+        return scores
+
+    def term_scores(term):
+        known = any(token == term or (len(term) >= MIN_PREFIX and token.startswith(term)) for token in vocabulary)
+        if known or WORD_PATTERN.fullmatch(term):
+            return word_scores(term)
+        words = WORD_PATTERN.findall(term)
+        if not words:
+            return {}
+        return intersect([word_scores(word) for word in words])
+
+    def intersect(all_scores):
+        common = set.intersection(*(set(scores) for scores in all_scores))
+        return {position: sum(scores[position] for scores in all_scores) for position in common}
+
+    terms = set(query.lower().split())
+    return intersect([term_scores(term) for term in terms]) if terms else {}
+
+
+def synthetic_cases(count, directory):
+    path = os.path.join(directory, "export.csv")
+    write_export(path, count, seed=7)
+    return add_existing_edits(build_cases(read_export(path), {}, {}), 0.3, seed=7)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = synthetic_cases(args.cases, tmp)
+        index, build_ms, _ = timed(lambda: SearchIndex(cases), 1)
+        print(f"{len(cases)} cases, index built in {build_ms:.0f} ms, {len(index._postings)} distinct words")
+
+        # The scan is slow, so it checks every query against the first few thousand cases only
+        sample = cases[:2000]
+        sample_index = SearchIndex(sample)
+        for query in QUERIES:
+            assert sample_index.search(query) == reference_search(sample, query), query
+
+        def search(query):
+            # Each query as if typed for the first time, not from the index's term cache
+            index._term_cache.clear()
+            return index.search(query)
+
+        table = CaseIndex(cases)
+        print(f"{'query':<24} {'matched':>8} {'search p50':>11} {'max':>8} {'page p50':>9}")
+        for query in QUERIES:
+            scores, p50, worst = timed(lambda: search(query), args.repeat)
+            top = rank(scores, 50)
+            page, page_p50, _ = timed(lambda: table.query(text_scores=search(query), limit=50), args.repeat)
+            assert [c["issue_key"] for c in page["cases"]] == [cases[i]["issue_key"] for i in top], query
+            print(f"{query:<24} {len(scores):>8} {p50:>9.2f}ms {worst:>6.2f}ms {page_p50:>7.2f}ms")
+
+        # A saved comment is searchable by the very next request
+        store = CaseStore(os.path.join(tmp, "cases.json"))
+        store.replace(cases, summarize(cases))
+        store.search_snapshot()
+        save_ms = []
+        for n, case in enumerate(cases[:200:10]):
+            word = f"zebra{n}x"
+            start = time.perf_counter()
+            store.update_field(case["issue_key"], "comments", f"Handed over {word}")
+            save_ms.append((time.perf_counter() - start) * 1000)
+            _, current, search_index = store.search_snapshot()
+            assert [current[i]["issue_key"] for i in rank(search_index.search(word))] == [case["issue_key"]]
+            assert not search_index.search(f"zebra{n - 1}x"), "the previous comment's word should be gone"
+            store.update_field(case["issue_key"], "comments", "")
+        print(f"comment save incl. index update: median {statistics.median(save_ms):.2f} ms")
+        print("every query matches the scan; saved comments are searchable immediately")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cold start of the Flask app: import time and time to the first response per route.
+
+Each sample is a fresh interpreter that imports app (as wsgi.py does) and
+serves one request through the test client, so every run pays the imports
+a reloaded or newly scaled worker pays. Also reports whether pandas and
+numpy were loaded, which read-only routes should not need. Fails if the
+median import + first read exceeds --budget-ms.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--budget-ms 400]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+if {login}:
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+response = client.get({path!r})
+response.get_data()
+done = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{"import_ms": (imported - start) * 1000, "first_request_ms": (done - imported) * 1000,
+                  "pandas": "pandas" in sys.modules, "numpy": "numpy" in sys.modules}}))
+"""
+
+ROUTES = [("/login", False), ("/cases.json", True), ("/data.json", True), ("/api/cases", True)]
+
+
+def sample(path, login):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD.format(path=path, login=login)], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=400)
+    args = parser.parse_args()
+
+    print(f"{'route':<14} {'import':>9} {'1st request':>12} {'process':>9}  loaded")
+    over_budget = []
+    for path, login in ROUTES:
+        samples = [sample(path, login) for _ in range(args.runs)]
+        import_ms = statistics.median(s["import_ms"] for s in samples)
+        request_ms = statistics.median(s["first_request_ms"] for s in samples)
+        process_ms = statistics.median(s["process_ms"] for s in samples)
+        loaded = [name for name in ("pandas", "numpy") if any(s[name] for s in samples)]
+        print(f"{path:<14} {import_ms:>7.0f}ms {request_ms:>10.0f}ms {process_ms:>7.0f}ms  {', '.join(loaded) or '-'}")
+        if path != "/api/cases" and import_ms + request_ms > args.budget_ms:
+            over_budget.append(path)
+
+    assert not over_budget, f"cold start over {args.budget_ms:.0f} ms for {', '.join(over_budget)}"
+    print(f"read-only routes start within {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Synthetic Jira exports shaped like data.csv, for benchmarks.
+
+Rows have the same 40 columns as a real export. Statuses, assignees and
+components are skewed the way real boards are (a few assignees own most
+issues; most issues sit in Backlog or Done), and target dates use one
+dominant format per export with a share of the other formats
+calculate_week_number accepts, plus blanks. Output is deterministic for a
+given seed; --changed rewrites the status of that share of rows, giving a
+second export to re-ingest against the first.
+
+Usage: python benchmarks/jira_export.py --rows 100000 --out export.csv [--seed 1] [--changed 0.05]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dates import DATE_FORMATS, calculate_week_number  # noqa: E402
+
+HEADER = [
+    "Hierarchy", "Title", "Project", "Releases", "Team", "Assignee", "Sprint",
+    "Target start date (roll-up)", "Target start date", "Target end date (roll-up)", "Target end date",
+    "Due date", "Estimates (d)", "Parent", "Priority", "Labels", "Components", "Issue key", "Issue status",
+    "Progress (%)", "Progress completed (d)", "Progress remaining (d)", "Progress (%) issue count (IC)",
+    "To do IC", "In progress IC", "Done IC", "Total IC", "Deliverable Type", "Country", "Assignor",
+    "Business Owner", "Question 98 - Free Text (single line)", "Question 97 - Free Text (single line)",
+    "Complexity", "Decision Date", "Planned Sign-off Date", "Planned Submission Date",
+    "Question 68 - Date Picker", "Question 85 - Date Picker", "Status Updated",
+]
+
+STATUSES = {"Backlog": 35, "In Progress": 18, "READY FOR ACCEPTANCE TEST": 7, "In Review": 6,
+            "Waiting for support": 4, "Done": 30}
+# Zipf-like: the first few assignees own most of the issues
+ASSIGNEES = [f"{first} {last}" for first, last in zip(
+    ["Mansi", "Kritika", "Ann", "Bob", "Chen", "Dana", "Erik", "Fatima", "Goran", "Hana", "Ivan", "Jun"],
+    ["Shrirame", "Agrawal", "Lee", "Marsh", "Wu", "Kim", "Berg", "Haddad", "Petrov", "Novak", "Horvat", "Sato"])]
+ASSIGNEE_WEIGHTS = [1 / (rank + 1) for rank in range(len(ASSIGNEES))] + [0.4]  # + unassigned
+COMPONENTS = {"Reverse flow (Project)": 30, "Onboarding": 20, "Label printing": 8, "": 42}
+DELIVERABLE_TYPES = {"Deployment": 55, "Integration": 25, "Other": 20}
+COUNTRIES = ["Germany", "Croatia", "Poland", "France", "Spain", "Italy", "Netherlands", "Sweden", "United Kingdom"]
+CARRIERS = ["DHL DE national", "DPD", "GLS", "UPS", "PostNL", "Hrvatska posta", "InPost", "Colissimo", "Bring"]
+LABELS = ["COM_SFTP, EDI_Centiro, Status_Centiro", "API_REST", "COM_SFTP", ""]
+PRIORITIES = {"Low": 50, "Medium": 35, "High": 12, "Highest": 3}
+
+# Share of rows whose target dates are blank, or use a format other than the export's dominant one
+BLANK_DATES = 0.15
+OTHER_FORMAT_DATES = 0.1
+
+COMMENTS = ["Waiting for carrier credentials", "Label spec received, testing in QA",
+            "Blocked: SFTP access pending", "Go-live agreed with the business owner", "Moved after carrier feedback"]
+
+
+def _weighted(rng, weights):
+    population, cum_weights = list(weights), []
+    total = 0
+    for weight in weights.values():
+        total += weight
+        cum_weights.append(total)
+    return lambda: rng.choices(population, cum_weights=cum_weights)[0]
+
+
+def export_rows(rows, seed=1, changed=0.0):
+    """Yield the export's rows (lists of 40 strings/numbers), header excluded"""
+    rng = random.Random(seed)
+    status = _weighted(rng, STATUSES)
+    component = _weighted(rng, COMPONENTS)
+    deliverable_type = _weighted(rng, DELIVERABLE_TYPES)
+    priority = _weighted(rng, PRIORITIES)
+    base = date(2025, 1, 1)
+    dominant, others = DATE_FORMATS[0], DATE_FORMATS[1:]
+
+    def target_date():
+        roll = rng.random()
+        if roll < BLANK_DATES:
+            return ""
+        day = base + timedelta(days=rng.randrange(730))
+        return day.strftime(rng.choice(others) if roll < BLANK_DATES + OTHER_FORMAT_DATES else dominant)
+
+    # Chosen from a separate generator so the changed export matches the original everywhere else
+    changed_rng = random.Random(seed + 1)
+    for i in range(rows):
+        country = rng.choice(COUNTRIES)
+        row_status = status()
+        if changed and changed_rng.random() < changed:
+            row_status = "In Progress" if row_status != "In Progress" else "In Review"
+        total_ic = rng.randrange(1, 6)
+        done_ic = total_ic if row_status == "Done" else rng.randrange(total_ic)
+        yield [
+            rng.choice(["Epic", "Epic", "Epic", "Story"]),
+            f"{rng.choice(CARRIERS)} {rng.randrange(10000, 99999)} - {country}",
+            "Carrier Integration", "", "",
+            rng.choices(ASSIGNEES + [""], weights=ASSIGNEE_WEIGHTS)[0],
+            "", "", target_date(), "", target_date(), "", "", "",
+            priority(), rng.choice(LABELS), component(), f"CAR-{10000 + i}", row_status,
+            round(100 * done_ic / total_ic), 0, 0, 0,
+            total_ic - done_ic, 0, done_ic, total_ic,
+            deliverable_type(), country, "", "Christopher Rebelo",
+            "", "", rng.choice(["", "Low", "Medium", "High"]), "", "", "", "", "", "",
+        ]
+
+
+def write_export(path, rows, seed=1, changed=0.0):
+    """Write a synthetic export to path, quoted the way Jira quotes its CSVs"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(HEADER)
+        writer.writerows(export_rows(rows, seed, changed))
+
+
+def add_existing_edits(cases, share, seed=1):
+    """Give share of the cases a dashboard comment and planned week, as if colleagues had edited them"""
+    rng = random.Random(seed)
+    for case in cases:
+        if rng.random() < share:
+            case["comments"] = rng.choice(COMMENTS)
+            case["planned_for_week"] = calculate_week_number(case.get("target_end", "")) or "W10-2026"
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--changed", type=float, default=0.0, help="share of rows with a different status")
+    args = parser.parse_args()
+    write_export(args.out, args.rows, args.seed, args.changed)
+    print(f"wrote {args.rows} rows x {len(HEADER)} columns to {args.out} "
+          f"({os.path.getsize(args.out) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Peak RSS of the chunked (streaming) ingest on a large ~40-column export.
+
+Writes a synthetic Jira export with the dashboard's nine columns plus filler
+columns and ingests it into an empty store in a child process, then ingests
+a re-export with different values into the now populated store in another
+child, as the weekly upload does. Fails if either child's peak resident
+memory exceeds the budget. Peak memory should depend on --chunk-rows, not
+on --rows.
+
+Usage: python benchmarks/memory_ingest.py [--rows 1000000] [--budget-mb 256] [--backend json]
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transform import CASE_COLUMNS  # noqa: E402
+
+EXPORT_COLUMNS = 40
+STATUSES = ["Backlog", "In Progress", "READY FOR ACCEPTANCE TEST", "In Review", "Done"]
+
+
+def write_export(path, rows, seed=7):
+    rng = random.Random(seed)
+    base = date(2025, 1, 1)
+    filler = [f"Custom field ({i})" for i in range(EXPORT_COLUMNS - len(CASE_COLUMNS))]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(CASE_COLUMNS) + filler)
+        for i in range(rows):
+            start = (base + timedelta(days=rng.randrange(700))).strftime("%d/%b/%y")
+            end = "" if rng.random() < 0.2 else (base + timedelta(days=rng.randrange(700))).strftime("%d/%b/%y")
+            writer.writerow([
+                "Epic", f"CAR-{i}", f"Carrier integration {i}", rng.choice(["Ann Lee", "Bob Marsh", ""]),
+                start, end, rng.choice(["Reverse flow (Project)", "Onboarding", ""]), rng.choice(STATUSES),
+                rng.choice(["Deployment", "Integration"]),
+            ] + ["x" * rng.randrange(12) for _ in filler])
+
+
+def child(directory, path, backend, chunk_rows, queue):
+    import ingest
+    from case_store import open_case_store
+
+    store = open_case_store(directory, backend)
+    start = time.perf_counter()
+    changes = ingest.stream_export(store, path, chunksize=chunk_rows)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((changes, elapsed, peak_kb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        start = time.perf_counter()
+        write_export(path, args.rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"wrote {args.rows} rows x {EXPORT_COLUMNS} columns ({size_mb:.0f} MB) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        reexport = os.path.join(tmp, "data-next.csv")
+        write_export(reexport, args.rows, seed=8)
+
+        context = multiprocessing.get_context("spawn")
+        for label, export in [("an empty", path), ("the populated", reexport)]:
+            # A fresh process each, so neither the export writer nor the first ingest counts towards the peak
+            queue = context.Queue()
+            proc = context.Process(target=child, args=(tmp, export, args.backend, args.chunk_rows, queue))
+            proc.start()
+            changes, elapsed, peak_kb = queue.get()
+            proc.join()
+
+            # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+            peak_mb = peak_kb / 1024 / (1024 if sys.platform == "darwin" else 1)
+            print(f"streamed {changes['total_cases']} cases into {label} {args.backend} store in {elapsed:.1f}s "
+                  f"({changes['total_cases'] / elapsed:,.0f} rows/s), peak RSS {peak_mb:.0f} MB")
+            assert changes["total_cases"] == args.rows, changes
+            assert peak_mb < args.budget_mb, f"peak RSS {peak_mb:.0f} MB is over the {args.budget_mb} MB budget"
+        assert changes["added"] == changes["removed"] == 0, changes
+        print(f"both within the {args.budget_mb} MB budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Multi-process stress test for concurrent case edits.
+
+Several processes, each with several threads, fire thousands of comment and
+week edits at one cases.json through their own CaseStore, as separate WSGI
+workers would, while a small compaction threshold forces frequent snapshot
+rewrites. Afterwards a fresh store must see every edit, and the revision
+must count every edit exactly once.
+
+Usage: python benchmarks/stress_edits.py [--processes 4] [--threads 8] [--edits 100]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from case_store import CaseStore, StaleWriteError  # noqa: E402
+
+
+def worker(path, proc, threads, edits, compact_bytes):
+    store = CaseStore(path, compact_bytes=compact_bytes, compact_interval=0.5)
+
+    def run(thread):
+        for i in range(edits):
+            key = f"CAR-{proc}-{thread}-{i}"
+            store.update_field(key, "comments", f"comment {proc}/{thread}/{i}")
+            store.update_field(key, "planned_for_week", f"W{i % 52 + 1:02d}-2026")
+            if i % 50 == 0:
+                store.cases()  # readers race the writers too
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    store.compact()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--edits", type=int, default=100, help="cases edited per thread (two edits each)")
+    parser.add_argument("--compact-bytes", type=int, default=64 * 1024,
+                        help="journal size that triggers compaction; small values stress snapshot rewrites")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cases.json")
+        cases = [{"issue_key": f"CAR-{p}-{t}-{i}", "comments": "", "planned_for_week": ""}
+                 for p in range(args.processes) for t in range(args.threads) for i in range(args.edits)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cases, f)
+
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=worker, args=(path, p, args.threads, args.edits, args.compact_bytes))
+                 for p in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            assert p.exitcode == 0, f"worker exited with {p.exitcode}"
+        elapsed = time.perf_counter() - start
+
+        total = len(cases) * 2
+        store = CaseStore(path)
+        lost = [c["issue_key"] for c in store.cases()
+                if c["comments"] != "comment {}/{}/{}".format(*c["issue_key"].split("-")[1:])
+                or not c["planned_for_week"]]
+        assert not lost, f"{len(lost)} edits lost, e.g. {lost[:5]}"
+        assert store.revision == total, f"revision {store.revision} != {total} edits"
+
+        # Optimistic versioning: an edit based on a revision before the last change is refused
+        key = cases[0]["issue_key"]
+        try:
+            store.update_field(key, "comments", "stale", base_revision=0)
+        except StaleWriteError:
+            pass
+        else:
+            raise AssertionError("stale write was accepted")
+
+        print(f"{total} edits from {args.processes} processes x {args.threads} threads in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f} edits/s), none lost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Benchmark suite: ingest, uploads, edits and reads at several export sizes.
+
+For each size, a synthetic export (jira_export.py) is ingested into a seed
+store, with a share of cases carrying dashboard comments and planned weeks.
+Every scenario then runs in a fresh process against its own copy of that
+store, so each reports its own peak RSS:
+
+- update_data_rebuild: python update_data.py on an empty directory
+- update_data_diff:    python update_data.py with an export where some statuses changed
+- upload:              POST /upload of the changed export (alternating with the original), until the job is done
+- edit_single:         POST /update_comment, one edit per request
+- edit_batch:          POST /api/edits, --batch edits per request
+- read_cases:          GET /cases.json?layout=columns (gzip), unchanged data
+- read_cases_edited:   GET /cases.json?layout=columns (gzip), after an edit each time
+- read_summary:        GET /data.json
+- query_page:          GET /api/cases with a search, status filter and sort
+
+Requests go through Flask's test client, so the numbers leave out the
+network and the WSGI server. `run` writes throughput, p50/p99 latency and
+peak RSS per scenario and size as JSON; `compare` lists the differences
+between two such files and exits with status 1 if any scenario regressed by
+more than --threshold.
+
+Usage:
+    python benchmarks/suite.py run [--sizes 1000 10000 100000] [--out results.json] [--scenarios upload ...]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.15]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jira_export import add_existing_edits, write_export  # noqa: E402
+
+# Metrics compared by `compare`, and whether a larger value is better
+METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def summarize_samples(scenario, rows, latencies, operations, elapsed, unit, peak_mb):
+    latencies = sorted(latencies)
+    return {
+        "scenario": scenario,
+        "rows": rows,
+        "operations": operations,
+        "unit": unit,
+        "throughput": operations / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, math.ceil(len(latencies) * 0.99) - 1)] * 1000,
+        "peak_rss_mb": peak_mb,
+        "seconds": elapsed,
+    }
+
+
+# --- update_data.py, in a child process -------------------------------------
+
+def update_data_run(directory):
+    """Run update_data.py in directory; returns (seconds, peak RSS in MB)"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "update_data.py")], cwd=directory,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode or "Error" in output:
+        raise RuntimeError(f"update_data.py failed: {output.strip()}")
+    return elapsed, peak_rss_mb(rusage)
+
+
+def bench_update_data(scenario, rows, seed_dir, exports, options):
+    latencies, peaks = [], []
+    for _ in range(options["repeat"]):
+        with tempfile.TemporaryDirectory() as tmp:
+            if scenario == "update_data_diff":
+                shutil.copytree(seed_dir, tmp, dirs_exist_ok=True)
+                shutil.copy(exports["changed"], os.path.join(tmp, "data.csv"))
+            else:
+                shutil.copy(exports["original"], os.path.join(tmp, "data.csv"))
+            elapsed, peak = update_data_run(tmp)
+        latencies.append(elapsed)
+        peaks.append(peak)
+    return summarize_samples(scenario, rows, latencies, rows * len(latencies), sum(latencies), "rows/s", max(peaks))
+
+
+# --- The Flask app, in a child process ---------------------------------------
+
+def open_app(directory):
+    """The app module, serving the store in directory, and a logged-in test client"""
+    import app
+    from case_query import QueryCache
+    from case_store import open_case_store
+    from events import ChangeFeed
+    from jobs import JobQueue
+
+    app.BASE_DIR = directory
+    app.case_store = open_case_store(directory)
+    app.query_cache = QueryCache()
+    app.change_feed = ChangeFeed(app.case_store)
+    app.upload_jobs = JobQueue(os.path.join(directory, "jobs"), app.process_upload)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    return app, client
+
+
+def timed_requests(count, request):
+    """Call request(n) count times; returns (latencies, total seconds)"""
+    latencies = []
+    start = time.perf_counter()
+    for n in range(count):
+        begin = time.perf_counter()
+        response = request(n)
+        latencies.append(time.perf_counter() - begin)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.path} answered {response.status_code}: {response.get_data()[:200]}")
+    return latencies, time.perf_counter() - start
+
+
+def wait_for_job(client, status_url):
+    while True:
+        job = client.get(status_url).get_json()
+        if job["state"] == "failed":
+            raise RuntimeError(f"upload failed: {job.get('error')}")
+        if job["state"] == "done":
+            return job
+        time.sleep(0.002)
+
+
+def app_scenario(scenario, directory, exports, options):
+    """Run one request scenario; returns (latencies, operations, seconds, unit)"""
+    app, client = open_app(directory)
+    keys = [case["issue_key"] for case in app.case_store.cases()]
+    rng = random.Random(5)
+    requests = options["requests"]
+
+    if scenario == "upload":
+        paths = [exports["changed"], exports["original"]]
+
+        def upload(n):
+            with open(paths[n % 2], "rb") as f:
+                response = client.post("/upload", data={"file": (f, "data.csv")})
+            wait_for_job(client, response.get_json()["status_url"])
+            return response
+
+        latencies, elapsed = timed_requests(options["repeat"], upload)
+        return latencies, len(keys) * len(latencies), elapsed, "rows/s"
+
+    if scenario == "edit_single":
+        latencies, elapsed = timed_requests(requests, lambda n: client.post(
+            "/update_comment", json={"issue_key": rng.choice(keys), "comment": f"single edit {n}"}))
+        return latencies, requests, elapsed, "edits/s"
+
+    if scenario == "edit_batch":
+        batch = options["batch"]
+        batches = max(1, requests // 10)
+        latencies, elapsed = timed_requests(batches, lambda n: client.post("/api/edits", json={"edits": [
+            {"issue_key": key, "field": "comments", "value": f"batch edit {n}"}
+            for key in rng.sample(keys, min(batch, len(keys)))]}))
+        return latencies, batches * min(batch, len(keys)), elapsed, "edits/s"
+
+    gzip = {"Accept-Encoding": "gzip"}
+    if scenario == "read_cases":
+        latencies, elapsed = timed_requests(requests, lambda n: client.get("/cases.json?layout=columns", headers=gzip))
+        return latencies, requests, elapsed, "requests/s"
+
+    if scenario == "read_cases_edited":
+        # Only the reads are timed; each follows an edit, so the document is rebuilt every time
+        latencies = []
+        for n in range(requests):
+            app.case_store.update_field(rng.choice(keys), "comments", f"read edit {n}")
+            lats, _ = timed_requests(1, lambda _: client.get("/cases.json?layout=columns", headers=gzip))
+            latencies.extend(lats)
+        return latencies, requests, sum(latencies), "requests/s"
+
+    if scenario == "read_summary":
+        latencies, elapsed = timed_requests(requests, lambda n: client.get("/data.json"))
+        return latencies, requests, elapsed, "requests/s"
+
+    if scenario == "query_page":
+        queries = ["", "dhl", "germany", "car-1", "posta"]
+        statuses = ["", "Backlog", "In Progress", "Done"]
+        sorts = ["", "title", "target_end", "assignee"]
+        latencies, elapsed = timed_requests(requests, lambda n: client.get("/api/cases", query_string={
+            "search": queries[n % len(queries)], "status": statuses[n % len(statuses)],
+            "sort": sorts[n % len(sorts)], "offset": (n % 5) * 100, "limit": 100}))
+        return latencies, requests, elapsed, "requests/s"
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def app_child(scenario, directory, exports, options, queue):
+    try:
+        latencies, operations, elapsed, unit = app_scenario(scenario, directory, exports, options)
+        queue.put((latencies, operations, elapsed, unit, peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF))))
+    except Exception as e:
+        queue.put(e)
+
+
+def bench_app(scenario, rows, seed_dir, exports, options):
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(seed_dir, tmp, dirs_exist_ok=True)
+        # A fresh process per scenario, so each peak RSS is its own
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        proc = context.Process(target=app_child, args=(scenario, tmp, exports, options, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+    if isinstance(result, Exception):
+        raise result
+    latencies, operations, elapsed, unit, peak = result
+    return summarize_samples(scenario, rows, latencies, operations, elapsed, unit, peak)
+
+
+SCENARIOS = {
+    "update_data_rebuild": bench_update_data,
+    "update_data_diff": bench_update_data,
+    "upload": bench_app,
+    "edit_single": bench_app,
+    "edit_batch": bench_app,
+    "read_cases": bench_app,
+    "read_cases_edited": bench_app,
+    "read_summary": bench_app,
+    "query_page": bench_app,
+}
+
+
+def seed_store(directory, rows, options):
+    """Exports for rows (original and changed) and a store ingested from the original"""
+    from case_store import open_case_store
+    from ingest import ingest_export
+    from transform import summarize
+
+    exports = {"original": os.path.join(directory, "export.csv"), "changed": os.path.join(directory, "changed.csv")}
+    write_export(exports["original"], rows, seed=options["seed"])
+    write_export(exports["changed"], rows, seed=options["seed"], changed=options["changed"])
+
+    seed_dir = os.path.join(directory, "seed")
+    os.makedirs(seed_dir)
+    store = open_case_store(seed_dir)
+    ingest_export(store, exports["original"])
+    cases = add_existing_edits(store.cases(), options["comments"], seed=options["seed"])
+    store.replace(cases, summarize(cases))
+    store.compact()
+    return seed_dir, exports
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    options = {"repeat": args.repeat, "requests": args.requests, "batch": args.batch, "seed": args.seed,
+               "changed": args.changed, "comments": args.comments}
+    results = []
+    print(f"{'scenario':<22} {'rows':>8} {'throughput':>21} {'p50':>10} {'p99':>10} {'peak RSS':>9}")
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            seed_dir, exports = seed_store(tmp, rows, options)
+            for scenario in args.scenarios:
+                result = SCENARIOS[scenario](scenario, rows, seed_dir, exports, options)
+                results.append(result)
+                print(f"{scenario:<22} {rows:>8} {result['throughput']:>10.0f} {result['unit']:<10} "
+                      f"{result['p50_ms']:>8.1f}ms {result['p99_ms']:>8.1f}ms {result['peak_rss_mb']:>7.0f}MB")
+
+    document = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": dict(options, sizes=args.sizes, scenarios=args.scenarios),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"results written to {args.out}")
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    before = {(r["scenario"], r["rows"]): r for r in baseline["results"]}
+
+    print(f"baseline {baseline.get('commit')} ({baseline['created']}), current {current.get('commit')} "
+          f"({current['created']}); threshold {args.threshold:.0%}")
+    print(f"{'scenario':<22} {'rows':>8} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = 0
+    for result in current["results"]:
+        old = before.get((result["scenario"], result["rows"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            was, now = old[metric], result[metric]
+            change = (now - was) / was if was else 0.0
+            worse = -change if higher_is_better else change
+            # Ignore sub-millisecond and few-MB swings; they are noise at these sizes
+            floor = args.min_ms if metric.endswith("_ms") else args.min_mb if metric == "peak_rss_mb" else 0
+            flag = ""
+            if worse > args.threshold and abs(now - was) > floor:
+                flag = "REGRESSION"
+                regressions += 1
+            elif worse < -args.threshold and abs(now - was) > floor:
+                flag = "improved"
+            print(f"{result['scenario']:<22} {result['rows']:>8} {metric:<12} {was:>10.1f} {now:>10.1f} "
+                  f"{change:>+7.0%} {flag}")
+
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the scenarios and write results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    run_parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    run_parser.add_argument("--out", default="bench_results.json")
+    run_parser.add_argument("--repeat", type=int, default=5, help="runs of the ingest and upload scenarios")
+    run_parser.add_argument("--requests", type=int, default=200, help="requests per edit/read scenario")
+    run_parser.add_argument("--batch", type=int, default=100, help="edits per /api/edits request")
+    run_parser.add_argument("--changed", type=float, default=0.05, help="share of rows changed between exports")
+    run_parser.add_argument("--comments", type=float, default=0.1, help="share of cases with existing comments")
+    run_parser.add_argument("--seed", type=int, default=1)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    compare_parser.add_argument("--min-mb", type=float, default=5.0, help="ignore memory changes smaller than this")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
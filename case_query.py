@@ -0,0 +1,269 @@
+"""Server-side filtering, sorting and pagination of cases.
+
+Mirrors applyFilters() and renderTable()'s sort in index.html so large
+datasets can be paged from the server instead of shipped to the browser.
+A CaseIndex precomputes everything a query touches (lowercased search text,
+status/assignee codes, parsed target_end dates) once per dataset; sort
+orders are computed per column on first use. numpy is imported when the
+first index is built, so it costs nothing until /api/cases is used.
+
+Full-text matches (search_index.py) can be passed in as text_scores; they
+restrict the rows like the other filters and, without a sort, order them
+best match first.
+"""
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import cmp_to_key
+
+from dates import INVALID_DATE, parse_jira_date
+
+NO_DATE = -1
+BAD_DATE = -2  # parseJiraDate() gives an Invalid Date: never out of range, never "no date"
+
+SORTABLE = {"issue_key", "title", "deliverable_type", "assignee", "status",
+            "target_start", "target_end", "planned_for_week"}
+
+# Fields that edits can change; their sort orders are dropped on every revision
+EDITABLE = {"comments", "planned_for_week"}
+
+WEEK_PATTERN = re.compile(r"W(\d{2})-(\d{4})")
+
+# Recent search masks kept per index; typing "ca" then "car" narrows the
+# "ca" hits instead of scanning every case again
+SEARCH_CACHE_SIZE = 16
+
+
+def _js_parse_float(value):
+    """parseFloat(): the longest leading decimal number, or None"""
+    match = re.match(r"\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)", value)
+    return float(match.group(1)) if match else None
+
+
+def _compare_values(column):
+    """renderTable()'s comparator for one column, for ascending order"""
+    def compare(a, b):
+        num_a, num_b = _js_parse_float(a), _js_parse_float(b)
+        if num_a is not None and num_b is not None and column != "issue_key":
+            return (num_a > num_b) - (num_a < num_b)
+        a, b = a.lower(), b.lower()
+        return (a > b) - (a < b)
+    return compare
+
+
+def _sort_key(column, value):
+    if column in ("target_start", "target_end"):
+        parsed = parse_jira_date(value)
+        # Missing and invalid dates sort as new Date(0)
+        return 0 if parsed in (None, INVALID_DATE) else parsed.toordinal()
+    if column == "planned_for_week":
+        match = WEEK_PATTERN.search(value)
+        return (int(match.group(2)), int(match.group(1))) if match else (0, 0)
+    return value
+
+
+class CaseIndex:
+    def __init__(self, cases):
+        import numpy as np
+
+        self.cases = cases
+        self._ranks = {}
+
+        self._keys = [str(c.get("issue_key") or "").lower() for c in cases]
+        self._titles = [str(c.get("title") or "").lower() for c in cases]
+        # Requests on other threads query the same index; masks are computed outside the lock
+        self._search_lock = threading.Lock()
+        self._search_cache = OrderedDict()
+
+        # The same text as one "key\0title\n" line per case, so a rare search
+        # term is a few str.find calls in C instead of a loop over every case
+        lines = [f"{key}\0{title}\n" for key, title in zip(self._keys, self._titles)]
+        self._haystack = "".join(lines)
+        self._line_starts = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum([len(line) for line in lines], out=self._line_starts[1:])
+
+        self._status_codes, self.statuses = self._encode("status")
+        self._assignee_codes, self.assignees = self._encode("assignee")
+
+        end_dates = np.full(len(cases), NO_DATE, dtype=np.int64)
+        for i, case in enumerate(cases):
+            parsed = parse_jira_date(case.get("target_end"))
+            if parsed == INVALID_DATE:
+                end_dates[i] = BAD_DATE
+            elif parsed is not None:
+                end_dates[i] = parsed.toordinal()
+        self._end_dates = end_dates
+
+    def _encode(self, field):
+        import numpy as np
+
+        codes = {}
+        values = np.fromiter((codes.setdefault(c.get(field), len(codes)) for c in self.cases),
+                             dtype=np.int64, count=len(self.cases))
+        return values, list(codes)
+
+    def _codes(self, values, selected):
+        lookup = {value: code for code, value in enumerate(values)}
+        return [lookup[value] for value in selected if value in lookup]
+
+    def _search_mask(self, search):
+        import numpy as np
+
+        with self._search_lock:
+            mask = self._search_cache.get(search)
+            if mask is not None:
+                self._search_cache.move_to_end(search)
+                return mask
+            cached = list(self._search_cache.items())
+
+        # Narrow the smallest cached result for a term contained in this one
+        narrowest = None
+        for previous, previous_mask in cached:
+            if previous in search:
+                count = previous_mask.sum()
+                if narrowest is None or count < narrowest[0]:
+                    narrowest = (count, previous_mask)
+
+        if narrowest is not None:
+            rows = np.flatnonzero(narrowest[1])
+            mask = np.zeros(len(self.cases), dtype=bool)
+            mask[rows] = [search in self._keys[i] or search in self._titles[i] for i in rows]
+        elif self._haystack.count(search) <= len(self.cases) // 50:
+            mask = self._find_rows(search)
+        else:
+            mask = np.fromiter((search in key or search in title for key, title in zip(self._keys, self._titles)),
+                               dtype=bool, count=len(self.cases))
+
+        with self._search_lock:
+            self._search_cache[search] = mask
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return mask
+
+    def _find_rows(self, search):
+        import numpy as np
+
+        mask = np.zeros(len(self.cases), dtype=bool)
+        if "\0" in search or "\n" in search:
+            return mask
+        starts = self._line_starts
+        pos = self._haystack.find(search)
+        while pos != -1:
+            row = bisect_right(starts, pos) - 1
+            # A hit that runs from the key into the title isn't a match
+            line_end = starts[row + 1] - 1
+            if pos + len(search) <= line_end and "\0" not in self._haystack[pos:pos + len(search)]:
+                mask[row] = True
+                pos = self._haystack.find(search, starts[row + 1])
+            else:
+                pos = self._haystack.find(search, pos + 1)
+        return mask
+
+    def _rank(self, column):
+        """Dense rank of every case for an ascending sort on column"""
+        import numpy as np
+
+        rank = self._ranks.get(column)
+        if rank is None:
+            values = [c.get(column) for c in self.cases]
+            values = ["" if v is None else str(v) for v in values]
+            keys = {value: _sort_key(column, value) for value in set(values)}
+            if all(isinstance(k, str) for k in keys.values()):
+                ordered = sorted(keys, key=cmp_to_key(_compare_values(column)))
+                compare = _compare_values(column)
+                dense, previous = {}, None
+                for value in ordered:
+                    if previous is None or compare(previous, value) != 0:
+                        dense[value] = len(dense)
+                    else:
+                        dense[value] = dense[previous]
+                    previous = value
+            else:
+                distinct = sorted(set(keys.values()))
+                position = {key: i for i, key in enumerate(distinct)}
+                dense = {value: position[key] for value, key in keys.items()}
+            rank = np.fromiter((dense[v] for v in values), dtype=np.int64, count=len(values))
+            self._ranks[column] = rank
+        return rank
+
+    def forget_editable(self):
+        for column in EDITABLE:
+            self._ranks.pop(column, None)
+
+    def query(self, search="", statuses=(), assignees=(), date_start=None, date_end=None, no_date=False,
+              sort=None, ascending=True, offset=0, limit=100, text_scores=None):
+        """One page of matching cases plus totals, as the dashboard's table and chart need them"""
+        import numpy as np
+
+        mask = np.ones(len(self.cases), dtype=bool)
+        if search:
+            mask &= self._search_mask(search.lower())
+        if text_scores is not None:
+            matched = np.fromiter(text_scores, dtype=np.int64, count=len(text_scores))
+            scores = np.zeros(len(self.cases))
+            scores[matched] = np.fromiter(text_scores.values(), dtype=float, count=len(text_scores))
+            mask &= scores > 0
+        if statuses:
+            mask &= np.isin(self._status_codes, self._codes(self.statuses, statuses))
+        if assignees:
+            mask &= np.isin(self._assignee_codes, self._codes(self.assignees, assignees))
+
+        end = self._end_dates
+        if no_date:
+            mask &= end == NO_DATE
+        elif date_start or date_end:
+            in_range = end >= 0
+            if date_start:
+                in_range &= end >= date_start.toordinal()
+            if date_end:
+                in_range &= end <= date_end.toordinal()
+            mask &= in_range | (end == BAD_DATE)
+
+        rows = np.flatnonzero(mask)
+        if sort in SORTABLE and len(rows):
+            rank = self._rank(sort)[rows]
+            rows = rows[np.argsort(rank if ascending else -rank, kind="stable")]
+        elif text_scores is not None and len(rows):
+            rows = rows[np.argsort(-scores[rows], kind="stable")]
+
+        counts = np.bincount(self._status_codes[rows], minlength=len(self.statuses))
+        status_counts = {status: int(count) for status, count in zip(self.statuses, counts)
+                         if count and status is not None}
+
+        page = rows[offset:offset + limit]
+        return {
+            "total_cases": len(self.cases),
+            "matched": len(rows),
+            "offset": offset,
+            "limit": limit,
+            "status_counts": status_counts,
+            "cases": [self.cases[i] for i in page],
+        }
+
+
+class QueryCache:
+    """Keeps one CaseIndex per dataset, rebuilt when the store replaces its cases or edits a field it encodes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cases = None
+        self._revision = None
+        self._index = None
+
+    def index_for(self, revision, cases, changes_since):
+        """The index for the store's (revision, cases); changes_since is the store's method of that name"""
+        with self._lock:
+            if cases is not self._cases:
+                self._index = CaseIndex(cases)
+                self._cases = cases
+            elif revision != self._revision:
+                # Edits change cases in place. Comments and weeks only stale their sorts, but a
+                # re-ingest or /save_all can change statuses, titles and dates the index encodes
+                changes = changes_since(self._revision)
+                if changes is None or any(field not in EDITABLE for _, field, _, _ in changes):
+                    self._index = CaseIndex(cases)
+                else:
+                    self._index.forget_editable()
+            self._revision = revision
+            return self._index
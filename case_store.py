@@ -0,0 +1,625 @@
+"""Process-level store for cases.json.
+
+The file is loaded once and kept in memory with an index keyed by issue_key,
+so single-field edits are O(1). Edits are not written into cases.json
+directly: each one is appended as a small JSON record to a journal next to
+it, and the in-memory state is always "snapshot + journal". A compaction
+step folds the journal back into cases.json once it grows past a size
+threshold or has been pending for too long, and on interpreter shutdown.
+
+Every write carries a revision number. The store revision increases with
+each journaled edit and each snapshot replacement, and each case field
+remembers the revision that last changed it; an edit made against an older
+revision of a field that has since changed raises StaleWriteError. New
+cases and removed issues are journaled too, one record each, and count as
+a replacement for changes_since(), since case positions move.
+
+All writers in all processes serialize on a sidecar lock file. Edits that
+arrive while a write is in progress are committed together as one locked
+append + fsync (group commit), so a burst of small edits costs one disk
+round trip instead of one each. Snapshots are written with an atomic
+replace, so readers never observe a half-written cases.json.
+
+A crash mid-append can only leave a torn final record, which replay skips.
+Other processes' appends are picked up by replaying only the journal's new
+tail; a rewritten snapshot or journal triggers a full reload.
+
+The store also keeps the aggregate cube (see aggregates.py) in step with
+every replayed edit, and with it the data.json counts, which are written
+back at compaction. The full-text index (see search_index.py) is built on
+first use and kept in step the same way.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+import codec
+import metrics
+from aggregates import CaseCube
+from search_index import SearchIndex
+from storage import FileLock, atomic_write_bytes, atomic_write_json, atomic_writer
+
+# Cases serialized per codec.dumps call when writing a snapshot
+WRITE_BATCH = 1000
+
+
+class StaleWriteError(Exception):
+    """An edit was based on a revision older than the field's latest change"""
+
+    def __init__(self, issue_key, field, revision):
+        super().__init__(f"{field} of {issue_key} was changed at revision {revision}")
+        self.issue_key = issue_key
+        self.field = field
+        self.revision = revision
+
+
+def _write_cases(f, cases):
+    """Write codec.dumps(cases) to f a batch at a time, so any iterable of cases works"""
+    cases = iter(cases)
+    opening = b"["
+    while True:
+        batch = list(islice(cases, WRITE_BATCH))
+        if not batch:
+            break
+        # Strip the batch's own brackets and splice it into one array
+        f.write(opening + codec.dumps(batch)[1:-1])
+        opening = b","
+    f.write(b"]" if opening == b"," else b"[]")
+
+
+class _Batch:
+    def __init__(self):
+        self.edits = []
+        self.added = []
+        self.removed = []
+        self.results = []
+        self.done = threading.Event()
+
+
+class CaseStore:
+    def __init__(self, path, journal_path=None, summary_path=None, compact_bytes=1024 * 1024,
+                 compact_interval=60.0):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.journal_path = journal_path or base + ".journal"
+        self.summary_path = summary_path or os.path.join(os.path.dirname(path), "data.json")
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        self._file_lock = FileLock(base + ".lock")
+        self._lock = threading.RLock()
+        self._cases = []
+        self._index = {}
+        self._cube = CaseCube()
+        self._search = None
+        self._search_build = threading.Lock()  # one search_snapshot() builds the index, the others wait
+        self._revision = 0
+        self._case_revisions = {}  # issue_key -> {field: revision of last change}
+        self._replaced = 0  # revision at which the cases were last replaced
+        self._snapshot_stamp = None
+        self._journal_id = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_torn = False
+        self._batch = None
+        self._batch_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._compactor = None
+        atexit.register(self.compact)
+
+    # ─── Loading ─────────────────────────────────────────────────────
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def _set_cases(self, cases):
+        self._cases = cases
+        self._cube = CaseCube.from_cases(cases)
+        self._search = None
+        self._index = {}
+        for case in cases:
+            issue_key = case.get("issue_key")
+            if issue_key:
+                self._index.setdefault(issue_key, case)
+
+    def _on_disk(self):
+        """(snapshot stamp, journal inode, journal size), each None or 0 if the file is missing"""
+        snapshot = self._stat(self.path)
+        journal = self._stat(self.journal_path)
+        return ((snapshot.st_mtime_ns, snapshot.st_size) if snapshot else None,
+                journal.st_ino if journal else None, journal.st_size if journal else 0)
+
+    def _loaded(self, on_disk):
+        """Whether memory holds the on_disk snapshot, so at most the journal's tail needs replaying"""
+        snapshot_stamp, journal_id, journal_size = on_disk
+        return (snapshot_stamp == self._snapshot_stamp and journal_id == self._journal_id
+                and journal_size >= self._journal_offset)
+
+    def _refresh(self):
+        """Bring memory up to date with snapshot + journal on disk"""
+        on_disk = self._on_disk()
+        snapshot_stamp, journal_id, journal_size = on_disk
+
+        if not self._loaded(on_disk):
+            cases = []
+            if snapshot_stamp is not None:
+                with open(self.path, "rb") as f:
+                    cases = codec.load(f)
+            self._set_cases(cases)
+            self._revision = 0
+            self._case_revisions = {}
+            self._replaced = 0
+            self._snapshot_stamp = snapshot_stamp
+            self._journal_id = journal_id
+            self._journal_offset = 0
+            self._journal_records = 0
+        if journal_size > self._journal_offset:
+            self._replay_journal()
+
+    def _read_journal(self):
+        """The journal on disk, without loading the snapshot: (revision, edits, added, removed).
+
+        edits maps issue_key to {field: value} for cases in the snapshot,
+        added maps issue_key to each case journaled since, in order, and
+        removed is the set of snapshot keys whose case was removed.
+        """
+        revision = 0
+        edits = {}
+        added = {}
+        removed = set()
+        try:
+            with open(self.journal_path, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+        except FileNotFoundError:
+            return revision, edits, added, removed
+        for line in lines:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = codec.loads(line)
+            except ValueError:
+                continue
+            if "add" in record:
+                revision = record["rev"]
+                added[record["add"]["issue_key"]] = record["add"]
+            elif "remove" in record:
+                revision = record["rev"]
+                if added.pop(record["remove"], None) is None:
+                    edits.pop(record["remove"], None)
+                    removed.add(record["remove"])
+            elif "issue_key" not in record:
+                revision = record.get("revision", revision)
+            else:
+                revision = record.get("rev", revision + 1)
+                case = added.get(record["issue_key"])
+                if case is not None:
+                    case[record["field"]] = record["value"]
+                else:
+                    edits.setdefault(record["issue_key"], {})[record["field"]] = record["value"]
+        return revision, edits, added, removed
+
+    def _replay_journal(self):
+        """Apply journal records appended since the last replay"""
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            tail = f.read()
+
+        # Cases added and removed are collected and the list rebuilt once at
+        # the end, as a new list: readers may still hold the old one
+        added = []
+        removed = set()
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Torn final record from a crashed writer; leave it unapplied
+                self._journal_torn = True
+                break
+            self._journal_offset += len(line)
+            self._journal_torn = False
+            try:
+                record = codec.loads(line)
+            except ValueError:
+                continue
+            if "add" in record or "remove" in record:
+                self._revision = self._replaced = record["rev"]
+                self._journal_records += 1
+                if "add" in record:
+                    self._add_case(record["add"], added)
+                else:
+                    self._remove_case(record["remove"], added, removed)
+                continue
+            if "issue_key" not in record:
+                # Header written at compaction: revisions folded into the snapshot
+                self._revision = record.get("revision", self._revision)
+                self._case_revisions = record.get("case_revisions", {})
+                self._replaced = record.get("replaced", 0)
+                continue
+            self._revision = record.get("rev", self._revision + 1)
+            self._journal_records += 1
+            case = self._index.get(record["issue_key"])
+            if case is not None:
+                self._cube.update(case, record["field"], record["value"])
+                if self._search is not None:
+                    self._search.update(case, record["field"], record["value"])
+                case[record["field"]] = record["value"]
+                self._case_revisions.setdefault(record["issue_key"], {})[record["field"]] = self._revision
+        if added or removed:
+            self._cases = [case for case in self._cases if id(case) not in removed] + added
+            self._search = None
+
+    def _add_case(self, case, added):
+        issue_key = case["issue_key"]
+        if issue_key in self._index:
+            return
+        self._index[issue_key] = case
+        self._cube.add([case])
+        added.append(case)
+
+    def _remove_case(self, issue_key, added, removed):
+        """Drop the first case with issue_key, as in _index"""
+        case = self._index.pop(issue_key, None)
+        if case is None:
+            return
+        self._cube.remove([case])
+        self._case_revisions.pop(issue_key, None)
+        if any(other is case for other in added):
+            added[:] = [other for other in added if other is not case]
+        else:
+            removed.add(id(case))
+
+    # ─── Reads ───────────────────────────────────────────────────────
+    @property
+    def revision(self):
+        with self._lock:
+            self._refresh()
+            return self._revision
+
+    def cases(self):
+        """All cases in file order. Callers must treat the result as read-only."""
+        with self._lock:
+            self._refresh()
+            return self._cases
+
+    def snapshot(self):
+        """(revision, cases) read together"""
+        with self._lock:
+            self._refresh()
+            return self._revision, self._cases
+
+    def iter_cases(self):
+        """cases() one at a time, streamed from disk if they are not loaded; hold locked() while iterating.
+
+        A store filled by replace_streaming(), or just opened, has nothing in
+        memory, and a rebuild that only passes over the old cases once should
+        not have to load them all.
+        """
+        with self._lock:
+            if self._loaded(self._on_disk()):
+                self._refresh()
+                cases = self._cases
+            else:
+                cases = None
+        if cases is not None:
+            yield from cases
+            return
+
+        _, edits, added, removed = self._read_journal()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                for case in codec.iter_array(f):
+                    # Journaled edits and removals apply to the first case with the key, as in _index
+                    issue_key = case.get("issue_key")
+                    if issue_key in removed:
+                        removed.discard(issue_key)
+                        continue
+                    fields = edits.pop(issue_key, None)
+                    if fields:
+                        case.update(fields)
+                    yield case
+        yield from added.values()
+
+    def get(self, issue_key):
+        with self._lock:
+            self._refresh()
+            return self._index.get(issue_key)
+
+    def aggregates(self):
+        """The live CaseCube. Callers must treat it as read-only."""
+        with self._lock:
+            self._refresh()
+            return self._cube
+
+    def search_snapshot(self):
+        """(revision, cases, SearchIndex) read together; the index is built on first use.
+
+        The build takes over a second at 100k cases, so it runs without the
+        store lock, from copies of the cases, and is brought up to date with
+        the edits made meanwhile before it is swapped in. If the cases were
+        replaced instead, this caller gets the index of the ones it copied.
+        """
+        with self._search_build:
+            with self._lock:
+                self._refresh()
+                if self._search is not None:
+                    return self._revision, self._cases, self._search
+                revision, cases = self._revision, self._cases
+            indexed = [dict(case) for case in cases]
+            search = SearchIndex(cases, indexed)
+            with self._lock:
+                changes = self.changes_since(revision)
+                if self._cases is not cases or changes is None:
+                    return revision, cases, search
+                search.resync(indexed, changes)
+                self._search = search
+                return self._revision, self._cases, self._search
+
+    def summary(self):
+        """The data.json summary document, with counts as of the latest edit"""
+        with open(self.summary_path, "rb") as f:
+            summary = codec.load(f)
+        return self.aggregates().apply_to(summary)
+
+    def changes_since(self, revision):
+        """(issue_key, field, value, revision) for each field last changed after revision, oldest first.
+
+        Returns None if the cases were replaced after revision, since then
+        every case may have changed.
+        """
+        return self.changes_snapshot(revision)[1]
+
+    def changes_snapshot(self, revision):
+        """(revision, changes_since(revision)) read together"""
+        with self._lock:
+            self._refresh()
+            if revision < self._replaced:
+                return self._revision, None
+            changes = []
+            for issue_key, fields in self._case_revisions.items():
+                case = self._index.get(issue_key)
+                if case is None:
+                    continue
+                changes.extend((issue_key, field, case.get(field), last_change)
+                               for field, last_change in fields.items() if last_change > revision)
+            changes.sort(key=lambda change: change[3])
+            return self._revision, changes
+
+    def comment_maps(self):
+        """Existing comments and planned weeks keyed by issue_key"""
+        with self._lock:
+            self._refresh()
+            comments_map = {}
+            planned_week_map = {}
+            for issue_key, case in self._index.items():
+                if "comments" in case:
+                    comments_map[issue_key] = case["comments"]
+                if "planned_for_week" in case:
+                    planned_week_map[issue_key] = case["planned_for_week"]
+            return comments_map, planned_week_map
+
+    # ─── Writes ──────────────────────────────────────────────────────
+    @contextmanager
+    def locked(self):
+        """Hold the store's cross-process write lock, e.g. to write data.json alongside a snapshot"""
+        with self._lock, self._file_lock:
+            yield self
+
+    def update_field(self, issue_key, field, value, base_revision=None):
+        """Journal one field change on one case.
+
+        Returns the new store revision, or None if the issue is unknown. If
+        base_revision is given and the field changed after it, raises
+        StaleWriteError instead of writing.
+        """
+        with self._batch_lock:
+            leader = self._batch is None
+            if leader:
+                self._batch = _Batch()
+            batch = self._batch
+            slot = len(batch.edits)
+            batch.edits.append((issue_key, field, value, base_revision))
+
+        if leader:
+            # Edits from other threads keep joining the batch until we hold the lock
+            with self._lock:
+                with self._batch_lock:
+                    self._batch = None
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    batch.results = [e] * len(batch.edits)
+                finally:
+                    batch.done.set()
+        else:
+            batch.done.wait()
+
+        result = batch.results[slot]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def update_fields(self, edits):
+        """Journal many (issue_key, field, value, base_revision) edits as one commit.
+
+        Returns one result per edit: the new revision, None if the issue is
+        unknown, or the StaleWriteError that kept it from being written.
+        """
+        return self.update_cases(edits)
+
+    def update_cases(self, edits=(), added=(), removed=()):
+        """update_fields(), plus cases to add after the others and issue keys to remove, as one commit.
+
+        Keys are removed before cases are added. An added case whose key is
+        already taken, and a removed key no case has, are skipped. Returns
+        update_fields()'s results for the edits.
+        """
+        batch = _Batch()
+        batch.edits = list(edits)
+        batch.added = list(added)
+        batch.removed = list(removed)
+        with self._lock:
+            self._commit(batch)
+        return batch.results
+
+    def _commit(self, batch):
+        with self._file_lock:
+            self._refresh()
+            records = []
+            revision = self._revision
+            touched = {}
+            for issue_key, field, value, base_revision in batch.edits:
+                if issue_key not in self._index:
+                    batch.results.append(None)
+                    continue
+                last_change = touched.get((issue_key, field),
+                                          self._case_revisions.get(issue_key, {}).get(field, 0))
+                if base_revision is not None and last_change > base_revision:
+                    batch.results.append(StaleWriteError(issue_key, field, last_change))
+                    continue
+                revision += 1
+                touched[(issue_key, field)] = revision
+                records.append({"rev": revision, "issue_key": issue_key, "field": field, "value": value})
+                batch.results.append(revision)
+            keys = set(self._index) if batch.added or batch.removed else None
+            for issue_key in batch.removed:
+                if issue_key in keys:
+                    keys.discard(issue_key)
+                    revision += 1
+                    records.append({"rev": revision, "remove": issue_key})
+            for case in batch.added:
+                issue_key = case.get("issue_key")
+                if issue_key and issue_key not in keys:
+                    keys.add(issue_key)
+                    revision += 1
+                    records.append({"rev": revision, "add": case})
+
+            if records:
+                data = b"".join(codec.dumps(r) + b"\n" for r in records)
+                if self._journal_torn:
+                    data = b"\n" + data
+                start = time.perf_counter()
+                with open(self.journal_path, "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                metrics.record_write(time.perf_counter() - start, len(data))
+                if self._journal_id is None:
+                    self._journal_id = os.stat(self.journal_path).st_ino
+                self._replay_journal()
+        self._schedule_compaction()
+
+    def replace(self, cases, summary=None):
+        """Replace every case (and the summary), writing a fresh snapshot; returns the new revision"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            self._set_cases(cases)
+            self._revision += 1
+            self._case_revisions = {}
+            self._replaced = self._revision
+            self._write_snapshot()
+            if summary is not None:
+                atomic_write_json(self.summary_path, summary)
+            return self._revision
+
+    def replace_streaming(self, cases, summary):
+        """replace() for more cases than fit in memory at once.
+
+        cases is any iterable, consumed once straight into the new snapshot;
+        summary is called afterwards for the data.json document. Returns the
+        new revision. The cases are read back from disk on the next access.
+        """
+        with self._lock, self._file_lock:
+            if self._loaded(self._on_disk()):
+                self._refresh()
+                revision = self._revision + 1
+            else:
+                # The old cases are about to go; don't load them just for the revision
+                revision = self._read_journal()[0] + 1
+            self._set_cases([])
+            try:
+                with atomic_writer(self.path) as f:
+                    _write_cases(f, cases)
+                self._write_journal_header(revision, {}, revision)
+                atomic_write_json(self.summary_path, summary())
+            finally:
+                # Reload from whatever is on disk now
+                self._snapshot_stamp = None
+            return revision
+
+    def compact(self):
+        """Fold the journal into cases.json"""
+        with self._lock:
+            self._refresh()
+            if not self._journal_records:
+                return
+            with self._file_lock:
+                self._refresh()
+                if self._journal_records:
+                    self._write_snapshot()
+                    self._write_summary()
+
+    def _write_snapshot(self):
+        with atomic_writer(self.path) as f:
+            _write_cases(f, self._cases)
+        # Start a new journal whose header carries the revisions folded into the
+        # snapshot. A crash between the two replaces only means the old journal
+        # is replayed over the new snapshot, which is harmless.
+        header_size = self._write_journal_header(self._revision, self._case_revisions, self._replaced)
+
+        snapshot = os.stat(self.path)
+        self._snapshot_stamp = (snapshot.st_mtime_ns, snapshot.st_size)
+        self._journal_id = os.stat(self.journal_path).st_ino
+        self._journal_offset = header_size
+        self._journal_records = 0
+        self._journal_torn = False
+
+    def _write_journal_header(self, revision, case_revisions, replaced):
+        header = {"revision": revision, "case_revisions": case_revisions, "replaced": replaced}
+        header_bytes = codec.dumps(header) + b"\n"
+        atomic_write_bytes(self.journal_path, header_bytes)
+        return len(header_bytes)
+
+    def _write_summary(self):
+        try:
+            with open(self.summary_path, "rb") as f:
+                summary = codec.load(f)
+        except FileNotFoundError:
+            return
+        atomic_write_json(self.summary_path, self._cube.apply_to(summary))
+
+    # ─── Background compaction ───────────────────────────────────────
+    def _schedule_compaction(self):
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self._compact_loop, name="case-store-compact", daemon=True)
+            self._compactor.start()
+        if self._journal_offset >= self.compact_bytes:
+            self._wakeup.set()
+
+    def _compact_loop(self):
+        while True:
+            # Compact once the journal outgrows compact_bytes, and at least
+            # every compact_interval seconds while edits keep arriving
+            self._wakeup.wait(self.compact_interval)
+            self._wakeup.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Warning: Could not compact case journal: {e}")
+
+
+def open_case_store(directory, backend=None):
+    """Open the store selected by CASE_BACKEND: "json" (default) or "sqlite" """
+    backend = backend or os.environ.get("CASE_BACKEND", "json")
+    if backend == "sqlite":
+        from sqlite_store import SqliteCaseStore
+        return SqliteCaseStore(os.path.join(directory, "cases.db"))
+    if backend != "json":
+        raise ValueError(f"Unknown CASE_BACKEND: {backend}")
+    return CaseStore(os.path.join(directory, "cases.json"))
@@ -0,0 +1,411 @@
+// Case parsing, indexing and filtering for the dashboard.
+//
+// index.html loads this file as a plain script for the shared helpers, and,
+// when served over HTTP, also starts it as a Web Worker so that the
+// client-side CSV fallback and the table's filtering and sorting run off the
+// UI thread. Messages (each tagged with the dataset's generation):
+//
+//   load   {buffer}               cases.json bytes (either layout) to filter
+//   parse  {file, existing}       stream a CSV export into cases; replies with
+//                                 progress, cases batches (JSON in transferred
+//                                 buffers) and finally parsed {summary, file}
+//   filter {seq, filters, sort}   replies rows {seq, rows, counts} unless a
+//                                 newer filter arrives first
+//   edit   {position, field, value}
+
+const PARSE_READ_BYTES = 1024 * 1024; // File slice decoded per step
+const PARSE_BATCH_CASES = 5000; // Cases per batch sent back while parsing
+const FILTER_CHUNK_ROWS = 25000; // Rows filtered between checks for a newer query
+
+function parseJiraDate(dateStr) {
+    if (!dateStr) return null;
+    // Format: dd/MMM/yy e.g. "13/Feb/26"
+    const parts = dateStr.split("/");
+    if (parts.length !== 3) return null;
+
+    const day = parseInt(parts[0], 10);
+    const monthStr = parts[1].toLowerCase();
+    const year = 2000 + parseInt(parts[2], 10); // Assuming 20xx
+
+    const months = {
+        "jan": 0, "feb": 1, "mar": 2, "apr": 3, "may": 4, "jun": 5,
+        "jul": 6, "aug": 7, "sep": 8, "oct": 9, "nov": 10, "dec": 11
+    };
+
+    if (months[monthStr] === undefined) return null;
+
+    return new Date(year, months[monthStr], day);
+}
+
+function getISOWeek(date) {
+    const target = new Date(date.valueOf());
+    const dayNr = (date.getDay() + 6) % 7;
+    target.setDate(target.getDate() - dayNr + 3);
+    const firstThursday = target.valueOf();
+    target.setMonth(0, 1);
+    if (target.getDay() !== 4) {
+        target.setMonth(0, 1 + ((4 - target.getDay()) + 7) % 7);
+    }
+    return 1 + Math.ceil((firstThursday - target) / 604800000);
+}
+
+function calculateWeekFromDate(dateStr) {
+    if (!dateStr) return '';
+
+    try {
+        const formats = [
+            { regex: /(\d{2})\/(\w{3})\/(\d{2})/, parse: (m) => new Date(`${m[2]} ${m[1]}, 20${m[3]}`) },
+            { regex: /(\d{2})\/(\d{2})\/(\d{2})/, parse: (m) => new Date(2000 + parseInt(m[3]), parseInt(m[2]) - 1, parseInt(m[1])) }
+        ];
+
+        for (let fmt of formats) {
+            const match = dateStr.match(fmt.regex);
+            if (match) {
+                const date = fmt.parse(match);
+                const weekNum = getISOWeek(date);
+                return `W${weekNum.toString().padStart(2, '0')}-${date.getFullYear()}`;
+            }
+        }
+    } catch (e) {
+        console.error('Date parse error:', e);
+    }
+    return '';
+}
+
+// Rebuild case objects from /cases.json?layout=columns (see codec.py)
+function casesFromColumns(doc) {
+    if (Array.isArray(doc)) return doc;
+    const columns = doc.fields.map(field => {
+        const column = doc.columns[field];
+        return Array.isArray(column) ? column : column.codes.map(code => column.values[code]);
+    });
+    const cases = new Array(doc.length);
+    for (let row = 0; row < doc.length; row++) {
+        const c = {};
+        doc.fields.forEach((field, i) => { c[field] = columns[i][row]; });
+        cases[row] = c;
+    }
+    Object.entries(doc.absent || {}).forEach(([field, rows]) => {
+        rows.forEach(row => { delete cases[row][field]; });
+    });
+    return cases;
+}
+
+// CSV export parser fed one chunk of text at a time. Rows are lines; quotes
+// group commas into a field and are dropped, and fields are trimmed.
+class CsvParser {
+    constructor() {
+        this.headers = null;
+        this.columns = {}; // header -> position in a row's values
+        this.rest = ''; // Text after the last complete line
+    }
+
+    // Rows (arrays of values, in header order) for the lines completed by text
+    push(text) {
+        const lines = (this.rest + text).split('\n');
+        this.rest = lines.pop();
+        return this.parseLines(lines);
+    }
+
+    finish() {
+        const lines = [this.rest];
+        this.rest = '';
+        return this.parseLines(lines);
+    }
+
+    parseLines(lines) {
+        const rows = [];
+        for (const line of lines) {
+            if (this.headers === null) {
+                this.headers = line.split(',').map(h => h.replace(/"/g, '').trim());
+                this.headers.forEach((header, index) => { this.columns[header] = index; });
+                continue;
+            }
+            if (!line.trim()) continue;
+            rows.push(this.parseLine(line));
+        }
+        return rows;
+    }
+
+    // The value of a row's column, '' when missing
+    get(row, header) {
+        const index = this.columns[header];
+        return (index !== undefined && row[index]) || '';
+    }
+
+    parseLine(line) {
+        const values = [];
+        let current = '';
+        let start = 0;
+        let inQuotes = false;
+        for (let i = 0; i < line.length; i++) {
+            const char = line.charCodeAt(i);
+            if (char === 34) { // "
+                current += line.slice(start, i);
+                start = i + 1;
+                inQuotes = !inQuotes;
+            } else if (char === 44 && !inQuotes) { // ,
+                values.push((current + line.slice(start, i)).trim());
+                current = '';
+                start = i + 1;
+            }
+        }
+        values.push((current + line.slice(start)).trim());
+        return values;
+    }
+}
+
+// Comments and planned weeks already entered, so a re-import keeps them
+function existingEdits(cases) {
+    const existing = { comments: {}, weeks: {} };
+    cases.forEach(c => {
+        if (c.issue_key) {
+            if (c.comments) existing.comments[c.issue_key] = c.comments;
+            if (c.planned_for_week) existing.weeks[c.issue_key] = c.planned_for_week;
+        }
+    });
+    return existing;
+}
+
+function caseFromRow(parser, row, existing) {
+    const issueKey = parser.get(row, 'Issue key');
+    const status = parser.get(row, 'Issue status').toLowerCase().split(' ').map(w => w.charAt(0).toUpperCase() + w.slice(1)).join(' ');
+    const targetStart = parser.get(row, 'Target start date');
+
+    return {
+        hierarchy: parser.get(row, 'Hierarchy'),
+        issue_key: issueKey,
+        title: parser.get(row, 'Title'),
+        assignee: parser.get(row, 'Assignee'),
+        target_start: targetStart,
+        target_end: parser.get(row, 'Target end date'),
+        components: parser.get(row, 'Components'),
+        status: status,
+        deliverable_type: parser.get(row, 'Deliverable Type'),
+        comments: existing.comments[issueKey] || '',
+        planned_for_week: existing.weeks[issueKey] || calculateWeekFromDate(targetStart)
+    };
+}
+
+function statusCounts(cases, rows) {
+    const counts = {};
+    for (let i = 0; i < rows.length; i++) {
+        const status = cases[rows[i]].status;
+        counts[status] = (counts[status] || 0) + 1;
+    }
+    return counts;
+}
+
+// Lowercased key + title and parsed end dates, computed once per load
+// so filtering doesn't re-parse every case on every keystroke
+function indexCases(cases) {
+    const index = {
+        cases: cases,
+        searchText: new Array(cases.length),
+        endDates: new Float64Array(cases.length),
+        sortKeys: {} // column -> keys, built on first sort by that column
+    };
+    cases.forEach((c, i) => indexCase(index, c, i));
+    return index;
+}
+
+function indexCase(index, c, i) {
+    // A search has no line breaks, so it can't match across the two
+    index.searchText[i] = `${c.issue_key ?? ""}\n${c.title ?? ""}`.toLowerCase();
+    const endDate = parseJiraDate(c.target_end);
+    index.endDates[i] = endDate ? endDate.getTime() : NaN;
+}
+
+// Call after changing field of the case at position i
+function updateIndexedCase(index, i, field) {
+    delete index.sortKeys[field];
+    if (i !== -1 && (field === 'issue_key' || field === 'title' || field === 'target_end')) {
+        indexCase(index, index.cases[i], i);
+    }
+}
+
+// Append to rows the positions in [from, to) that pass filters:
+// {search, statuses, assignees, startTime, endTime, noDate}
+function filterRows(index, filters, from, to, rows) {
+    const { cases, searchText, endDates } = index;
+    const { search, startTime, endTime, noDate } = filters;
+    const statuses = new Set(filters.statuses);
+    const assignees = new Set(filters.assignees);
+
+    for (let i = from; i < to; i++) {
+        const c = cases[i];
+
+        if (search && !searchText[i].includes(search)) continue;
+        if (statuses.size > 0 && !statuses.has(c.status)) continue;
+        if (assignees.size > 0 && !assignees.has(c.assignee)) continue;
+
+        const caseDate = endDates[i]; // NaN when there is no valid date
+        if (noDate) {
+            if (!isNaN(caseDate)) continue; // Show only if NO date
+        } else if (startTime !== null || endTime !== null) {
+            // If we are filtering by date, hide items without valid date
+            if (isNaN(caseDate)) continue;
+            if (startTime !== null && caseDate < startTime) continue;
+            if (endTime !== null && caseDate > endTime) continue;
+        }
+
+        rows.push(i);
+    }
+    return rows;
+}
+
+function sortKeysFor(index, column) {
+    if (index.sortKeys[column]) return index.sortKeys[column];
+
+    const cases = index.cases;
+    const numbers = new Float64Array(cases.length);
+    let strings = null;
+
+    if (column === 'target_start' || column === 'target_end') {
+        // Cases without a date sort as the epoch
+        cases.forEach((c, i) => {
+            const date = column === 'target_end' ? index.endDates[i] : parseJiraDate(c.target_start)?.getTime();
+            numbers[i] = date || 0;
+        });
+    } else if (column === 'planned_for_week') {
+        // W##-YYYY: by year, then by week
+        cases.forEach((c, i) => {
+            const match = c.planned_for_week ? c.planned_for_week.match(/W(\d{2})-(\d{4})/) : null;
+            numbers[i] = match ? parseInt(match[2]) * 100 + parseInt(match[1]) : 0;
+        });
+    } else {
+        // Numbers compare as numbers, anything else as lowercase text
+        strings = new Array(cases.length);
+        cases.forEach((c, i) => {
+            const value = c[column] ?? "";
+            // Force string sort for keys, though they are usually strings
+            numbers[i] = column === 'issue_key' ? NaN : parseFloat(value);
+            strings[i] = value.toString().toLowerCase();
+        });
+    }
+
+    return index.sortKeys[column] = { numbers, strings };
+}
+
+function sortRows(index, rows, column, asc) {
+    const { numbers, strings } = sortKeysFor(index, column);
+    const dir = asc ? 1 : -1;
+    if (!strings) {
+        rows.sort((a, b) => dir * (numbers[a] - numbers[b]));
+        return;
+    }
+    rows.sort((a, b) => {
+        if (!isNaN(numbers[a]) && !isNaN(numbers[b])) return dir * (numbers[a] - numbers[b]);
+        const valA = strings[a];
+        const valB = strings[b];
+        if (valA < valB) return -dir;
+        if (valA > valB) return dir;
+        return 0;
+    });
+}
+
+if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    let dataset = { generation: null, index: indexCases([]) };
+    let latestFilter = 0;
+
+    // Let queued messages (a newer filter) run before continuing
+    const yieldChannel = new MessageChannel();
+    const yielded = [];
+    yieldChannel.port1.onmessage = () => yielded.shift()();
+    const yieldToMessages = () => new Promise(resolve => {
+        yielded.push(resolve);
+        yieldChannel.port2.postMessage(null);
+    });
+
+    async function parseFile({ generation, file, existing }) {
+        const parser = new CsvParser();
+        const decoder = new TextDecoder();
+        const encoder = new TextEncoder();
+        const cases = [];
+        const counts = {};
+        const fileParts = []; // cases.json for the user to download, built batch by batch
+        let batch = [];
+
+        const sendBatch = () => {
+            if (!batch.length) return;
+            const text = JSON.stringify(batch);
+            fileParts.push(fileParts.length ? ',' : '[', text.slice(1, -1));
+            const bytes = encoder.encode(text);
+            postMessage({ type: 'cases', generation, buffer: bytes.buffer }, [bytes.buffer]);
+            batch = [];
+        };
+        const addRows = rows => {
+            rows.forEach(row => {
+                const c = caseFromRow(parser, row, existing);
+                if (c.status) counts[c.status] = (counts[c.status] || 0) + 1;
+                cases.push(c);
+                batch.push(c);
+                if (batch.length >= PARSE_BATCH_CASES) sendBatch();
+            });
+        };
+
+        for (let offset = 0; offset < file.size; offset += PARSE_READ_BYTES) {
+            const chunk = await file.slice(offset, offset + PARSE_READ_BYTES).arrayBuffer();
+            addRows(parser.push(decoder.decode(chunk, { stream: true })));
+            const bytes = Math.min(offset + PARSE_READ_BYTES, file.size);
+            postMessage({ type: 'progress', generation, bytes, total: file.size, rows: cases.length });
+        }
+        addRows(parser.push(decoder.decode()));
+        addRows(parser.finish());
+        sendBatch();
+        fileParts.push(fileParts.length ? ']' : '[]');
+
+        dataset = { generation, index: indexCases(cases) };
+        postMessage({
+            type: 'parsed',
+            generation,
+            summary: { total_cases: cases.length, status_distribution: counts },
+            file: new Blob(fileParts, { type: 'application/json' })
+        });
+    }
+
+    async function filter({ generation, seq, filters, sort }) {
+        const index = dataset.index;
+        const total = index.cases.length;
+        const rows = [];
+        for (let from = 0; from < total; from += FILTER_CHUNK_ROWS) {
+            filterRows(index, filters, from, Math.min(from + FILTER_CHUNK_ROWS, total), rows);
+            await yieldToMessages();
+            // Superseded by a newer query or dataset
+            if (seq !== latestFilter || dataset.index !== index) return;
+        }
+        if (sort) sortRows(index, rows, sort.key, sort.asc);
+        const positions = Int32Array.from(rows);
+        postMessage({ type: 'rows', generation, seq, rows: positions, counts: statusCounts(index.cases, rows) }, [positions.buffer]);
+    }
+
+    self.onmessage = async event => {
+        const message = event.data;
+        try {
+            switch (message.type) {
+                case 'load':
+                    dataset = {
+                        generation: message.generation,
+                        index: indexCases(casesFromColumns(JSON.parse(new TextDecoder().decode(message.buffer))))
+                    };
+                    break;
+                case 'parse':
+                    await parseFile(message);
+                    break;
+                case 'filter':
+                    latestFilter = message.seq;
+                    // A query for a dataset still being parsed is repeated once it is ready
+                    if (message.generation === dataset.generation) await filter(message);
+                    break;
+                case 'edit':
+                    if (message.generation === dataset.generation && dataset.index.cases[message.position]) {
+                        dataset.index.cases[message.position][message.field] = message.value;
+                        updateIndexedCase(dataset.index, message.position, message.field);
+                    }
+                    break;
+            }
+        } catch (err) {
+            postMessage({ type: 'error', generation: message.generation, message: String(err && err.message || err) });
+        }
+    };
+}
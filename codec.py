@@ -0,0 +1,134 @@
+"""JSON encoding for the dashboard's data files and responses.
+
+dumps() and loads() are used for cases.json, data.json, the case journal
+and the JSON served to the browser. Output is compact, with no indentation
+and no ASCII escaping. orjson is used when it is installed, and the stdlib
+json module otherwise; both produce the same documents.
+
+Cases are stored as rows: a list of case objects. to_columns() gives the
+column-oriented layout that /cases.json?layout=columns serves. In it, each
+field name appears once, and repeated values (status, assignee, components,
+dates) are dictionary-encoded as a list of distinct values plus one small
+integer code per case.
+"""
+import json
+import re
+from itertools import chain
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# A column is dictionary-encoded when it has at most this many distinct values per case
+DICTIONARY_RATIO = 0.5
+
+# Bytes iter_array() reads at a time
+READ_BYTES = 1024 * 1024
+
+_ABSENT = object()
+
+# Where one object in an array ends and the next begins, or a look-alike inside a string
+_BETWEEN_OBJECTS = re.compile(rb"\}\s*,\s*\{")
+
+
+def dumps(obj):
+    """Compact JSON as UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(f):
+    return loads(f.read())
+
+
+def iter_array(f):
+    """The objects in the JSON array file f holds, parsed READ_BYTES at a time.
+
+    Each read is cut after the last "},{" between two objects and the part
+    before it parsed as an array of its own. A cut that falls inside a
+    string or a nested object leaves that part invalid, so it is retried at
+    the previous one.
+    """
+    buffer = f.read(READ_BYTES).lstrip()
+    if not buffer.startswith(b"["):
+        raise ValueError("expected a JSON array")
+    buffer = buffer[1:]
+    while True:
+        data = f.read(READ_BYTES)
+        if not data:
+            break
+        buffer += data
+        for cut in reversed([match.start() for match in _BETWEEN_OBJECTS.finditer(buffer)]):
+            try:
+                objects = loads(b"[" + buffer[:cut + 1] + b"]")
+            except ValueError:
+                continue
+            yield from objects
+            buffer = buffer[buffer.index(b"{", cut):]
+            break
+    yield from loads(b"[" + buffer)
+
+
+def _dictionary(values):
+    """(distinct values, codes) if the column is worth dictionary-encoding, else None"""
+    try:
+        distinct = dict.fromkeys(values)
+    except TypeError:  # unhashable values (lists, objects) stay plain
+        return None
+    if len(distinct) > len(values) * DICTIONARY_RATIO:
+        return None
+    codes = {value: code for code, value in enumerate(distinct)}
+    return list(distinct), list(map(codes.__getitem__, values))
+
+
+def to_columns(cases):
+    """The column-oriented layout of a cases list.
+
+    {"layout": "columns", "length": n, "fields": [...], "columns": {field: column},
+    "absent": {field: [row, ...]}}, where a column is either the list of values
+    or {"values": [...], "codes": [...]}. "absent" lists the rows that lack a
+    field, and is only present when some do.
+    """
+    fields = list(dict.fromkeys(chain.from_iterable(cases)))  # in order of first appearance
+    columns = {}
+    absent = {}
+    for field in fields:
+        values = [case.get(field, _ABSENT) for case in cases]
+        if _ABSENT in values:
+            absent[field] = [row for row, value in enumerate(values) if value is _ABSENT]
+            values = [None if value is _ABSENT else value for value in values]
+        dictionary = _dictionary(values)
+        columns[field] = values if dictionary is None else {"values": dictionary[0], "codes": dictionary[1]}
+
+    document = {"layout": "columns", "length": len(cases), "fields": fields, "columns": columns}
+    if absent:
+        document["absent"] = absent
+    return document
+
+
+def from_columns(document):
+    """The cases list a to_columns() document was made from"""
+    columns = []
+    for field in document["fields"]:
+        column = document["columns"][field]
+        if isinstance(column, dict):
+            values = column["values"]
+            column = [values[code] for code in column["codes"]]
+        columns.append(column)
+
+    cases = [dict(zip(document["fields"], row)) for row in zip(*columns)]
+    if not document["fields"]:
+        cases = [{} for _ in range(document["length"])]
+    for field, rows in document.get("absent", {}).items():
+        for row in rows:
+            del cases[row][field]
+    return cases
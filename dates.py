@@ -0,0 +1,167 @@
+"""Date normalization for Jira export columns.
+
+Jira exports carry target dates in one of a handful of formats, usually one
+per export. Columns are parsed by detecting the dominant format once and
+converting every distinct value in bulk; only values the dominant format
+rejects fall back to the per-value parser, whose results are memoized since
+target dates repeat heavily across issues.
+
+The column functions import pandas on first use, so the web app, which
+only needs the per-value parsers, starts without loading it.
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+DATE_FORMATS = ["%d/%b/%y", "%d/%m/%y", "%d-%m-%Y", "%Y-%m-%d"]
+
+# Distinct values sampled when picking a column's dominant format
+DETECT_SAMPLE_SIZE = 200
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str):
+    """Parse a single date string, trying every supported format in order"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def week_label(date_obj):
+    """Format a date as W<ISO week>-<year>"""
+    return f"W{date_obj.isocalendar()[1]:02d}-{date_obj.year}"
+
+
+@lru_cache(maxsize=4096)
+def _cached_week_number(date_str):
+    date_obj = parse_date(date_str)
+    return week_label(date_obj) if date_obj else ""
+
+
+def calculate_week_number(date_str):
+    """Calculate ISO week number from date string"""
+    if not date_str or date_str.strip() == "":
+        return ""
+    return _cached_week_number(date_str.strip())
+
+
+def detect_format(values):
+    """Return the format that parses the most of a sample of values, or None"""
+    import pandas as pd
+
+    sample = pd.Series(values[:DETECT_SAMPLE_SIZE], dtype=object)
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum()
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def _parse_unique(values):
+    """Parse an array of distinct, non-empty, stripped date strings"""
+    import pandas as pd
+
+    parsed = pd.Series(pd.NaT, index=range(len(values)), dtype="datetime64[us]")
+    date_format = detect_format(values)
+    if date_format:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format=date_format, errors="coerce")
+
+    # Values the dominant format rejected take the slow, memoized path
+    leftovers = {i: parse_date(values[i]) for i in parsed.index[parsed.isna()]}
+    return parsed, {i: date_obj for i, date_obj in leftovers.items() if date_obj}
+
+
+def parse_dates(dates):
+    """Parse a Series of date strings into a datetime Series (NaT when unparseable)"""
+    import numpy as np
+    import pandas as pd
+
+    dates = dates.fillna("").astype(str).str.strip()
+    codes, uniques = pd.factorize(dates)
+    uniques = list(uniques)
+
+    # Microsecond resolution covers every year strptime accepts
+    lookup = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[us]")
+    non_empty = [i for i, value in enumerate(uniques) if value]
+    if non_empty:
+        parsed, leftovers = _parse_unique([uniques[i] for i in non_empty])
+        lookup[non_empty] = parsed.to_numpy(dtype="datetime64[us]")
+        for i, date_obj in leftovers.items():
+            lookup[non_empty[i]] = np.datetime64(date_obj, "us")
+
+    return pd.Series(lookup[codes], index=dates.index)
+
+
+def week_numbers(dates):
+    """Vectorized calculate_week_number over a Series of date strings"""
+    import pandas as pd
+
+    dates = dates.fillna("").astype(str).str.strip()
+    codes, uniques = pd.factorize(dates)
+    uniques = list(uniques)
+
+    labels = [""] * len(uniques)
+    non_empty = [i for i, value in enumerate(uniques) if value]
+    if non_empty:
+        parsed, leftovers = _parse_unique([uniques[i] for i in non_empty])
+        valid = parsed.notna()
+        if valid.any():
+            iso_week = parsed[valid].dt.isocalendar().week.astype(int)
+            year = parsed[valid].dt.year.astype(int)
+            for i, week, yr in zip(parsed.index[valid], iso_week, year):
+                labels[non_empty[i]] = f"W{week:02d}-{yr}"
+        for i, date_obj in leftovers.items():
+            labels[non_empty[i]] = week_label(date_obj)
+
+    weeks = pd.Series(labels, dtype=object).to_numpy()
+    return pd.Series(weeks[codes], index=dates.index, dtype=object)
+
+
+MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+          "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+
+# parse_jira_date result for strings the dashboard treats as a date that
+# compares false against everything (a JavaScript "Invalid Date")
+INVALID_DATE = "invalid"
+
+
+def _js_parse_int(text):
+    """parseInt(text, 10): leading whitespace, optional sign, then leading digits"""
+    text = text.lstrip()
+    sign = 1
+    if text[:1] in ("+", "-"):
+        sign = -1 if text[0] == "-" else 1
+        text = text[1:]
+    digits = len(text) - len(text.lstrip("0123456789"))
+    return sign * int(text[:digits]) if digits else None
+
+
+@lru_cache(maxsize=4096)
+def parse_jira_date(date_str):
+    """Server-side twin of parseJiraDate() in index.html (dd/MMM/yy only).
+
+    Returns a date, None for "no date", or INVALID_DATE where the browser
+    would build an Invalid Date. Day overflow rolls into the next month
+    like JavaScript's Date constructor.
+    """
+    if not date_str:
+        return None
+    parts = date_str.split("/")
+    if len(parts) != 3:
+        return None
+    month = MONTHS.get(parts[1].lower())
+    if month is None:
+        return None
+    day = _js_parse_int(parts[0])
+    year = _js_parse_int(parts[2])
+    if day is None or year is None:
+        return INVALID_DATE
+    try:
+        return date(2000 + year, month, 1) + timedelta(days=day - 1)
+    except (ValueError, OverflowError):
+        return INVALID_DATE
@@ -0,0 +1,154 @@
+"""Server-Sent Events telling open dashboards what changed.
+
+A ChangeFeed watches the case store: one thread per process wakes when a
+request in this process writes (wake()), and otherwise polls the store's
+revision, which also catches writes from other worker processes. Each new
+revision becomes a few small events in a shared backlog:
+
+- edit:    {issue_key, field, value, revision}, one per changed field
+- summary: {total_cases, status_distribution}, when the chart's counts move
+- reload:  {revision}, when the cases were replaced (an upload or /save_all
+           rebuilt them) or more fields changed than are worth sending
+
+Every connected dashboard waits on the same condition variable and only
+formats events when the backlog grows, so an idle connection costs a
+sleeping thread, or a greenlet under an async worker such as
+gunicorn -k gevent. Event IDs are store revisions, so a reconnecting
+EventSource resumes from its Last-Event-ID.
+
+Under sync workers a held connection costs a whole worker, so there
+dashboards poll instead: changes_after() answers from the same backlog
+at once, and a poll with nothing new is answered from the revision alone.
+"""
+import threading
+import time
+from collections import deque
+
+import codec
+
+# Events kept for reconnecting clients; older clients get a reload
+BACKLOG = 2000
+
+# More field changes than this in one revision step are sent as a reload
+MAX_EDIT_EVENTS = 500
+
+
+def _event(revision, name, data):
+    """(revision, SSE frame, {"event", "data"} JSON for polling) of one event"""
+    data = codec.dumps(data).decode("utf-8")
+    return (revision, f"id: {revision}\nevent: {name}\ndata: {data}\n\n",
+            f'{{"event":"{name}","revision":{revision},"data":{data}}}')
+
+
+class ChangeFeed:
+    def __init__(self, store, interval=1.0, heartbeat=15.0):
+        self.store = store
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._events = deque()  # _event() tuples
+        self._base = None  # the backlog holds every change after this revision
+        self._revision = None
+        self._summary = None
+        self._poller = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._poller is None or not self._poller.is_alive():
+                with self._condition:
+                    if self._revision is None:
+                        self._revision = self._base = self.store.revision
+                        self._summary = self._current_summary()
+                self._poller = threading.Thread(target=self._poll_loop, name="change-feed", daemon=True)
+                self._poller.start()
+
+    def wake(self):
+        """Check the store now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _current_summary(self):
+        cube = self.store.aggregates()
+        return {"total_cases": cube.total, "status_distribution": cube.status_distribution()}
+
+    def _poll_loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Warning: Could not check for case changes: {e}")
+
+    def poll(self):
+        """Turn store changes since the last poll into events"""
+        if self.store.revision == self._revision:
+            return
+        # The revision from the same read as the changes, so the next poll starts where they end
+        revision, changes = self.store.changes_snapshot(self._revision)
+        events = []
+        if changes is None or len(changes) > MAX_EDIT_EVENTS:
+            events.append(_event(revision, "reload", {"revision": revision}))
+        else:
+            for issue_key, field, value, change_revision in changes:
+                data = {"issue_key": issue_key, "field": field, "value": value, "revision": change_revision}
+                events.append(_event(change_revision, "edit", data))
+        summary = self._current_summary()
+        if summary != self._summary:
+            events.append(_event(revision, "summary", summary))
+        with self._condition:
+            self._events.extend(events)
+            while len(self._events) > BACKLOG:
+                self._base = max(self._base, self._events.popleft()[0])
+            self._revision = revision
+            self._summary = summary
+            self._condition.notify_all()
+
+    def _frames_after(self, revision, part=1):
+        """Frames a client at revision has not seen, or None if the backlog no longer reaches back that far"""
+        if revision >= self._revision:
+            return []
+        if revision < self._base:
+            return None
+        return [event[part] for event in self._events if event[0] > revision]
+
+    @property
+    def revision(self):
+        """The store revision the events go up to"""
+        self._start()
+        with self._condition:
+            return self._revision
+
+    def changes_after(self, last_revision=None):
+        """(revision, JSON array text of the events a polling client at last_revision has not seen)"""
+        self._start()
+        with self._condition:
+            revision = self._revision
+            events = [] if last_revision is None else self._frames_after(last_revision, part=2)
+        if events is None:
+            events = [_event(revision, "reload", {"revision": revision})[2]]
+        return revision, f'[{",".join(events)}]'
+
+    def stream(self, last_revision=None, duration=None):
+        """Generator of SSE text for one client, starting after last_revision"""
+        self._start()
+        deadline = None if duration is None else time.monotonic() + duration
+        with self._condition:
+            revision = self._revision if last_revision is None else last_revision
+        yield "retry: 3000\n\n"
+
+        while deadline is None or time.monotonic() < deadline:
+            with self._condition:
+                frames = self._frames_after(revision)
+                if frames == []:
+                    wait = self.heartbeat if deadline is None else min(self.heartbeat, deadline - time.monotonic())
+                    self._condition.wait(max(wait, 0))
+                    frames = self._frames_after(revision)
+                current = self._revision
+            if frames is None:
+                # Missed too much to patch in place
+                frames = [_event(current, "reload", {"revision": current})[1]]
+            revision = max(revision, current)
+            # A comment line keeps proxies from closing an idle connection
+            yield "".join(frames) if frames else ": keep-alive\n\n"
@@ -0,0 +1,448 @@
+"""Week-by-week history of the cases, one snapshot per ingest, stored as deltas.
+
+Every ingest (see ingest.py) records a snapshot of the tracked fields of
+every case, but only what changed since the previous snapshot is written:
+history/deltas.jsonl gets one line per snapshot with the issues added and
+removed and an [issue_key, field, old, new] entry per changed field, and
+history/snapshots.jsonl a small header (time, ISO week, totals, status
+counts and where its delta line starts). The history therefore grows with
+the changes, not with the number of cases times the number of weeks.
+
+The first snapshot is a baseline: its state is written to checkpoint-1.json
+and its delta is empty. After that, whenever the deltas since the last
+checkpoint add up to CHECKPOINT_RATIO of the cases, the full tracked state
+is written to checkpoint-<seq>.json as well. The state at any snapshot is
+its nearest earlier checkpoint plus the deltas after it, so nothing is
+replayed from the first snapshot. Checkpoints are JSON with a line per
+CHECKPOINT_BATCH cases, so one is read back a line at a time.
+
+- weekly_counts(): the last snapshot of each of the latest weeks, with its
+  status counts from the headers alone, or other breakdowns and filters by
+  rolling a CaseCube forward from a checkpoint
+- changes_between(): what moved between two snapshots, from their deltas
+- issue_history(): one issue's transitions, from an in-memory index of every
+  delta entry by issue (read once per process, then kept up to date)
+
+Writers in all processes serialize on history/history.lock, so an ingest
+records its snapshot after it has let go of the case store's lock; readers
+pick up other processes' snapshots from the tail of snapshots.jsonl.
+"""
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+import codec
+from aggregates import DIMENSIONS, CaseCube
+from storage import FileLock, atomic_writer
+
+# Case fields kept in the history; the CaseCube dimensions come first, so a
+# case's cube cell is a prefix of its tracked values
+TRACKED_FIELDS = DIMENSIONS + ("target_start", "target_end")
+FIELD_POSITIONS = {field: position for position, field in enumerate(TRACKED_FIELDS)}
+
+# A checkpoint is written once the deltas since the last one reach this share of the cases
+CHECKPOINT_RATIO = 0.5
+
+# Cases per line of a checkpoint file
+CHECKPOINT_BATCH = 1000
+
+WEEK_LABEL = re.compile(r"W(\d{1,2})-(\d{4})")
+
+
+def _iso_week(header):
+    """(ISO year, ISO week) a snapshot was taken in; late December can be week 1 of the next year"""
+    year, week, _ = datetime.fromisoformat(header["taken"]).isocalendar()
+    return year, week
+
+
+def _week_label(year, week):
+    return f"W{week:02d}-{year}"
+
+
+def _values(case):
+    return tuple("" if case.get(field) is None else str(case.get(field)) for field in TRACKED_FIELDS)
+
+
+class TrackedCases:
+    """The tracked values of each issue key's first case, fed a chunk of cases at a time.
+
+    What History.record() keeps of the cases, so a streaming ingest can
+    collect it as the chunks go by instead of reading the cases back.
+    Repeated values (statuses, assignees, dates) are shared between cases.
+    """
+
+    def __init__(self, cases=()):
+        self.values = {}  # issue_key -> tracked values
+        self._pool = {}
+        self.add(cases)
+
+    def add(self, cases):
+        pool = self._pool
+        for case in cases:
+            issue_key = case.get("issue_key")
+            if issue_key and issue_key not in self.values:
+                self.values[issue_key] = tuple(pool.setdefault(value, value) for value in _values(case))
+
+
+def _write_checkpoint(path, seq, state):
+    """{"seq": seq, "fields": [...], "cases": state} as JSON, CHECKPOINT_BATCH cases to a line"""
+    items = iter(state.items())
+    with atomic_writer(path) as f:
+        f.write(codec.dumps({"seq": seq, "fields": TRACKED_FIELDS})[:-1] + b',"cases":{\n')
+        separator = b""
+        while True:
+            batch = dict(islice(items, CHECKPOINT_BATCH))
+            if not batch:
+                break
+            f.write(separator + codec.dumps(batch)[1:-1])
+            separator = b",\n"
+        f.write(b"\n}}\n")
+
+
+def _read_checkpoint(path):
+    """The state _write_checkpoint() wrote, parsed a line at a time; repeated values are shared"""
+    pool = {}
+    state = {}
+    with open(path, "rb") as f:
+        first = f.readline()
+        if first.endswith(b'"cases":{\n'):
+            batches = (codec.loads(b"{" + line.rstrip(b",\n") + b"}") for line in f if line != b"}}\n")
+        else:
+            # Written in one piece
+            batches = [codec.loads(first + f.read())["cases"]]
+        for batch in batches:
+            for key, values in batch.items():
+                state[key] = tuple(pool.setdefault(value, value) for value in values)
+    return state
+
+
+def _case(values):
+    return dict(zip(TRACKED_FIELDS, values))
+
+
+def _status_counts(state):
+    """Non-empty statuses, most common first, like CaseCube.status_distribution()"""
+    counts = Counter(values[0] for values in state.values())
+    counts.pop("", None)
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def _append(path, *data):
+    """Append data, one or more bytes back to back, to path and fsync; returns the offset it was written at"""
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.writelines(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset
+
+
+class History:
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshots_path = os.path.join(directory, "snapshots.jsonl")
+        self.deltas_path = os.path.join(directory, "deltas.jsonl")
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(directory, "history.lock"))
+        self._headers = []  # snapshot headers, oldest first
+        self._by_seq = {}
+        self._offset = 0  # bytes of snapshots.jsonl read so far
+        self._state = None  # issue_key -> tracked values at _state_seq, kept by the recording process
+        self._state_seq = 0
+        self._issue_events = None  # issue_key -> [(seq, event, field, old, new)], built on first use
+
+    # ─── Reading ─────────────────────────────────────────────────────
+    def _refresh(self):
+        """Read snapshot headers appended since the last call (by any process)"""
+        try:
+            size = os.path.getsize(self.snapshots_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._offset:
+            # Replaced or removed: start over
+            self._headers, self._by_seq, self._offset = [], {}, 0
+            self._state, self._state_seq, self._issue_events = None, 0, None
+        if size == self._offset:
+            return
+        with open(self.snapshots_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # A torn final line (a crash mid-append) is left unread
+        end = data.rfind(b"\n") + 1
+        new = []
+        for line in data[:end].splitlines():
+            try:
+                new.append(codec.loads(line))
+            except ValueError:
+                print(f"Warning: Skipping unreadable line in {self.snapshots_path}")
+        for header in new:
+            # Snapshots recorded before weeks were labelled by ISO year may carry the calendar year
+            header["week"] = _week_label(*_iso_week(header))
+        self._offset += end
+        self._headers.extend(new)
+        self._by_seq.update((header["seq"], header) for header in new)
+        if self._issue_events is not None:
+            self._index(new)
+
+    def _deltas(self, headers):
+        """(header, delta) for each header, reading only those lines of deltas.jsonl"""
+        if not headers:
+            return
+        with open(self.deltas_path, "rb") as f:
+            for header in headers:
+                offset, length = header["delta"]
+                f.seek(offset)
+                yield header, codec.loads(f.read(length))
+
+    def _checkpoint_path(self, seq):
+        return os.path.join(self.directory, f"checkpoint-{seq:06d}.json")
+
+    def _state_at(self, seq):
+        """{issue_key: tracked values} as of snapshot seq"""
+        if seq == self._state_seq and self._state is not None:
+            return dict(self._state)
+        checkpoint = max((h["seq"] for h in self._headers if h["checkpoint"] and h["seq"] <= seq), default=None)
+        state = {}
+        if checkpoint is not None:
+            state = _read_checkpoint(self._checkpoint_path(checkpoint))
+        headers = [h for h in self._headers if (checkpoint or 0) < h["seq"] <= seq]
+        for _, delta in self._deltas(headers):
+            self._apply(state, delta)
+        return state
+
+    @staticmethod
+    def _apply(state, delta, cube=None):
+        """Move state (and cube, if given) forward by one snapshot's delta"""
+        for key in delta["removed"]:
+            values = state.pop(key, None)
+            if cube is not None and values is not None:
+                cube.remove([_case(values)])
+        for key, values in delta["added"].items():
+            state[key] = tuple(values)
+            if cube is not None:
+                cube.add([_case(values)])
+        for key, field, _, new in delta["changes"]:
+            values = list(state[key])
+            if cube is not None:
+                cube.update(_case(values), field, new)
+            values[FIELD_POSITIONS[field]] = new
+            state[key] = tuple(values)
+
+    def _index(self, headers):
+        events = self._issue_events
+        for header, delta in self._deltas(headers):
+            seq = header["seq"]
+            for key in delta["removed"]:
+                events.setdefault(key, []).append((seq, "removed", None, None, None))
+            for key, values in delta["added"].items():
+                events.setdefault(key, []).append((seq, "added", None, None, values))
+            for key, field, old, new in delta["changes"]:
+                events.setdefault(key, []).append((seq, "changed", field, old, new))
+
+    # ─── Recording ───────────────────────────────────────────────────
+    def record(self, cases, taken=None):
+        """Add a snapshot of cases (or a TrackedCases); returns the snapshot's header"""
+        current = (cases if isinstance(cases, TrackedCases) else TrackedCases(cases)).values
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, self._file_lock:
+            self._refresh()
+            latest = self._headers[-1]["seq"] if self._headers else 0
+            previous = self._state if self._state_seq == latest and self._state is not None else self._state_at(latest)
+            # Used up below, leaving the removed issues; read back from disk if this fails partway
+            self._state = None
+
+            added = {}
+            # [issue_key, field, old, new] entries, serialized CHECKPOINT_BATCH issues at a time
+            changes = []
+            pending = []
+            moved_fields = 0
+            changed = 0
+            for key, values in current.items():
+                old = previous.pop(key, None)
+                if old is None:
+                    added[key] = values
+                elif old != values:
+                    entries = [[key, field, before, after]
+                               for field, before, after in zip(TRACKED_FIELDS, old, values) if before != after]
+                    pending.extend(entries)
+                    moved_fields += len(entries)
+                    changed += 1
+                    if changed % CHECKPOINT_BATCH == 0:
+                        changes.append(codec.dumps(pending)[1:-1])
+                        pending = []
+            if pending:
+                changes.append(codec.dumps(pending)[1:-1])
+            removed = previous
+
+            seq = latest + 1
+            if seq == 1:
+                # The first snapshot is the baseline, kept only as a checkpoint
+                added = {}
+            moved = len(added) + len(removed) + moved_fields
+            since_checkpoint = moved
+            for header in reversed(self._headers):
+                if header["checkpoint"]:
+                    break
+                since_checkpoint += header["moved"]
+            checkpoint = seq == 1 or since_checkpoint >= CHECKPOINT_RATIO * max(1, len(current))
+
+            delta = [codec.dumps({"seq": seq, "added": added, "removed": removed})[:-1] + b',"changes":[',
+                     b",".join(changes), b"]}\n"]
+            offset = _append(self.deltas_path, *delta)
+            if checkpoint:
+                _write_checkpoint(self._checkpoint_path(seq), seq, current)
+
+            taken = taken or datetime.now().astimezone()
+            year, week, _ = taken.isocalendar()
+            header = {
+                "seq": seq,
+                "taken": taken.isoformat(timespec="seconds"),
+                "week": _week_label(year, week),
+                "total": len(current),
+                "status_counts": _status_counts(current),
+                "added": len(added),
+                "removed": len(removed),
+                "changed": changed,
+                "moved": moved,
+                "checkpoint": checkpoint,
+                "delta": [offset, sum(map(len, delta))],
+            }
+            # Drop a torn line left by a crash so the new header starts on its own line
+            if os.path.exists(self.snapshots_path) and os.path.getsize(self.snapshots_path) > self._offset:
+                os.truncate(self.snapshots_path, self._offset)
+            line = codec.dumps(header) + b"\n"
+            _append(self.snapshots_path, line)
+            self._offset += len(line)
+            self._headers.append(header)
+            self._by_seq[seq] = header
+            self._state, self._state_seq = current, seq
+            if self._issue_events is not None:
+                self._index([header])
+            return header
+
+    # ─── Queries ─────────────────────────────────────────────────────
+    def snapshots(self):
+        """Every snapshot header, oldest first"""
+        with self._lock:
+            self._refresh()
+            return list(self._headers)
+
+    def resolve(self, since):
+        """The seq of a snapshot given as a seq or an ISO week label (its last snapshot); None if unknown"""
+        with self._lock:
+            self._refresh()
+            if isinstance(since, int) or str(since).isdigit():
+                seq = int(since)
+                return seq if seq == 0 or seq in self._by_seq else None
+            label = WEEK_LABEL.fullmatch(str(since))
+            if not label:
+                return None
+            week = int(label.group(2)), int(label.group(1))
+            matching = [h["seq"] for h in self._headers if _iso_week(h) == week]
+            return max(matching) if matching else None
+
+    def previous_week(self):
+        """The last snapshot from before the latest snapshot's week, or 0"""
+        with self._lock:
+            self._refresh()
+            if not self._headers:
+                return 0
+            latest = self._headers[-1]
+            week = _iso_week(latest)
+            earlier = [h["seq"] for h in self._headers if h["seq"] < latest["seq"] and _iso_week(h) != week]
+            return max(earlier, default=0)
+
+    def weekly_counts(self, weeks=12, group_by=("status",), filters=None):
+        """Case counts at the last snapshot of each of the latest weeks, oldest first.
+
+        Without filters, status counts come straight from the snapshot
+        headers. Otherwise a CaseCube is rolled forward from the checkpoint
+        before the first week, and each week is a CaseCube.breakdown().
+        """
+        with self._lock:
+            self._refresh()
+            last_of_week = {}
+            for header in self._headers:
+                week = _iso_week(header)
+                if week not in last_of_week or header["seq"] > last_of_week[week]["seq"]:
+                    last_of_week[week] = header
+            selected = sorted(last_of_week.values(), key=lambda h: h["seq"])[-weeks:] if weeks > 0 else []
+            if not selected:
+                return []
+
+            def point(header, total, groups):
+                return {"week": header["week"], "seq": header["seq"], "taken": header["taken"],
+                        "total": total, "groups": groups}
+
+            if tuple(group_by) == ("status",) and not filters:
+                return [point(h, h["total"], [{"status": status, "count": count}
+                                              for status, count in h["status_counts"].items()])
+                        for h in selected]
+
+            # Validates group_by and filters before any file is read
+            CaseCube().breakdown(group_by, filters)
+            first = selected[0]["seq"]
+            state = self._state_at(first)
+            cube = CaseCube(Counter(values[:len(DIMENSIONS)] for values in state.values()))
+            wanted = {h["seq"] for h in selected}
+            results = []
+
+            def add_point(header):
+                matched, groups = cube.breakdown(group_by, filters)
+                results.append(point(header, matched, [dict(zip(group_by, values), count=count)
+                                                       for values, count in groups.most_common()]))
+
+            add_point(self._by_seq[first])
+            later = [h for h in self._headers if first < h["seq"] <= selected[-1]["seq"]]
+            for header, delta in self._deltas(later):
+                self._apply(state, delta, cube)
+                if header["seq"] in wanted:
+                    add_point(header)
+            return results
+
+    def changes_between(self, since, until=None):
+        """What moved after snapshot since, up to snapshot until (default: the latest).
+
+        Returns (added keys, removed keys, {(issue_key, field): (from, to)}),
+        leaving out fields that changed and changed back.
+        """
+        with self._lock:
+            self._refresh()
+            until = until if until is not None else (self._headers[-1]["seq"] if self._headers else 0)
+            added, removed, moved = {}, {}, {}
+            for _, delta in self._deltas([h for h in self._headers if since < h["seq"] <= until]):
+                for key in delta["removed"]:
+                    if added.pop(key, None) is None:
+                        removed[key] = True
+                for key in delta["added"]:
+                    if removed.pop(key, None) is None:
+                        added[key] = True
+                for key, field, old, new in delta["changes"]:
+                    if (key, field) in moved:
+                        moved[(key, field)] = (moved[(key, field)][0], new)
+                    else:
+                        moved[(key, field)] = (old, new)
+            moved = {change: values for change, values in moved.items()
+                     if values[0] != values[1] and change[0] not in added and change[0] not in removed}
+            return list(added), list(removed), moved
+
+    def issue_history(self, issue_key):
+        """Every recorded event for one issue, oldest first"""
+        with self._lock:
+            self._refresh()
+            if self._issue_events is None:
+                self._issue_events = {}
+                self._index(self._headers)
+            events = []
+            for seq, event, field, old, new in self._issue_events.get(issue_key, []):
+                header = self._by_seq[seq]
+                entry = {"seq": seq, "taken": header["taken"], "week": header["week"], "event": event}
+                if event == "added":
+                    entry["values"] = _case(new)
+                elif event == "changed":
+                    entry.update({"field": field, "from": old, "to": new})
+                events.append(entry)
+            return events
@@ -0,0 +1,62 @@
+"""Serialized, precompressed copies of the JSON documents the dashboard loads.
+
+/cases.json and /data.json are rebuilt from the store only when its data
+changes: each DocumentCache keeps one body per dataset version together with
+its gzip (and, when the brotli package is installed, brotli) encoding and a
+strong ETag per encoding. A dashboard refresh then revalidates with
+If-None-Match and gets a 304 instead of the whole payload.
+"""
+import gzip
+import hashlib
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class EncodedDocument:
+    def __init__(self, revision, body, digest):
+        self.digest = digest
+        # The revision keeps tags readable; the digest keeps them unique if a store is reset
+        tag = f"{revision}-{digest}"
+        self.variants = {"identity": (body, tag)}
+        self.variants["gzip"] = (gzip.compress(body, GZIP_LEVEL, mtime=0), f"{tag}-gz")
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=BROTLI_QUALITY), f"{tag}-br")
+
+    @property
+    def encodings(self):
+        """Encodings to offer, best first"""
+        return [encoding for encoding in ("br", "gzip") if encoding in self.variants] + ["identity"]
+
+    def etags(self):
+        return [tag for _, tag in self.variants.values()]
+
+
+class DocumentCache:
+    """Keeps one EncodedDocument per dataset, re-rendered only when the store's cases or revision change"""
+
+    def __init__(self, render):
+        """render(cases) returns the document body as bytes"""
+        self._render = render
+        self._lock = threading.Lock()
+        self._cases = None
+        self._revision = None
+        self._document = None
+
+    def document_for(self, revision, cases):
+        with self._lock:
+            if cases is not self._cases or revision != self._revision:
+                body = self._render(cases)
+                digest = hashlib.sha1(body).hexdigest()[:16]
+                # Edits that leave this document unchanged keep its tags and encodings
+                if self._document is None or digest != self._document.digest:
+                    self._document = EncodedDocument(revision, body, digest)
+                self._cases = cases
+                self._revision = revision
+            return self._document
@@ -0,0 +1,186 @@
+"""Apply a Jira CSV export to a case store, writing only what changed.
+
+Used by the `/upload` route in app.py and by update_data.py. A weekly
+re-export usually changes a few percent of issues, so the export is diffed
+against the cases already in the store, matching rows to cases by issue
+key (see transform.diff_export): an unchanged or merely reordered export
+writes nothing, and changed fields, new issues and issues no longer
+exported are applied as one batch of edits, inserts and removals, which
+also keeps the aggregate cube current. Only when issue keys are blank or
+repeated, or so much changed that one journal record per change would cost
+more than a rewrite (transform.MAX_EDITS_PER_CASE), are the cases rebuilt
+and replaced in full.
+
+Exports larger than STREAM_INGEST_MB are instead rebuilt in chunks of
+CHUNK_ROWS rows: each chunk is transformed and written out before the next
+is read, and of the cases being replaced only hashes and the comment and
+planned week of each are kept (transform.PreviousCases), so peak memory
+depends mostly on the chunk size rather than on the export or the store.
+
+The comparison and transform run against a snapshot of the store without
+its lock, so the dashboard keeps reading and saving meanwhile. The lock is
+only taken to write the result, once store.changes_since() shows that
+nothing it was based on has changed; if an export field was edited or the
+cases replaced in the meantime, the ingest starts over (see MAX_ATTEMPTS).
+A streaming rebuild holds the lock while it writes, as the old cases leave
+memory as soon as it starts.
+
+Both accept an optional progress(phase, rows_processed) callback, which the
+upload job queue (jobs.py) uses to report how far an ingest has got. Time
+spent in each phase is recorded in metrics.INGEST_SECONDS. Given a History
+(history.py), each ingest also records a snapshot of the resulting cases.
+"""
+import os
+
+import metrics
+from aggregates import CaseCube
+from history import TrackedCases
+from transform import (EXPORT_FIELDS, ChangeCounter, PreviousCases, build_case_chunks, diff_export, read_export,
+                       read_export_chunks, summarize)
+
+STREAM_THRESHOLD = int(os.environ.get("STREAM_INGEST_MB", "32")) * 1024 * 1024
+CHUNK_ROWS = 50_000
+
+# Tries at an ingest prepared outside the store lock before the last, which
+# holds it throughout; a try only fails if an export field was edited meanwhile
+MAX_ATTEMPTS = 3
+
+
+def _ignore_progress(phase, rows):
+    pass
+
+
+def _record_history(history, cases):
+    if history is not None:
+        with metrics.ingest_phase("history"):
+            history.record(cases)
+
+
+def _prepare(df, previous, progress):
+    """(diff, cases, summary, changes) that bring previous up to date with df.
+
+    diff is diff_export()'s (edits, added, removed), or None if the cases
+    must be rebuilt, in which case cases and summary are the new ones.
+    """
+    progress("comparing", len(df))
+    with metrics.ingest_phase("compare"):
+        diff = diff_export(df, previous)
+    if diff is not None:
+        edits, added, removed = diff
+        changed = {issue_key for issue_key, _, _ in edits}
+        gone = set(removed)
+        changes = {
+            "added": len(added),
+            "changed": len(changed),
+            "removed": len(removed),
+            "unchanged": len(previous) - len(changed) - len(removed),
+            "comments_preserved": sum(1 for case in previous
+                                      if case.get("comments") and case["issue_key"] not in gone),
+        }
+        return diff, None, None, changes
+
+    progress("transforming", len(df))
+    with metrics.ingest_phase("merge"):
+        prior = PreviousCases(previous)
+    with metrics.ingest_phase("transform"):
+        cases = [case for chunk in build_case_chunks([df], prior) for case in chunk]
+        counter = ChangeCounter(prior)
+        counter.update(cases)
+        summary = summarize(cases)
+    return None, cases, summary, counter.result()
+
+
+def _apply(store, revision, diff, cases, summary, progress, rows):
+    """Write a _prepare() result made from the store at revision; call with the store locked.
+
+    Returns False, writing nothing, if the cases were replaced or an export
+    field was edited after revision. Comments and planned weeks edited
+    meanwhile are kept: field edits leave them alone, and a rebuild takes
+    their latest values.
+    """
+    changes = store.changes_since(revision)
+    if changes is None or any(field in EXPORT_FIELDS for _, field, _, _ in changes):
+        return False
+    if diff is None:
+        if changes:
+            first = {}
+            for case in cases:
+                first.setdefault(case["issue_key"], case)
+            for issue_key, field, value, _ in changes:
+                if issue_key in first:
+                    first[issue_key][field] = value
+            summary = summarize(cases)
+        progress("writing", rows)
+        with metrics.ingest_phase("write"):
+            store.replace(cases, summary)
+    elif any(diff):
+        edits, added, removed = diff
+        progress("writing", rows)
+        with metrics.ingest_phase("write"):
+            store.update_cases(((issue_key, field, value, None) for issue_key, field, value in edits),
+                               added, removed)
+    return True
+
+
+def ingest_export(store, filepath, progress=None, history=None):
+    """Bring the store up to date with the export at filepath; returns the change summary"""
+    if os.path.getsize(filepath) > STREAM_THRESHOLD:
+        return stream_export(store, filepath, progress=progress, history=history)
+
+    progress = progress or _ignore_progress
+    progress("reading", 0)
+    with metrics.ingest_phase("read"):
+        df = read_export(filepath)
+    metrics.INGEST_ROWS.inc(len(df))
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if attempt < MAX_ATTEMPTS:
+            # Compare and transform without the lock, so reads and edits carry on meanwhile
+            revision, previous = store.snapshot()
+            diff, cases, summary, changes = _prepare(df, previous, progress)
+            with store.locked():
+                if _apply(store, revision, diff, cases, summary, progress, len(df)):
+                    break
+        else:
+            # The export's fields keep being edited underneath us; do it all under the lock
+            with store.locked():
+                revision, previous = store.snapshot()
+                diff, cases, summary, changes = _prepare(df, previous, progress)
+                _apply(store, revision, diff, cases, summary, progress, len(df))
+    _record_history(history, store.cases())
+    changes["total_cases"] = len(df)
+    changes["rebuilt"] = diff is None
+    return changes
+
+
+def stream_export(store, filepath, chunksize=CHUNK_ROWS, progress=None, history=None):
+    """Rebuild the store from an export one chunk of rows at a time"""
+    progress = progress or _ignore_progress
+    progress("processing", 0)
+    with store.locked():
+        with metrics.ingest_phase("merge"):
+            # The old cases are streamed past once, keeping a few dozen bytes of each
+            previous = PreviousCases(store.iter_cases())
+        counter = ChangeCounter(previous)
+        cube = CaseCube()
+        tracked = TrackedCases()
+
+        def cases():
+            chunks = read_export_chunks(filepath, chunksize)
+            for chunk in build_case_chunks(chunks, previous):
+                counter.update(chunk)
+                cube.add(chunk)
+                if history is not None:
+                    tracked.add(chunk)
+                yield from chunk
+                progress("processing", cube.total)
+
+        # Reading, transforming and writing interleave chunk by chunk
+        with metrics.ingest_phase("stream"):
+            store.replace_streaming(cases(), lambda: cube.apply_to({}))
+    # Recorded from the values collected on the way through, not the cases read back
+    _record_history(history, tracked)
+    metrics.INGEST_ROWS.inc(cube.total)
+    changes = counter.result()
+    changes["total_cases"] = cube.total
+    changes["rebuilt"] = True
+    return changes
@@ -0,0 +1,196 @@
+"""Background processing of uploaded exports.
+
+/upload saves the file, hands it to a JobQueue and returns a job ID at once.
+A worker thread runs the jobs one at a time and records each job's state,
+phase and rows processed in a small JSON document under jobs/, so any WSGI
+worker can answer /api/jobs/<id>. A file whose contents match a job that is
+still queued or running joins that job instead of being processed twice;
+ingests from different processes serialize on the case store's lock.
+
+Uploads are saved to .upload-* files in the same directory (upload_path()).
+While a process holds a job, a heartbeat thread touches the job's document
+and upload file every HEARTBEAT_INTERVAL, and the document's modification
+time is reported as its updated_at. A queued or running job not touched
+for STALE_AFTER belonged to a process that has gone (a restart or a
+recycled worker): it is marked failed when next looked at, and upload
+files that old are deleted.
+"""
+import hashlib
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+import codec
+from storage import atomic_write_json
+
+# Finished job documents are kept this long
+JOB_RETENTION = 24 * 60 * 60
+
+# Progress is written to disk at most this often, plus on every phase change
+PROGRESS_INTERVAL = 0.5
+
+# Held jobs' documents and upload files are touched this often, and
+# abandoned once they go this long untouched
+HEARTBEAT_INTERVAL = 5
+STALE_AFTER = 60
+
+UPLOAD_PREFIX = ".upload-"
+
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class JobQueue:
+    def __init__(self, directory, run):
+        """run(path, progress) processes one file and returns the job's result document"""
+        self.directory = directory
+        self._run = run
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._active = {}  # file digest -> id of the queued or running job
+        self._held = {}  # id -> upload file of every job this process has queued or is running
+        self._worker = None
+        self._heartbeat = None
+        os.makedirs(directory, exist_ok=True)
+        self._prune()
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job):
+        atomic_write_json(self._path(job["id"]), job)
+
+    def upload_path(self):
+        """A new empty file to save an upload to before submit()"""
+        fd, path = tempfile.mkstemp(prefix=UPLOAD_PREFIX, suffix=".csv", dir=self.directory)
+        os.close(fd)
+        return path
+
+    def submit(self, path, filename):
+        """Queue the file at path, which the queue then owns; returns (job_id, is_new_job)"""
+        digest = file_digest(path)
+        with self._lock:
+            job_id = self._active.get(digest)
+            if job_id is not None:
+                os.unlink(path)
+                return job_id, False
+
+            job_id = uuid.uuid4().hex
+            self._active[digest] = job_id
+            self._held[job_id] = path
+            self._save({
+                "id": job_id,
+                "filename": filename,
+                "state": "queued",
+                "phase": "queued",
+                "rows_processed": 0,
+                "submitted_at": time.time(),
+            })
+            self._queue.put((job_id, digest, path))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name="upload-jobs", daemon=True)
+                self._worker.start()
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._beat, name="upload-jobs-heartbeat", daemon=True)
+                self._heartbeat.start()
+        self._prune()
+        return job_id, True
+
+    def status(self, job_id):
+        """The job's document with its updated_at, or None for an unknown ID"""
+        if not JOB_ID.fullmatch(job_id or ""):
+            return None
+        path = self._path(job_id)
+        try:
+            with open(path, "rb") as f:
+                job = codec.load(f)
+            updated_at = os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        if job["state"] in ("queued", "running") and updated_at < time.time() - STALE_AFTER:
+            with self._lock:
+                held = job_id in self._held
+            if not held:
+                # The process that held it has gone
+                print(f"Warning: Upload job {job_id} was abandoned while {job['state']}")
+                job.update(state="failed", finished_at=time.time(),
+                           error="The server restarted before this upload was processed. Please upload it again.")
+                self._save(job)
+                updated_at = job["finished_at"]
+        return dict(job, updated_at=updated_at)
+
+    def _beat(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self._lock:
+                held = list(self._held.items())
+            for job_id, path in held:
+                for held_path in (self._path(job_id), path):
+                    try:
+                        os.utime(held_path)
+                    except OSError:
+                        pass
+
+    def _work(self):
+        while True:
+            job_id, digest, path = self._queue.get()
+            job = self.status(job_id)
+            del job["updated_at"]
+            job.update(state="running", started_at=time.time())
+            self._save(job)
+            last_save = time.monotonic()
+
+            def progress(phase, rows):
+                nonlocal last_save
+                changed_phase = phase != job["phase"]
+                job.update(phase=phase, rows_processed=rows)
+                if changed_phase or time.monotonic() - last_save >= PROGRESS_INTERVAL:
+                    self._save(job)
+                    last_save = time.monotonic()
+
+            try:
+                job["result"] = self._run(path, progress)
+                job.update(state="done", phase="done")
+            except Exception as e:
+                print(f"Warning: Upload job {job_id} failed: {e}")
+                job.update(state="failed", error=str(e))
+            finally:
+                job["finished_at"] = time.time()
+                self._save(job)
+                with self._lock:
+                    self._active.pop(digest, None)
+                    self._held.pop(job_id, None)
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def _prune(self):
+        """Delete old finished jobs and abandoned uploads, and fail abandoned jobs"""
+        now = time.time()
+        with self._lock:
+            held = set(self._held) | set(self._held.values())
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                modified = os.path.getmtime(path)
+                if name.startswith(UPLOAD_PREFIX):
+                    if modified < now - STALE_AFTER and path not in held:
+                        os.unlink(path)
+                elif name.endswith(".json"):
+                    if modified < now - JOB_RETENTION:
+                        os.unlink(path)
+                    elif modified < now - STALE_AFTER and name[:-5] not in held:
+                        # Marks the job failed if it was abandoned
+                        self.status(name[:-5])
+            except (OSError, ValueError, KeyError):
+                pass
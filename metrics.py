@@ -0,0 +1,262 @@
+"""Timings and byte counts for the Flask app, served on /metrics.
+
+Each request's duration, request body and response body sizes are recorded
+per endpoint. With SERVER_TIMING set, the app also adds a Server-Timing
+header to signed-in users' responses listing the time spent waiting for the
+case store's file lock ("lock"), writing data files ("write"), verifying a
+password ("password") and in ingest phases, next to the whole request
+("app"); it is off by default, since those times tell anyone who can see
+them about the server and its accounts. Ingest phases (read, compare,
+merge, transform, write) and lock waits are also recorded outside
+requests, e.g. for uploads processed by the job queue.
+
+render() gives the Prometheus text format. Every WSGI worker process keeps
+its own numbers, so scrape each worker (or run a single one) for totals.
+
+Recording a request costs about 3 µs (a perf_counter() call at either end
+and a locked histogram and counter update), and each lock wait or write
+recorded during it about 1 µs more. Running the two hooks costs Flask a
+few µs on top, so a request pays 5-10 µs in all rather than the few µs
+first aimed for; benchmarks/bench_metrics.py measures both. SlowRequestProfiler is an opt-in sampler that
+records where requests slower than a threshold spend their time.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(label, value, extra=""):
+    pairs = [f'{label}="{value}"'] if label else []
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help, label=None, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # label value -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, value, label_value=None):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            series[slot] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for label_value, values in sorted(series.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {values[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, label_value=None):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value, value in sorted(values.items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {value}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("dashboard_request_seconds", "Time to handle a request", "endpoint")
+REQUEST_BYTES = Counter("dashboard_request_bytes_total", "Request body bytes received", "endpoint")
+RESPONSE_BYTES = Counter("dashboard_response_bytes_total", "Response body bytes sent (before streaming)", "endpoint")
+SLOW_REQUESTS = Counter("dashboard_slow_requests_total", "Requests over the profiler's threshold", "endpoint")
+INGEST_SECONDS = Histogram("dashboard_ingest_phase_seconds", "Time spent in each phase of an ingest", "phase")
+INGEST_ROWS = Counter("dashboard_ingest_rows_total", "Export rows ingested")
+LOCK_WAIT_SECONDS = Histogram("dashboard_lock_wait_seconds", "Time spent waiting for the case store's file lock")
+WRITE_SECONDS = Histogram("dashboard_file_write_seconds", "Time to write (and fsync) a data file or journal append")
+WRITE_BYTES = Counter("dashboard_file_write_bytes_total", "Bytes written to data files and the journal")
+LOGIN_ATTEMPTS = Counter("dashboard_login_attempts_total", "Sign-in attempts by outcome", "outcome")
+PASSWORD_SECONDS = Histogram("dashboard_password_check_seconds",
+                             "Time a sign-in waited for and spent verifying its password")
+
+REGISTRY = [REQUEST_SECONDS, REQUEST_BYTES, RESPONSE_BYTES, SLOW_REQUESTS, INGEST_SECONDS, INGEST_ROWS,
+            LOCK_WAIT_SECONDS, WRITE_SECONDS, WRITE_BYTES, LOGIN_ATTEMPTS, PASSWORD_SECONDS]
+
+_local = threading.local()
+_profiler = None
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record(histogram, seconds, label_value=None, timing=None):
+    """Observe seconds, and add them to the current request's Server-Timing as timing"""
+    histogram.observe(seconds, label_value)
+    if timing is not None:
+        timings = getattr(_local, "timings", None)
+        if timings is not None:
+            timings[timing] = timings.get(timing, 0.0) + seconds
+
+
+@contextmanager
+def ingest_phase(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(INGEST_SECONDS, time.perf_counter() - start, phase, timing=phase)
+
+
+def record_write(seconds, size):
+    record(WRITE_SECONDS, seconds, timing="write")
+    WRITE_BYTES.inc(size)
+
+
+def start_request():
+    _local.start = time.perf_counter()
+    _local.timings = {}
+    if _profiler is not None:
+        _profiler.watch()
+
+
+def finish_request(endpoint, request_bytes, response_bytes, server_timing=False):
+    """Record the current request; returns its Server-Timing header value if server_timing"""
+    start = getattr(_local, "start", None)
+    if start is None:
+        return None
+    elapsed = time.perf_counter() - start
+    timings = _local.timings
+    _local.start = _local.timings = None
+
+    REQUEST_SECONDS.observe(elapsed, endpoint)
+    if request_bytes:
+        REQUEST_BYTES.inc(request_bytes, endpoint)
+    if response_bytes:
+        RESPONSE_BYTES.inc(response_bytes, endpoint)
+    if _profiler is not None:
+        _profiler.finish(endpoint, elapsed)
+
+    if not server_timing:
+        return None
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"app;dur={elapsed * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def discard_request():
+    """Forget a request that ended without finish_request (e.g. on an error)"""
+    if getattr(_local, "start", None) is not None:
+        _local.start = _local.timings = None
+        if _profiler is not None:
+            _profiler.finish(None, 0.0)
+
+
+def enable_profiler(threshold, directory, interval=0.005):
+    global _profiler
+    _profiler = SlowRequestProfiler(threshold, directory, interval)
+    return _profiler
+
+
+def _collapse(frame):
+    """A stack as root-first "file:function" names joined by semicolons (flamegraph.pl input)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of requests that have run for longer than threshold seconds.
+
+    A background thread looks at the running requests every interval seconds
+    and, once one is past the threshold, records its stack. When the request
+    finishes, its samples are written to directory as collapsed stacks. Works
+    with threaded and sync workers; greenlets aren't visible to the sampler.
+    """
+
+    def __init__(self, threshold, directory, interval=0.005):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._running = {}  # thread id -> request start
+        self._samples = {}  # thread id -> StackCounter of collapsed stacks
+        self._sampler = None
+
+    def watch(self):
+        with self._lock:
+            self._running[threading.get_ident()] = time.perf_counter()
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="slow-request-profiler", daemon=True)
+                self._sampler.start()
+
+    def finish(self, endpoint, elapsed):
+        ident = threading.get_ident()
+        with self._lock:
+            self._running.pop(ident, None)
+            samples = self._samples.pop(ident, None)
+        if endpoint is None or elapsed < self.threshold:
+            return
+        SLOW_REQUESTS.inc(1, endpoint)
+        if samples:
+            self._save(endpoint, elapsed, samples)
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                slow = [ident for ident, start in self._running.items() if now - start >= self.threshold]
+                if not slow:
+                    continue
+                frames = sys._current_frames()
+                for ident in slow:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._samples.setdefault(ident, StackCounter())[_collapse(frame)] += 1
+
+    def _save(self, endpoint, elapsed, samples):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{elapsed * 1000:.0f}ms.txt"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Warning: Could not save profile of slow {endpoint} request: {e}")
+            return
+        print(f"Warning: Slow {endpoint} request ({elapsed * 1000:.0f} ms); profile saved to {name}")
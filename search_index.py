@@ -0,0 +1,180 @@
+"""Full-text search over issue keys, titles, comments, components and assignees.
+
+A SearchIndex maps every lowercased word in those fields to the cases that
+contain it, each with a weight for the field it was found in: a hit in the
+issue key counts most, then the title, components and assignee, then
+comments. Issue keys are also indexed whole, so "car-123" finds CAR-1234.
+
+A query is whitespace-separated terms that must all match. Each term
+matches a whole word at full weight or, from MIN_PREFIX characters on, the
+start of a word at half weight, so results appear while the user is still
+typing. A case's score is the sum over terms of its best matching word.
+
+The case stores keep the index in step with every edit they apply, the
+same way they keep the aggregate cube, so a saved comment is searchable by
+the next request. They build it without holding their lock, from copies
+of the cases, and resync() it with the edits made meanwhile.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+FIELD_WEIGHTS = {"issue_key": 8, "title": 4, "components": 2, "assignee": 2, "comments": 1}
+
+# Shorter terms only match whole words; "a" would otherwise match most of the vocabulary
+MIN_PREFIX = 2
+PREFIX_FACTOR = 0.5
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Recent terms' scores kept per index; typing "reverse flow p" then "reverse
+# flow pr" only scores the last term again. Cleared on every edit.
+TERM_CACHE_SIZE = 64
+
+
+def _tokens(field, value):
+    if value is None:
+        return set()
+    text = str(value).lower()
+    tokens = set(WORD_PATTERN.findall(text))
+    if field == "issue_key" and text and text not in tokens:
+        tokens.add(text)
+    return tokens
+
+
+def rank(scores, limit=None):
+    """The positions in scores best first, ties in dataset order; only the limit best if given"""
+    def key(position):
+        return -scores[position], position
+    if limit is None or len(scores) <= limit:
+        return sorted(scores, key=key)
+    return heapq.nsmallest(limit, scores, key=key)
+
+
+def _intersect(all_scores):
+    """Positions in every one of all_scores, with their scores summed"""
+    # Walk the smallest and look the rest up
+    all_scores = sorted(all_scores, key=len)
+    scores = dict(all_scores[0])
+    for other in all_scores[1:]:
+        scores = {position: score + other[position] for position, score in scores.items() if position in other}
+    return scores
+
+
+class SearchIndex:
+    def __init__(self, cases, indexed=None):
+        """Index cases; or, if given, indexed, a copy of each of them to read instead"""
+        self.cases = cases
+        # Edits arrive on the store's thread while requests search
+        self._lock = threading.Lock()
+        self._term_cache = OrderedDict()
+        self._postings = {}  # token -> {position: weight}
+        self._positions = {}  # issue_key -> position of the case edits apply to
+        for position, case in enumerate(cases if indexed is None else indexed):
+            issue_key = case.get("issue_key")
+            if issue_key:
+                self._positions.setdefault(issue_key, position)
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in _tokens(field, case.get(field)):
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        self._postings[token] = {position: weight}
+                    else:
+                        postings[position] = postings.get(position, 0) + weight
+        self._vocabulary = sorted(self._postings)
+
+    # ─── Updates ─────────────────────────────────────────────────────
+    def update(self, case, field, value):
+        """Account for case[field] changing to value; call before the case is modified"""
+        position = self._positions.get(case.get("issue_key"))
+        if position is not None and self.cases[position] is case:
+            self._change(position, field, case.get(field), value)
+
+    def resync(self, indexed, changes):
+        """Apply changes_since() the index was built from indexed, the copies given to the constructor"""
+        for issue_key, field, value, _ in changes:
+            position = self._positions.get(issue_key)
+            if position is not None:
+                # The copy holds whichever value was current when it was taken
+                self._change(position, field, indexed[position].get(field), value)
+
+    def _change(self, position, field, old, new):
+        weight = FIELD_WEIGHTS.get(field)
+        if weight is None:
+            return
+        old, new = _tokens(field, old), _tokens(field, new)
+        if old == new:
+            return
+        with self._lock:
+            self._term_cache.clear()
+            self._move(position, weight, old, new)
+
+    def _move(self, position, weight, old, new):
+        for token in old - new:
+            postings = self._postings[token]
+            postings[position] -= weight
+            if not postings[position]:
+                del postings[position]
+                if not postings:
+                    del self._postings[token]
+                    del self._vocabulary[bisect_left(self._vocabulary, token)]
+        for token in new - old:
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = {position: weight}
+                insort(self._vocabulary, token)
+            else:
+                postings[position] = postings.get(position, 0) + weight
+
+    # ─── Queries ─────────────────────────────────────────────────────
+    def _expand(self, term):
+        """(token, factor) for every indexed word term matches"""
+        matches = []
+        if term in self._postings:
+            matches.append((term, 1.0))
+        if len(term) >= MIN_PREFIX:
+            vocabulary = self._vocabulary
+            for i in range(bisect_left(vocabulary, term), len(vocabulary)):
+                token = vocabulary[i]
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    matches.append((token, PREFIX_FACTOR))
+        return matches
+
+    def _term_scores(self, term):
+        """{position: best score of a word term matches}; treat as read-only"""
+        scores = self._term_cache.get(term)
+        if scores is not None:
+            self._term_cache.move_to_end(term)
+            return scores
+
+        matches = self._expand(term)
+        if not matches and not WORD_PATTERN.fullmatch(term):
+            # "foo-bar" or "(project)": every word in it must match
+            words = WORD_PATTERN.findall(term)
+            scores = _intersect([self._term_scores(word) for word in words]) if words else {}
+        elif len(matches) == 1 and matches[0][1] == 1.0:
+            scores = self._postings[matches[0][0]]
+        else:
+            scores = {}
+            for token, factor in matches:
+                for position, weight in self._postings[token].items():
+                    score = weight * factor
+                    if score > scores.get(position, 0):
+                        scores[position] = score
+
+        self._term_cache[term] = scores
+        if len(self._term_cache) > TERM_CACHE_SIZE:
+            self._term_cache.popitem(last=False)
+        return scores
+
+    def search(self, query):
+        """{position in cases: score} of every case matching all of query's terms"""
+        terms = set(query.lower().split())
+        if not terms:
+            return {}
+        with self._lock:
+            return _intersect([self._term_scores(term) for term in terms])
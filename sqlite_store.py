@@ -0,0 +1,409 @@
+"""SQLite-backed case store.
+
+An optional alternative to CaseStore for large datasets, enabled with
+CASE_BACKEND=sqlite. Cases live in a local WAL-mode database (cases.db) with
+indexes on issue_key, status, assignee and planned_for_week; uploads replace
+every row in one transaction and edits are single-row updates; issues added
+or removed by a re-upload are inserted and deleted alongside. It exposes
+the same interface as CaseStore, so /cases.json still returns the same
+document, and the same live aggregate cube and full-text index.
+
+Migrate an existing deployment once with:
+    python sqlite_store.py migrate
+"""
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import codec
+from aggregates import CaseCube
+from case_store import CaseStore, StaleWriteError
+from search_index import SearchIndex
+from storage import FileLock
+from transform import CASE_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    position INTEGER PRIMARY KEY,
+    {columns},
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS cases_issue_key ON cases (issue_key);
+CREATE INDEX IF NOT EXISTS cases_status ON cases (status);
+CREATE INDEX IF NOT EXISTS cases_assignee ON cases (assignee);
+CREATE INDEX IF NOT EXISTS cases_planned_for_week ON cases (planned_for_week);
+CREATE TABLE IF NOT EXISTS field_revisions (
+    issue_key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    PRIMARY KEY (issue_key, field)
+);
+CREATE INDEX IF NOT EXISTS field_revisions_revision ON field_revisions (revision);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+""".format(columns=",\n    ".join(f"{field} TEXT" for field in CASE_FIELDS))
+
+INSERT_CASE = "INSERT INTO cases (position, {}, extra) VALUES (?, {}, ?)".format(
+    ", ".join(CASE_FIELDS), ", ".join("?" for _ in CASE_FIELDS))
+
+# Edits hit the first row with the key, like CaseStore's index
+FIRST_ROW = "SELECT MIN(position) FROM cases WHERE issue_key = ?"
+
+
+def _row_values(position, case):
+    extra = {k: v for k, v in case.items() if k not in CASE_FIELDS}
+    return ((position,) + tuple(_encode(case.get(field)) for field in CASE_FIELDS)
+            + (codec.dumps(extra).decode("utf-8") if extra else None,))
+
+
+def _encode(value):
+    # Columns are TEXT; anything that isn't a string round-trips through JSON
+    if value is None or isinstance(value, str):
+        return value
+    return "\0" + codec.dumps(value).decode("utf-8")
+
+
+def _decode(value):
+    if isinstance(value, str) and value.startswith("\0"):
+        return codec.loads(value[1:])
+    return value
+
+
+def _row_to_case(row):
+    case = {field: _decode(value) for field, value in zip(CASE_FIELDS, row[1:-1]) if value is not None}
+    if row[-1]:
+        case.update(codec.loads(row[-1]))
+    return case
+
+
+class SqliteCaseStore:
+    def __init__(self, path):
+        self.path = path
+        self._file_lock = FileLock(os.path.splitext(path)[0] + ".lock")
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        # Cached document, kept in step with the database by revision
+        self._cases = None
+        self._index = {}
+        self._cube = CaseCube()
+        self._search = None
+        self._search_build = threading.Lock()  # one search_snapshot() builds the index, the others wait
+        self._generation = None
+        self._revision = 0
+        with self._connection() as db:
+            db.executescript(SCHEMA)
+        atexit.register(self.compact)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _meta(db, key, default=None):
+        row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return codec.loads(row[0]) if row else default
+
+    @staticmethod
+    def _set_meta(db, key, value):
+        db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                   (key, codec.dumps(value).decode("utf-8")))
+
+    # ─── Reads ───────────────────────────────────────────────────────
+    def _refresh(self):
+        """Bring the cached document up to date with the database"""
+        db = self._connection()
+        # One read transaction so the revision and rows we see are consistent
+        db.execute("BEGIN")
+        try:
+            self._refresh_from(db)
+        finally:
+            db.execute("COMMIT")
+
+    def _refresh_from(self, db):
+        generation = self._meta(db, "generation", 0)
+        revision = self._meta(db, "revision", 0)
+        if self._cases is not None and generation == self._generation:
+            if revision != self._revision:
+                # Only fields edited since our last look need re-reading
+                changed = db.execute(
+                    "SELECT issue_key, field FROM field_revisions WHERE revision > ?", (self._revision,)).fetchall()
+                for issue_key, field in changed:
+                    case = self._index.get(issue_key)
+                    if case is not None and field in CASE_FIELDS:
+                        row = db.execute(f"SELECT {field} FROM cases WHERE position = ({FIRST_ROW})",
+                                         (issue_key,)).fetchone()
+                        value = _decode(row[0])
+                        self._cube.update(case, field, value)
+                        if self._search is not None:
+                            self._search.update(case, field, value)
+                        case[field] = value
+                self._revision = revision
+            return
+
+        rows = db.execute("SELECT * FROM cases ORDER BY position").fetchall()
+        self._cases = [_row_to_case(row) for row in rows]
+        self._cube = CaseCube.from_cases(self._cases)
+        self._search = None
+        self._index = {}
+        for case in self._cases:
+            issue_key = case.get("issue_key")
+            if issue_key:
+                self._index.setdefault(issue_key, case)
+        self._generation = generation
+        self._revision = revision
+
+    @property
+    def revision(self):
+        with self._lock:
+            return self._meta(self._connection(), "revision", 0)
+
+    def cases(self):
+        """All cases in upload order. Callers must treat the result as read-only."""
+        with self._lock:
+            self._refresh()
+            return self._cases
+
+    def snapshot(self):
+        """(revision, cases) read together"""
+        with self._lock:
+            self._refresh()
+            return self._revision, self._cases
+
+    def iter_cases(self):
+        """cases() one at a time, straight from the table; hold locked() while iterating"""
+        # A connection of its own, so the read can't collide with a transaction on this thread's
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            for row in db.execute("SELECT * FROM cases ORDER BY position"):
+                yield _row_to_case(row)
+        finally:
+            db.close()
+
+    def get(self, issue_key):
+        row = self._connection().execute(
+            f"SELECT * FROM cases WHERE position = ({FIRST_ROW})", (issue_key,)).fetchone()
+        return _row_to_case(row) if row else None
+
+    def aggregates(self):
+        """The live CaseCube. Callers must treat it as read-only."""
+        with self._lock:
+            self._refresh()
+            return self._cube
+
+    def search_snapshot(self):
+        """(revision, cases, SearchIndex) read together; the index is built on first use.
+
+        The build takes over a second at 100k cases, so it runs without the
+        store lock, from copies of the cases, and is brought up to date with
+        the edits made meanwhile before it is swapped in. If the cases were
+        replaced instead, this caller gets the index of the ones it copied.
+        """
+        with self._search_build:
+            with self._lock:
+                self._refresh()
+                if self._search is not None:
+                    return self._revision, self._cases, self._search
+                revision, cases = self._revision, self._cases
+            indexed = [dict(case) for case in cases]
+            search = SearchIndex(cases, indexed)
+            with self._lock:
+                changes = self.changes_since(revision)
+                if self._cases is not cases or changes is None:
+                    return revision, cases, search
+                search.resync(indexed, changes)
+                self._search = search
+                return self._revision, self._cases, self._search
+
+    def summary(self):
+        """The data.json summary document, with counts as of the latest edit"""
+        summary = self._meta(self._connection(), "summary", {"total_cases": 0, "status_distribution": {}})
+        return self.aggregates().apply_to(summary)
+
+    def changes_since(self, revision):
+        """(issue_key, field, value, revision) for each field last changed after revision, oldest first.
+
+        Returns None if the cases were replaced after revision, since then
+        every case may have changed.
+        """
+        return self.changes_snapshot(revision)[1]
+
+    def changes_snapshot(self, revision):
+        """(revision, changes_since(revision)) read together"""
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN")
+            try:
+                self._refresh_from(db)
+                if revision < self._meta(db, "replaced", 0):
+                    return self._revision, None
+                rows = db.execute("SELECT issue_key, field, revision FROM field_revisions WHERE revision > ? "
+                                  "ORDER BY revision", (revision,)).fetchall()
+            finally:
+                db.execute("COMMIT")
+            return self._revision, [(issue_key, field, self._index[issue_key].get(field), last_change)
+                                    for issue_key, field, last_change in rows if issue_key in self._index]
+
+    def comment_maps(self):
+        """Existing comments and planned weeks keyed by issue_key"""
+        rows = self._connection().execute(
+            "SELECT issue_key, comments, planned_for_week FROM cases "
+            "WHERE issue_key IS NOT NULL AND issue_key != '' ORDER BY position DESC").fetchall()
+        comments_map = {}
+        planned_week_map = {}
+        # Walk in reverse so the first row with a key wins, as in CaseStore
+        for issue_key, comments, planned_for_week in rows:
+            if comments is not None:
+                comments_map[issue_key] = _decode(comments)
+            if planned_for_week is not None:
+                planned_week_map[issue_key] = _decode(planned_for_week)
+        return comments_map, planned_week_map
+
+    # ─── Writes ──────────────────────────────────────────────────────
+    @contextmanager
+    def locked(self):
+        """Hold the store's cross-process write lock"""
+        with self._lock, self._file_lock:
+            yield self
+
+    def update_field(self, issue_key, field, value, base_revision=None):
+        """Update one field on one case.
+
+        Returns the new store revision, or None if the issue is unknown. If
+        base_revision is given and the field changed after it, raises
+        StaleWriteError instead of writing.
+        """
+        result = self.update_fields([(issue_key, field, value, base_revision)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def update_fields(self, edits):
+        """Apply many (issue_key, field, value, base_revision) edits in one transaction.
+
+        Returns one result per edit: the new revision, None if the issue is
+        unknown, or the StaleWriteError that kept it from being written.
+        """
+        return self.update_cases(edits)
+
+    def update_cases(self, edits=(), added=(), removed=()):
+        """update_fields(), plus cases to add after the others and issue keys to remove, in one transaction.
+
+        Keys are removed before cases are added. An added case whose key is
+        already taken, and a removed key no case has, are skipped. Returns
+        update_fields()'s results for the edits.
+        """
+        edits = list(edits)
+        for _, field, _, _ in edits:
+            if field not in CASE_FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+        results = []
+        # The file lock too, so edits wait for whoever holds locked(), as in CaseStore
+        with self._file_lock, self._transaction() as db:
+            revision = self._meta(db, "revision", 0)
+            for issue_key, field, value, base_revision in edits:
+                row = db.execute(FIRST_ROW, (issue_key,)).fetchone()
+                if row[0] is None:
+                    results.append(None)
+                    continue
+                last = db.execute("SELECT revision FROM field_revisions WHERE issue_key = ? AND field = ?",
+                                  (issue_key, field)).fetchone()
+                if base_revision is not None and last and last[0] > base_revision:
+                    results.append(StaleWriteError(issue_key, field, last[0]))
+                    continue
+                revision += 1
+                db.execute(f"UPDATE cases SET {field} = ? WHERE position = ?", (_encode(value), row[0]))
+                db.execute("INSERT OR REPLACE INTO field_revisions (issue_key, field, revision) VALUES (?, ?, ?)",
+                           (issue_key, field, revision))
+                results.append(revision)
+            moved = False
+            for issue_key in removed:
+                row = db.execute(FIRST_ROW, (issue_key,)).fetchone()
+                if row[0] is not None:
+                    db.execute("DELETE FROM cases WHERE position = ?", row)
+                    db.execute("DELETE FROM field_revisions WHERE issue_key = ?", (issue_key,))
+                    moved = True
+            position = db.execute("SELECT COALESCE(MAX(position), -1) FROM cases").fetchone()[0]
+            for case in added:
+                issue_key = case.get("issue_key")
+                if issue_key and db.execute(FIRST_ROW, (issue_key,)).fetchone()[0] is None:
+                    position += 1
+                    db.execute(INSERT_CASE, _row_values(position, case))
+                    moved = True
+            if moved:
+                # Positions changed: readers reload, as after replace()
+                revision += 1
+                self._set_meta(db, "generation", self._meta(db, "generation", 0) + 1)
+                self._set_meta(db, "replaced", revision)
+            self._set_meta(db, "revision", revision)
+        return results
+
+    def replace(self, cases, summary=None):
+        """Replace every case (and the summary) in one transaction; returns the new revision"""
+        return self.replace_streaming(cases, lambda: summary)
+
+    def replace_streaming(self, cases, summary):
+        """replace() for more cases than fit in memory at once.
+
+        cases is any iterable, consumed once straight into the table; summary
+        is called afterwards for the data.json document (None keeps the old
+        one). Returns the new revision.
+        """
+        with self._lock:
+            # Let the old cached document go; the next read reloads it
+            self._cases = None
+        with self._file_lock, self._transaction() as db:
+            db.execute("DELETE FROM cases")
+            db.execute("DELETE FROM field_revisions")
+            db.executemany(INSERT_CASE, (_row_values(i, case) for i, case in enumerate(cases)))
+            revision = self._meta(db, "revision", 0) + 1
+            self._set_meta(db, "revision", revision)
+            self._set_meta(db, "generation", self._meta(db, "generation", 0) + 1)
+            self._set_meta(db, "replaced", revision)
+            document = summary()
+            if document is not None:
+                self._set_meta(db, "summary", document)
+            return revision
+
+    def compact(self):
+        """Checkpoint the WAL into the main database file"""
+        try:
+            self._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            print(f"Warning: Could not checkpoint cases.db: {e}")
+
+
+def migrate(directory):
+    """One-shot import of cases.json (+ its journal) and data.json into cases.db"""
+    source = CaseStore(os.path.join(directory, "cases.json"))
+    cases = source.cases()
+    summary = None
+    if os.path.exists(source.summary_path):
+        summary = source.summary()
+    target = SqliteCaseStore(os.path.join(directory, "cases.db"))
+    target.replace(cases, summary)
+    target.compact()
+    print(f"Migrated {len(cases)} cases into {target.path}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("usage: python sqlite_store.py migrate")
+    migrate(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,102 @@
+"""File primitives shared by everything that writes the dashboard's data files.
+
+- FileLock: a cross-process exclusive lock (fcntl on Linux/macOS, msvcrt on
+  Windows) so multiple WSGI workers never interleave writes.
+- atomic_write_json: write to a temp file in the same directory and
+  os.replace() it over the target, so readers see the old or the new
+  document and never a half-written one.
+- atomic_writer: the same for documents written piece by piece.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import codec
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock held on a sidecar lock file; re-entrant within a thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def acquire(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            handle = open(self.path, "a+b")
+            start = time.perf_counter()
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        handle.seek(0)
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.01)
+            metrics.record(metrics.LOCK_WAIT_SECONDS, time.perf_counter() - start, timing="lock")
+            self._local.handle = handle
+        self._local.depth = depth + 1
+
+    def release(self):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            handle = self._local.handle
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            handle.close()
+            self._local.handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+@contextmanager
+def atomic_writer(path):
+    """Binary file that replaces path in one step once the block exits without error"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    start = time.perf_counter()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_path, path)
+        metrics.record_write(time.perf_counter() - start, size)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path, data):
+    """Replace path's contents with data in one step"""
+    with atomic_writer(path) as f:
+        f.write(data)
+
+
+def atomic_write_json(path, obj):
+    """Write obj to path as JSON atomically"""
+    atomic_write_bytes(path, codec.dumps(obj))
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import auth
+from auth import LoginBusy, PasswordChecker, RateLimiter
+
+
+def test_password_checker():
+    checker = PasswordChecker(workers=1, queue=1)
+    password_hash = generate_password_hash("right")
+    assert checker.check(password_hash, "right")
+    assert not checker.check(password_hash, "wrong")
+    # An unknown user is checked against a hash nothing matches, not skipped
+    assert not checker.check(None, "right")
+    assert checker._unknown_user_hash is not None
+
+
+def test_password_checker_turns_attempts_away_when_full(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(auth, "check_password_hash", lambda password_hash, password: release.wait(5))
+    checker = PasswordChecker(workers=1, queue=1)
+    waiting = [threading.Thread(target=checker.check, args=("hash", "pw")) for _ in range(2)]
+    for thread in waiting:
+        thread.start()
+    try:
+        # One check running and one waiting fill the pool; the next is turned away at once
+        deadline = time.monotonic() + 5
+        while checker._slots._value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with pytest.raises(LoginBusy):
+            checker.check("hash", "pw")
+    finally:
+        release.set()
+        for thread in waiting:
+            thread.join()
+    assert checker.check("hash", "pw")
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(limit=3, window=60)
+    for second in (0, 10, 20):
+        assert limiter.retry_after("ann", now=second) == 0
+        limiter.hit("ann", now=second)
+    assert limiter.retry_after("ann", now=30) == 30
+    assert limiter.retry_after("bob", now=30) == 0
+    # The oldest failure leaves the window, so one more attempt is allowed
+    assert limiter.retry_after("ann", now=60) == 0
+    limiter.hit("ann", now=60)
+    assert limiter.retry_after("ann", now=61) == 9
+
+    limiter.reset("ann")
+    assert limiter.retry_after("ann", now=61) == 0
+    assert len(limiter) == 0
+
+
+def test_rate_limiter_forgets_keys_past_its_cap(monkeypatch):
+    monkeypatch.setattr(auth, "MAX_KEYS", 10)
+    limiter = RateLimiter(limit=1, window=60)
+    for i in range(25):
+        limiter.hit(f"user-{i}", now=i)
+    assert len(limiter) <= 10
+    # The newest keys are the ones kept
+    assert limiter.retry_after("user-24", now=25) > 0
+    assert limiter.retry_after("user-0", now=25) == 0
+
+    # Expired keys are swept first, so the oldest key is kept while it is live
+    limiter = RateLimiter(limit=2, window=50)
+    limiter.hit("ann", now=0)
+    for i in range(9):
+        limiter.hit(f"user-{i}", now=i + 1)
+    limiter.hit("ann", now=95)
+    limiter.hit("bob", now=100)
+    assert len(limiter) == 2
+    assert limiter.retry_after("ann", now=100) == 0
+    limiter.hit("ann", now=100)
+    assert limiter.retry_after("ann", now=100) == 45
@@ -0,0 +1,47 @@
+import threading
+
+from case_query import SEARCH_CACHE_SIZE, CaseIndex
+
+
+def make_cases(count):
+    return [{"issue_key": f"CAR-{i}", "title": f"Label printing for carrier {i % 97}", "status": "Open",
+             "assignee": f"user{i % 5}", "target_end": ""} for i in range(count)]
+
+
+def scan(cases, term):
+    return sum(term in c["issue_key"].lower() or term in c["title"].lower() for c in cases)
+
+
+def test_search_matches_key_and_title():
+    cases = make_cases(300)
+    index = CaseIndex(cases)
+    assert index.query(search="CAR-12")["matched"] == 11  # CAR-12 and CAR-120..129
+    assert index.query(search="carrier 96")["matched"] == 3
+    # Narrowed from the cached result for "carrier"
+    index.query(search="carrier")
+    assert index.query(search="carrier 9")["matched"] == scan(cases, "carrier 9")
+
+
+def test_concurrent_queries_share_the_search_cache():
+    cases = make_cases(2000)
+    index = CaseIndex(cases)
+    terms = [f"carrier {n}" for n in range(SEARCH_CACHE_SIZE * 4)] + ["carrier", "car-1", "label"]
+    expected = {term: scan(cases, term) for term in terms}
+    start = threading.Barrier(8)
+    errors = []
+
+    def worker(offset):
+        start.wait()
+        try:
+            for _ in range(20):
+                for term in terms[offset % len(terms):] + terms[:offset % len(terms)]:
+                    assert index.query(search=term, limit=1)["matched"] == expected[term], term
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import pytest
+
+from case_store import CaseStore, StaleWriteError
+from transform import summarize
+
+
+def make_store(tmp_path, count=5):
+    cases = [{"issue_key": f"CAR-{i}", "title": f"Case {i}", "status": "Open", "comments": ""} for i in range(count)]
+    store = CaseStore(str(tmp_path / "cases.json"))
+    store.replace(cases, summarize(cases))
+    return store
+
+
+def test_reload_skips_a_torn_journal_tail(tmp_path):
+    store = make_store(tmp_path)
+    store.update_field("CAR-1", "comments", "first")
+    revision = store.update_field("CAR-2", "comments", "second")
+    # A writer crashed halfway through its append
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"rev": 99, "issue_key": "CAR-3", "fie')
+
+    reopened = CaseStore(store.path)
+    assert reopened.revision == revision
+    assert [case["comments"] for case in reopened.cases()] == ["", "first", "second", "", ""]
+
+    # The next append starts on a line of its own, so it isn't lost with the torn record
+    reopened.update_field("CAR-3", "comments", "third")
+    assert CaseStore(store.path).get("CAR-3")["comments"] == "third"
+    assert store.get("CAR-3")["comments"] == "third"
+
+
+def test_compaction_keeps_cases_and_revisions(tmp_path):
+    store = make_store(tmp_path)
+    base = store.revision
+    store.update_field("CAR-1", "comments", "before")
+    revision = store.update_field("CAR-1", "planned_for_week", "W10-2026")
+    store.compact()
+
+    assert os.path.getsize(store.journal_path) < 200
+    reopened = CaseStore(store.path)
+    assert reopened.revision == revision
+    assert reopened.get("CAR-1")["comments"] == "before"
+    assert [change[:3] for change in reopened.changes_since(base)] == [
+        ("CAR-1", "comments", "before"), ("CAR-1", "planned_for_week", "W10-2026")]
+    # Field revisions survive the snapshot, so an edit based on an older one is still refused
+    with pytest.raises(StaleWriteError):
+        reopened.update_field("CAR-1", "comments", "late", base_revision=base)
+    assert reopened.update_field("CAR-2", "comments", "fresh", base_revision=base) == revision + 1
+
+
+def test_concurrent_edits_share_one_fsync(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+
+    results = {}
+
+    def save(i):
+        results[i] = store.update_field(f"CAR-{i}", "comments", f"note {i}")
+
+    # Hold the store while the edits arrive, as a write in progress would
+    with store._lock:
+        threads = [threading.Thread(target=save, args=(i,)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while (store._batch is None or len(store._batch.edits) < 5) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert len(fsyncs) == 1
+    assert sorted(results.values()) == [2, 3, 4, 5, 6]
+    assert [case["comments"] for case in CaseStore(store.path).cases()] == [f"note {i}" for i in range(5)]
@@ -0,0 +1,38 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from dates import DATE_FORMATS, calculate_week_number, detect_format, parse_date, parse_dates, week_numbers
+
+EDGE_VALUES = ["", "   ", None, "not a date", "31/02/25", "2025-13-01", " 01/Nov/25 ", "01/NOV/25", "29/Feb/24",
+               "29/Feb/25", "1-2-2025", "12/Nov/2025"]
+
+
+def new_year_days():
+    return [date(year, 1, 1) + timedelta(days=offset) for year in range(2019, 2028) for offset in range(-7, 8)]
+
+
+def test_week_numbers_match_the_scalar_parser():
+    days = new_year_days()
+    values = [day.strftime(DATE_FORMATS[i % len(DATE_FORMATS)]) for i, day in enumerate(days)] + EDGE_VALUES
+    assert week_numbers(pd.Series(values)).tolist() == [calculate_week_number(value) for value in values]
+
+
+def test_column_with_a_dominant_format_and_stragglers():
+    values = [day.strftime("%Y-%m-%d") for day in new_year_days()] + ["01/Nov/25", "02-01-2026", "junk"]
+    assert detect_format(values) == "%Y-%m-%d"
+
+    parsed = parse_dates(pd.Series(values))
+    assert parsed.iloc[0] == pd.Timestamp(new_year_days()[0])
+    assert parsed.iloc[-3] == pd.Timestamp(2025, 11, 1)
+    assert parsed.iloc[-2] == pd.Timestamp(2026, 1, 2)
+    assert pd.isna(parsed.iloc[-1])
+
+
+def test_formats_are_tried_in_order():
+    # Both day-first formats accept 01/02/25; the month name one is tried first and rejects it
+    assert parse_date("01/02/25") == datetime(2025, 2, 1)
+    assert parse_date("01/Feb/25") == datetime(2025, 2, 1)
+    assert parse_date("2025-02-30") is None
+    assert calculate_week_number("  ") == ""
+    assert calculate_week_number(" 2026-03-02 ") == "W10-2026"
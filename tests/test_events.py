@@ -0,0 +1,74 @@
+import json
+
+from case_store import CaseStore
+from events import ChangeFeed
+from transform import summarize
+
+
+def make_store(tmp_path, count=5):
+    cases = [{"issue_key": f"CAR-{i}", "title": f"Case {i}", "status": "Open", "comments": ""} for i in range(count)]
+    store = CaseStore(str(tmp_path / "cases.json"))
+    store.replace(cases, summarize(cases))
+    return store
+
+
+class EditAfterRevision:
+    """A store whose revision is read just before a colleague's edit lands"""
+
+    def __init__(self, store, edits):
+        self._store = store
+        self._edits = edits
+
+    @property
+    def revision(self):
+        revision = self._store.revision
+        if self._edits:
+            self._store.update_field(*self._edits.pop(0))
+        return revision
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+
+def edit_events(feed, since):
+    _, events = feed.changes_after(since)
+    return [event["data"] for event in json.loads(events) if event["event"] == "edit"]
+
+
+def test_poll_sends_each_edit_once(tmp_path):
+    store = make_store(tmp_path)
+    feed = ChangeFeed(store, interval=3600)
+    start = feed.revision
+    store.update_field("CAR-1", "comments", "first")
+    feed.store = EditAfterRevision(store, [("CAR-2", "comments", "second")])
+    feed.poll()
+    feed.poll()
+    feed.poll()
+    edits = edit_events(feed, start)
+    assert [(e["issue_key"], e["value"]) for e in edits] == [("CAR-1", "first"), ("CAR-2", "second")]
+    assert feed.revision == store.revision
+
+
+def test_changes_after(tmp_path):
+    store = make_store(tmp_path)
+    feed = ChangeFeed(store, interval=3600)
+    start = feed.revision
+    store.update_field("CAR-3", "comments", "note")
+    feed.poll()
+    revision, events = feed.changes_after(start)
+    assert revision == store.revision
+    assert [e["event"] for e in json.loads(events)] == ["edit"]
+    assert feed.changes_after(revision) == (revision, "[]")
+    # Nothing to go on: no events, just where to poll from
+    assert feed.changes_after(None) == (revision, "[]")
+
+    # A replace can't be patched in place
+    store.replace(store.cases(), summarize(store.cases()))
+    feed.poll()
+    _, events = feed.changes_after(revision)
+    assert [e["event"] for e in json.loads(events)] == ["reload"]
+
+
+def test_stream_ends_at_its_duration(tmp_path):
+    feed = ChangeFeed(make_store(tmp_path), heartbeat=5.0)
+    assert list(feed.stream(duration=0.2)) == ["retry: 3000\n\n", ": keep-alive\n\n"]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from history import History
+
+
+def case(issue_key, status, assignee="ann"):
+    return {"issue_key": issue_key, "status": status, "assignee": assignee}
+
+
+def record_around_new_year(directory):
+    history = History(str(directory))
+    history.record([case("CAR-1", "Open"), case("CAR-2", "Open")], datetime(2024, 1, 3, 9))
+    history.record([case("CAR-1", "Done"), case("CAR-2", "Open", "bob")], datetime(2024, 6, 12, 9))
+    # ISO week 1 of 2025
+    history.record([case("CAR-1", "Done"), case("CAR-2", "Done", "bob")], datetime(2024, 12, 30, 9))
+    return history
+
+
+def test_weeks_are_labelled_by_iso_year(tmp_path):
+    history = record_around_new_year(tmp_path)
+    assert [h["week"] for h in history.snapshots()] == ["W01-2024", "W24-2024", "W01-2025"]
+
+
+def test_weekly_counts_keep_both_week_ones(tmp_path):
+    history = record_around_new_year(tmp_path)
+    points = history.weekly_counts()
+    assert [(p["week"], p["seq"]) for p in points] == [("W01-2024", 1), ("W24-2024", 2), ("W01-2025", 3)]
+    assert points[0]["groups"] == [{"status": "Open", "count": 2}]
+
+    by_assignee = history.weekly_counts(group_by=("assignee",))
+    assert [p["seq"] for p in by_assignee] == [1, 2, 3]
+    assert by_assignee[0]["groups"] == [{"assignee": "ann", "count": 2}]
+    assert sorted((g["assignee"], g["count"]) for g in by_assignee[2]["groups"]) == [("ann", 1), ("bob", 1)]
+
+    assert [p["seq"] for p in history.weekly_counts(weeks=2)] == [2, 3]
+
+
+def test_resolve_and_previous_week_across_new_year(tmp_path):
+    history = record_around_new_year(tmp_path)
+    assert history.resolve("W01-2024") == 1
+    assert history.resolve("W01-2025") == 3
+    assert history.resolve("W02-2025") is None
+    assert history.previous_week() == 2
+
+    # Another snapshot in the same ISO week still compares against the week before
+    history.record([case("CAR-1", "Done"), case("CAR-2", "Done")], datetime(2025, 1, 2, 9))
+    assert history.resolve("W01-2025") == 4
+    assert history.previous_week() == 2
+
+
+def test_calendar_year_labels_from_older_files_are_corrected(tmp_path):
+    record_around_new_year(tmp_path)
+    path = tmp_path / "snapshots.jsonl"
+    path.write_text(path.read_text().replace("W01-2025", "W01-2024"))
+    history = History(str(tmp_path))
+    assert [h["week"] for h in history.snapshots()] == ["W01-2024", "W24-2024", "W01-2025"]
+    assert history.resolve("W01-2024") == 1
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from aggregates import CaseCube
+from case_store import CaseStore
+from ingest import ingest_export
+from sqlite_store import SqliteCaseStore
+from transform import CASE_COLUMNS, build_cases, diff_export, read_export
+
+STATUSES = ["Open", "In Progress", "Done"]
+
+
+def export(keys, edited=()):
+    return pd.DataFrame({
+        "Hierarchy": ["Story" for _ in keys],
+        "Issue key": keys,
+        "Title": [f"Case {key}" + (" (edited)" if key in edited else "") for key in keys],
+        "Assignee": ["Ann" for _ in keys],
+        "Target start date": ["2026-03-02" for _ in keys],
+        "Target end date": [None for _ in keys],
+        "Components": ["Onboarding" for _ in keys],
+        "Issue status": [STATUSES[int(key.split("-")[1]) % len(STATUSES)] for key in keys],
+        "Deliverable Type": ["Deployment" for _ in keys],
+    }, columns=list(CASE_COLUMNS))
+
+
+def open_store(tmp_path, backend):
+    if backend == "sqlite":
+        return SqliteCaseStore(str(tmp_path / "cases.db"))
+    return CaseStore(str(tmp_path / "cases.json"))
+
+
+def upload(store, tmp_path, df):
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return ingest_export(store, str(path))
+
+
+def by_key(cases):
+    return {case["issue_key"]: case for case in cases}
+
+
+def test_reordered_export_is_unchanged():
+    df = export([f"CAR-{i}" for i in range(20)])
+    cases = build_cases(df, {}, {})
+    assert diff_export(df.iloc[::-1], cases) == ([], [], [])
+
+
+def test_blank_or_repeated_keys_rebuild():
+    keys = [f"CAR-{i}" for i in range(20)]
+    cases = build_cases(export(keys), {}, {})
+    assert diff_export(export(keys[:-1] + ["CAR-0"]), cases) is None
+    blank = export(keys)
+    blank.loc[3, "Issue key"] = " "
+    assert diff_export(blank, cases) is None
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_added_and_removed_issues_are_applied_in_place(tmp_path, backend):
+    store = open_store(tmp_path, backend)
+    upload(store, tmp_path, export([f"CAR-{i}" for i in range(40)]))
+    store.update_field("CAR-5", "comments", "Waiting on carrier")
+    store.update_field("CAR-7", "comments", "Removed upstream")
+
+    # CAR-7 and CAR-8 dropped, CAR-40..42 added, the rest reversed and one title edited
+    keys = [f"CAR-{i}" for i in reversed(range(43)) if i not in (7, 8)]
+    df = export(keys, edited={"CAR-3"})
+    changes = upload(store, tmp_path, df)
+
+    assert not changes["rebuilt"]
+    assert (changes["added"], changes["removed"], changes["changed"]) == (3, 2, 1)
+    assert changes["comments_preserved"] == 1
+    expected = by_key(build_cases(read_export(tmp_path / "data.csv"), *store.comment_maps()))
+    assert by_key(store.cases()) == expected
+    assert len(store.cases()) == len(expected)
+    assert store.get("CAR-5")["comments"] == "Waiting on carrier"
+    assert store.get("CAR-7") is None
+    assert store.aggregates().counts == CaseCube.from_cases(expected.values()).counts
+
+    reopened = open_store(tmp_path, backend)
+    assert by_key(reopened.cases()) == expected
+    assert by_key(reopened.iter_cases()) == expected
+
+
+def test_journaled_inserts_replay_after_compaction(tmp_path):
+    store = CaseStore(str(tmp_path / "cases.json"))
+    upload(store, tmp_path, export([f"CAR-{i}" for i in range(40)]))
+    revision = store.revision
+    upload(store, tmp_path, export([f"CAR-{i}" for i in range(1, 42)]))
+    assert store.changes_since(revision) is None
+
+    # Another process reads the journal without the snapshot loaded, then after compaction
+    keys = [case["issue_key"] for case in CaseStore(store.path).iter_cases()]
+    assert keys == [f"CAR-{i}" for i in range(1, 42)]
+    store.compact()
+    assert [case["issue_key"] for case in CaseStore(store.path).cases()] == keys
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+import jobs
+from jobs import JobQueue
+from storage import atomic_write_json
+
+
+def wait_for(queue, job_id, states=("done", "failed"), timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job["state"] in states:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['state']}")
+
+
+def submit(queue, content):
+    path = queue.upload_path()
+    with open(path, "w") as f:
+        f.write(content)
+    return queue.submit(path, "export.csv"), path
+
+
+def test_job_runs_and_removes_its_upload(tmp_path):
+    queue = JobQueue(str(tmp_path), lambda path, progress: {"size": os.path.getsize(path)})
+    (job_id, is_new), path = submit(queue, "a,b\n1,2\n")
+    assert is_new
+    job = wait_for(queue, job_id)
+    assert job["state"] == "done"
+    assert job["result"] == {"size": 8}
+    assert job["updated_at"] >= job["submitted_at"]
+    assert not os.path.exists(path)
+
+
+def test_abandoned_jobs_fail_and_their_uploads_are_removed(tmp_path):
+    long_ago = time.time() - jobs.STALE_AFTER - 1
+    job_id = "0" * 32
+    atomic_write_json(str(tmp_path / f"{job_id}.json"), {"id": job_id, "state": "running", "phase": "transform",
+                                                         "rows_processed": 10, "submitted_at": long_ago})
+    orphan = tmp_path / ".upload-orphan.csv"
+    orphan.write_text("a,b\n")
+    recent = tmp_path / ".upload-recent.csv"
+    recent.write_text("a,b\n")
+    for path in (tmp_path / f"{job_id}.json", orphan):
+        os.utime(path, (long_ago, long_ago))
+
+    # As after a restart: a new queue over the same directory
+    queue = JobQueue(str(tmp_path), lambda path, progress: {})
+    job = queue.status(job_id)
+    assert job["state"] == "failed"
+    assert "restarted" in job["error"]
+    assert not orphan.exists()
+    assert recent.exists()
+
+
+def test_held_jobs_are_kept_fresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "HEARTBEAT_INTERVAL", 0.05)
+    release = threading.Event()
+    queue = JobQueue(str(tmp_path), lambda path, progress: release.wait(5) and {})
+    (job_id, _), path = submit(queue, "a,b\n")
+    wait_for(queue, job_id, states=("running",))
+
+    long_ago = time.time() - jobs.STALE_AFTER - 1
+    for held in (tmp_path / f"{job_id}.json", path):
+        os.utime(held, (long_ago, long_ago))
+    time.sleep(0.2)
+    assert os.path.getmtime(path) > long_ago + 1
+    # Another process looking at the job sees it alive
+    assert JobQueue(str(tmp_path), lambda path, progress: {}).status(job_id)["state"] == "running"
+    assert os.path.exists(path)
+
+    release.set()
+    assert wait_for(queue, job_id)["state"] == "done"
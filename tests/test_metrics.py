@@ -0,0 +1,29 @@
+import metrics
+
+
+def test_server_timing_header_only_when_asked_for():
+    metrics.start_request()
+    metrics.record(metrics.LOCK_WAIT_SECONDS, 0.002, timing="lock")
+    assert metrics.finish_request("cases", 0, 100) is None
+
+    metrics.start_request()
+    metrics.record(metrics.LOCK_WAIT_SECONDS, 0.002, timing="lock")
+    metrics.record_write(0.001, 10)
+    header = metrics.finish_request("cases", 0, 100, server_timing=True)
+    assert header.startswith("lock;dur=2.00, write;dur=1.00, app;dur=")
+
+
+def test_requests_are_recorded_per_endpoint():
+    metrics.start_request()
+    metrics.finish_request("test_endpoint", 12, 34)
+    text = metrics.render()
+    assert 'dashboard_request_seconds_count{endpoint="test_endpoint"} 1' in text
+    assert 'dashboard_request_bytes_total{endpoint="test_endpoint"} 12' in text
+    assert 'dashboard_response_bytes_total{endpoint="test_endpoint"} 34' in text
+
+
+def test_finish_without_start_records_nothing():
+    metrics.start_request()
+    metrics.finish_request("other_endpoint", 0, 0)
+    assert metrics.finish_request("other_endpoint", 0, 0) is None
+    assert 'dashboard_request_seconds_count{endpoint="other_endpoint"} 1' in metrics.render()
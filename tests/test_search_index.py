@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import case_store
+import search_index
+import sqlite_store
+from case_store import CaseStore
+from sqlite_store import SqliteCaseStore
+from transform import summarize
+
+
+def make_store(tmp_path, backend):
+    cases = [{"issue_key": f"CAR-{i}", "title": f"Case {i}", "status": "Open", "comments": ""} for i in range(5)]
+    if backend == "sqlite":
+        store = SqliteCaseStore(str(tmp_path / "cases.db"))
+    else:
+        store = CaseStore(str(tmp_path / "cases.json"))
+    store.replace(cases, summarize(cases))
+    return store
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_index_builds_without_the_store_lock(tmp_path, monkeypatch, backend):
+    store = make_store(tmp_path, backend)
+    store.update_field("CAR-1", "comments", "waiting on carrier")
+
+    class EditDuringBuild(search_index.SearchIndex):
+        def __init__(self, *args):
+            # A save from another request lands while the index is being built
+            saver = threading.Thread(target=store.update_field, args=("CAR-1", "comments", "customs hold"))
+            saver.start()
+            saver.join(timeout=5)
+            assert not saver.is_alive(), "the build held the store lock"
+            super().__init__(*args)
+
+    module = sqlite_store if backend == "sqlite" else case_store
+    monkeypatch.setattr(module, "SearchIndex", EditDuringBuild)
+    revision, cases, index = store.search_snapshot()
+
+    assert revision == store.revision
+    assert [cases[position]["issue_key"] for position in index.search("customs")] == ["CAR-1"]
+    assert not index.search("carrier")
+    assert store.search_snapshot()[2] is index
@@ -0,0 +1,76 @@
+import io
+
+import pandas as pd
+import pytest
+
+import case_store
+import codec
+from case_store import CaseStore
+from ingest import ingest_export, stream_export
+from sqlite_store import SqliteCaseStore
+from transform import CASE_COLUMNS
+
+TRICKY_TITLES = ['Split "},{" here', "Nested }, { braces", "Ünïcode ✓", 'Quote \\" and },{"issue_key":"X"}']
+
+
+def export(count, seed=0):
+    return pd.DataFrame({
+        "Hierarchy": ["Story"] * count,
+        "Issue key": [f"CAR-{i}" for i in range(count)],
+        "Title": [TRICKY_TITLES[(i + seed) % len(TRICKY_TITLES)] + f" {i}" for i in range(count)],
+        "Assignee": [["Ann", "Bob", None][i % 3] for i in range(count)],
+        "Target start date": [["01/Mar/26", "2026-03-09", None][(i + seed) % 3] for i in range(count)],
+        "Target end date": [None] * count,
+        "Components": ["Onboarding"] * count,
+        "Issue status": [["open", "Done", "In progress"][(i + seed) % 3] for i in range(count)],
+        "Deliverable Type": ["Deployment"] * count,
+    }, columns=list(CASE_COLUMNS))
+
+
+def test_iter_array_round_trips_across_reads(monkeypatch):
+    monkeypatch.setattr(codec, "READ_BYTES", 64)
+    monkeypatch.setattr(case_store, "WRITE_BATCH", 7)
+    cases = [{"issue_key": f"CAR-{i}", "title": TRICKY_TITLES[i % len(TRICKY_TITLES)], "extra": {"n": [i]}}
+             for i in range(50)]
+    f = io.BytesIO()
+    case_store._write_cases(f, iter(cases))
+    assert f.getvalue() == codec.dumps(cases)
+    f.seek(0)
+    assert list(codec.iter_array(f)) == cases
+
+    empty = io.BytesIO()
+    case_store._write_cases(empty, [])
+    empty.seek(0)
+    assert list(codec.iter_array(empty)) == []
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_streamed_ingest_matches_the_in_memory_one(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(codec, "READ_BYTES", 256)
+
+    def open_store(name):
+        if backend == "sqlite":
+            return SqliteCaseStore(str(tmp_path / name / "cases.db"))
+        return CaseStore(str(tmp_path / name / "cases.json"))
+
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "streamed").mkdir()
+    memory, streamed = open_store("memory"), open_store("streamed")
+    path = str(tmp_path / "data.csv")
+    export(120).to_csv(path, index=False)
+    ingest_export(memory, path)
+    stream_export(streamed, path, chunksize=25)
+    for store in (memory, streamed):
+        store.update_field("CAR-4", "comments", "Waiting on carrier")
+        store.update_field("CAR-5", "planned_for_week", "W12-2026")
+
+    # Every issue changed, one removed and two added: the in-memory ingest rebuilds too
+    export(122, seed=1).drop(index=[3]).to_csv(path, index=False)
+    expected = ingest_export(memory, path)
+    changes = stream_export(streamed, path, chunksize=25)
+
+    assert expected["rebuilt"] and changes == expected
+    assert open_store("streamed").cases() == open_store("memory").cases()
+    assert streamed.summary() == memory.summary()
+    assert streamed.get("CAR-4")["comments"] == "Waiting on carrier"
+    assert streamed.get("CAR-5")["planned_for_week"] == "W12-2026"
@@ -0,0 +1,342 @@
+"""Column-oriented transform from a Jira CSV export to dashboard cases.
+
+Shared by the `/upload` route in app.py and the update_data.py script so both
+entry points produce byte-identical cases.json / data.json documents.
+
+pandas and numpy are imported by the functions that use them, so importing
+this module (as app.py does for diff_cases and summarize) stays cheap.
+"""
+from array import array
+
+from aggregates import CaseCube
+from dates import week_numbers
+
+# Jira export column -> case field, in the order fields appear in cases.json
+CASE_COLUMNS = {
+    "Hierarchy": "hierarchy",
+    "Issue key": "issue_key",
+    "Title": "title",
+    "Assignee": "assignee",
+    "Target start date": "target_start",
+    "Target end date": "target_end",
+    "Components": "components",
+    "Issue status": "status",
+    "Deliverable Type": "deliverable_type",
+}
+
+EXPORT_FIELDS = list(CASE_COLUMNS.values())
+CASE_FIELDS = EXPORT_FIELDS + ["comments", "planned_for_week"]
+
+# Past this many field edits per case, rewriting the cases is cheaper than
+# journaling (and replaying) one record per edit, so the diffs give up
+MAX_EDITS_PER_CASE = 0.25
+
+
+def read_export(filepath):
+    """Read only the columns the dashboard uses from a Jira CSV export"""
+    import pandas as pd
+
+    return pd.read_csv(filepath, usecols=list(CASE_COLUMNS), dtype=str)
+
+
+def _clean(field, values):
+    values = values.fillna("").astype(str).str.strip()
+    return values.str.title() if field == "status" else values
+
+
+def normalize(df):
+    """Rename export columns to case fields and strip every value to a string"""
+    import pandas as pd
+
+    frame = pd.DataFrame(index=df.index)
+    for column, field in CASE_COLUMNS.items():
+        frame[field] = _clean(field, df[column])
+    return frame
+
+
+def read_export_chunks(filepath, chunksize):
+    """read_export() in DataFrames of at most chunksize rows, for exports too large to load at once"""
+    import pandas as pd
+
+    return pd.read_csv(filepath, usecols=list(CASE_COLUMNS), dtype=str, chunksize=chunksize)
+
+
+def build_cases(df, comments_map, planned_week_map):
+    """Build the cases list from an export, preserving comments and planned weeks"""
+    return _build(normalize(df), _existing(comments_map, planned_week_map))
+
+
+def build_case_chunks(chunks, previous):
+    """build_cases() over an export read in chunks, yielding one cases list per chunk.
+
+    Comments and planned weeks come from previous, a PreviousCases, looked
+    up for each chunk's keys only.
+    """
+    for df in chunks:
+        frame = normalize(df)
+        yield _build(frame, _existing(*previous.comment_maps(frame["issue_key"].tolist())))
+
+
+def _existing(comments_map, planned_week_map):
+    import pandas as pd
+
+    existing = pd.DataFrame({
+        "comments": pd.Series(comments_map, dtype=object),
+        "planned_for_week": pd.Series(planned_week_map, dtype=object),
+    })
+    existing["has_comment"] = existing.index.isin(list(comments_map))
+    existing["has_week"] = existing.index.isin(list(planned_week_map))
+    return existing
+
+
+def _build(frame, existing):
+    frame = frame.join(existing, on="issue_key")
+
+    has_comment = frame["has_comment"].eq(True)
+    frame["comments"] = frame["comments"].where(has_comment, "")
+
+    has_week = frame["has_week"].eq(True)
+    if not has_week.all():
+        frame.loc[~has_week, "planned_for_week"] = week_numbers(frame.loc[~has_week, "target_start"])
+
+    columns = [frame[field].tolist() for field in CASE_FIELDS]
+    return [dict(zip(CASE_FIELDS, row)) for row in zip(*columns)]
+
+
+def _case_row(case):
+    return tuple(case.get(field) for field in EXPORT_FIELDS)
+
+
+def diff_export(df, previous_cases):
+    """What turns previous_cases into the cases of a raw export: (edits, added, removed).
+
+    Rows are matched to cases by issue key, so issues that were added,
+    removed or moved don't force a rebuild. edits is a list of (issue_key,
+    field, value) for issues in both, added the cases of new issues in
+    export order, built as build_cases() would (they have no comments or
+    planned weeks to keep), and removed the keys of issues no longer
+    exported; all three are empty if nothing changed. Returns None if keys
+    are blank or repeated on either side, or the changes come to more than
+    MAX_EDITS_PER_CASE per case, and the cases must be rebuilt in full.
+    Each export column is compared with the stored values of the matched
+    cases, and only values that differ are cleaned up as normalize() would,
+    so an unchanged re-export skips nearly all of the transform.
+    """
+    import numpy as np
+    import pandas as pd
+
+    keys = [case.get("issue_key") for case in previous_cases]
+    if "" in keys or None in keys or len(set(keys)) != len(keys):
+        return None
+    export_keys = _clean("issue_key", df["Issue key"])
+    if export_keys.eq("").any() or export_keys.duplicated().any():
+        return None
+
+    # Position of each export row's case in previous_cases, -1 for a new issue
+    positions = pd.Index(keys, dtype=object).get_indexer(export_keys)
+    matched = np.flatnonzero(positions >= 0)
+    new = np.flatnonzero(positions < 0)
+    positions = positions[matched]
+    kept = np.zeros(len(keys), dtype=bool)
+    kept[positions] = True
+    removed = [keys[i] for i in np.flatnonzero(~kept)]
+
+    max_changes = MAX_EDITS_PER_CASE * max(len(previous_cases), len(df))
+    if len(new) + len(removed) > max_changes:
+        return None
+    edits = []
+    for column, field in CASE_COLUMNS.items():
+        if field == "issue_key":
+            continue
+        stored = np.array([previous_cases[i].get(field) for i in positions], dtype=object)
+        rows = np.flatnonzero(df[column].fillna("").to_numpy(dtype=object)[matched] != stored)
+        if not len(rows):
+            continue
+        values = _clean(field, df[column].iloc[matched[rows]]).to_numpy(dtype=object)
+        differ = values != stored[rows]
+        edits.extend((keys[positions[row]], field, value) for row, value in zip(rows[differ], values[differ]))
+        if len(edits) + len(new) + len(removed) > max_changes:
+            return None
+    added = build_cases(df.iloc[new], {}, {}) if len(new) else []
+    return edits, added, removed
+
+
+def diff_cases(previous_cases, cases):
+    """Field edits that turn previous_cases into cases, such as a /save_all body.
+
+    Returns a list of (issue_key, field, value), or None if issues were
+    added, removed or reordered, keys are blank or repeated, a case gained
+    or lost fields, or there are more than MAX_EDITS_PER_CASE edits per case.
+    """
+    if len(cases) != len(previous_cases):
+        return None
+    keys = [case.get("issue_key") for case in previous_cases]
+    if "" in keys or None in keys or len(set(keys)) != len(keys):
+        return None
+
+    edits = []
+    for issue_key, previous, case in zip(keys, previous_cases, cases):
+        if case == previous:
+            continue
+        if not isinstance(case, dict) or case.get("issue_key") != issue_key or case.keys() != previous.keys():
+            return None
+        edits.extend((issue_key, field, value) for field, value in case.items() if previous[field] != value)
+        if len(edits) > MAX_EDITS_PER_CASE * len(previous_cases):
+            return None
+    if any(field not in CASE_FIELDS for _, field, _ in edits):
+        return None
+    return edits
+
+
+class PreviousCases:
+    """What a rebuild needs to know about the cases it replaces, in a few dozen bytes per case.
+
+    For each case this keeps hashes of its issue key and of its export
+    fields, whether it has a comment, and its planned week as a code into
+    the distinct weeks; the comments themselves only where not empty. Keys
+    are found by hash in a sorted array and checked against a copy of their
+    bytes, so there is no Python object per case. cases can be any
+    iterable, such as a store's iter_cases(), so the old cases never have to
+    be in memory together. As in the stores' indexes, the first case with a
+    key is the one that counts.
+    """
+
+    def __init__(self, cases):
+        import numpy as np
+
+        key_hashes = array("q")
+        self.rows = array("q")  # hash(_case_row(case)); a collision only miscounts a changed issue
+        self.commented = bytearray()
+        self.weeks = array("i")  # index into week_values, -1 if the case has no planned week
+        self.week_values = []
+        self.comments = {}  # slot -> comments, unless ""
+        self._keys = bytearray()  # every issue key's UTF-8, back to back
+        self._key_ends = array("q")
+        week_codes = {}
+        for case in cases:
+            issue_key = case.get("issue_key")
+            if not issue_key:
+                continue
+            key_hashes.append(hash(issue_key))
+            self._keys += issue_key.encode("utf-8")
+            self._key_ends.append(len(self._keys))
+            self.rows.append(hash(_case_row(case)))
+            comments = case.get("comments", "")
+            self.commented.append(bool(comments))
+            if comments != "":
+                self.comments[len(self.rows) - 1] = comments
+            if "planned_for_week" not in case:
+                self.weeks.append(-1)
+                continue
+            week = case["planned_for_week"]
+            code = week_codes.get(week)
+            if code is None:
+                code = week_codes[week] = len(self.week_values)
+                self.week_values.append(week)
+            self.weeks.append(code)
+
+        # Stable, so of the slots with one key the first comes first
+        hashes = np.frombuffer(key_hashes, dtype=np.int64)
+        self._order = np.argsort(hashes, kind="stable")
+        self._hashes = hashes[self._order]
+        self._repeats = 0
+        for position in (np.flatnonzero(self._hashes[1:] == self._hashes[:-1]) + 1).tolist():
+            start = position
+            while start and self._hashes[start - 1] == self._hashes[position]:
+                start -= 1
+            issue_key = self._key(int(self._order[position]))
+            if any(self._key(int(slot)) == issue_key for slot in self._order[start:position]):
+                self._repeats += 1
+
+    def __len__(self):
+        """Distinct issue keys"""
+        return len(self.rows) - self._repeats
+
+    def _key(self, slot):
+        return self._keys[self._key_ends[slot - 1] if slot else 0:self._key_ends[slot]]
+
+    def find(self, issue_keys):
+        """The slot of the first case with each of issue_keys, or -1 for keys no case has"""
+        import numpy as np
+
+        if not len(self._hashes):
+            return [-1] * len(issue_keys)
+        hashes = np.fromiter(map(hash, issue_keys), dtype=np.int64, count=len(issue_keys))
+        positions = np.minimum(np.searchsorted(self._hashes, hashes), len(self._hashes) - 1)
+        found = (self._hashes[positions] == hashes).tolist()
+        slots = []
+        for issue_key, key_hash, hit, position in zip(issue_keys, hashes.tolist(), found, positions.tolist()):
+            slot = -1
+            if hit:
+                encoded = issue_key.encode("utf-8")
+                # Walk the keys sharing the hash; nearly always the first is the one
+                while position < len(self._hashes) and self._hashes[position] == key_hash:
+                    candidate = int(self._order[position])
+                    if self._key(candidate) == encoded:
+                        slot = candidate
+                        break
+                    position += 1
+            slots.append(slot)
+        return slots
+
+    def comment_maps(self, issue_keys):
+        """(comments_map, planned_week_map) like a store's comment_maps(), for issue_keys only"""
+        comments_map, planned_week_map = {}, {}
+        for issue_key, slot in zip(issue_keys, self.find(issue_keys)):
+            if slot < 0:
+                continue
+            if slot in self.comments:
+                comments_map[issue_key] = self.comments[slot]
+            if self.weeks[slot] >= 0:
+                planned_week_map[issue_key] = self.week_values[self.weeks[slot]]
+        return comments_map, planned_week_map
+
+
+class ChangeCounter:
+    """Added, changed, removed and unchanged issues against the previous cases, plus the comments carried over.
+
+    previous is a PreviousCases, or cases to make one from. New cases can be
+    fed a chunk at a time. Memory grows with the previous cases only, a few
+    dozen bytes each: new issues are counted per row, not de-duplicated.
+    """
+
+    def __init__(self, previous):
+        self._previous = previous if isinstance(previous, PreviousCases) else PreviousCases(previous)
+        self._seen = bytearray(len(self._previous.rows))
+        self.added = 0
+        self.changed = 0
+        self.kept = 0
+
+    def update(self, cases):
+        cases = [case for case in cases if case.get("issue_key")]
+        rows = self._previous.rows
+        for case, slot in zip(cases, self._previous.find([case["issue_key"] for case in cases])):
+            if slot < 0:
+                self.added += 1
+                continue
+            if self._seen[slot]:
+                continue
+            self._seen[slot] = 1
+            self.kept += 1
+            if hash(_case_row(case)) != rows[slot]:
+                self.changed += 1
+
+    def result(self):
+        commented = self._previous.commented
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": len(self._previous) - self.kept,
+            "unchanged": self.kept - self.changed,
+            "comments_preserved": sum(1 for seen, has_comment in zip(self._seen, commented) if seen and has_comment),
+        }
+
+
+def summarize(cases):
+    """Build the data.json summary from a cases list"""
+    cube = CaseCube.from_cases(cases)
+    return {
+        "total_cases": len(cases),
+        "status_distribution": cube.status_distribution(),
+        "aggregates": cube.to_json(),
+    }
@@ -0,0 +1,64 @@
+"""Dashboard accounts: usernames and precomputed password hashes.
+
+Accounts are read from users.json (or the file named by USERS_FILE), a JSON
+object of lowercase username -> werkzeug password hash, so nothing is hashed
+when the app starts. Without the file, the built-in account is used; once it
+exists, only the accounts in it can log in. Add or change an account with
+
+    python users.py set <username>
+
+which prompts for the password and writes its hash to the file.
+"""
+import getpass
+import os
+import sys
+
+import codec
+from storage import atomic_write_json
+
+# The built-in account, hashed once here rather than on every start
+DEFAULT_USERS = {
+    "nilkanth": "scrypt:32768:8:1$Dn5YTRx5vitI0Pcm$d8bcff095b2d23c419a23ec6095122b021a6544de69805b9f13d12d751423107"
+                "8a38976720aef620894048c35ceb57a018992367f82e6a40afe4b38ed9ba3f2a",
+}
+
+
+def users_path(directory):
+    return os.environ.get("USERS_FILE") or os.path.join(directory, "users.json")
+
+
+def load_users(path):
+    """{username: password hash} from path, or the built-in account if there is no such file"""
+    if not os.path.exists(path):
+        return dict(DEFAULT_USERS)
+    with open(path, "rb") as f:
+        users = codec.load(f)
+    if not isinstance(users, dict) or not all(isinstance(h, str) for h in users.values()):
+        raise ValueError(f"{path} must be a JSON object of username -> password hash")
+    return {username.strip().lower(): password_hash for username, password_hash in users.items()}
+
+
+def set_password(path, username, password):
+    """Add or update one account in the file at path"""
+    from werkzeug.security import generate_password_hash
+
+    users = load_users(path) if os.path.exists(path) else {}
+    users[username.strip().lower()] = generate_password_hash(password)
+    atomic_write_json(path, users)
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "set":
+        print("Usage: python users.py set <username>")
+        sys.exit(2)
+    path = users_path(os.path.dirname(os.path.abspath(__file__)))
+    password = getpass.getpass(f"Password for {sys.argv[2]}: ")
+    if not password or password != getpass.getpass("Repeat the password: "):
+        print("Error: The passwords are empty or do not match")
+        sys.exit(1)
+    set_password(path, sys.argv[2], password)
+    print(f"Saved {sys.argv[2].strip().lower()} to {path}")
+
+
+if __name__ == "__main__":
+    main()